@@ -29,6 +29,7 @@ import views
 
 urlpatterns = patterns('accounts',
     url(r'^$', views.index, name='index'),
+    url(r'^fragment/(?P<provider_id>\d+)/$', views.accountsFragment, name='accounts_fragment'),
     url(r'^add/$', views.add, name='add'),
     url(r'^create/$', views.create, name='create'),
     url(r'^details/(?P<provider_id>\w+)/(?P<account_identifier>\w+)/transactions/(?P<page>\d+)/$', views.details_with_transactions, name='details_with_transactions'),
@@ -30,17 +30,18 @@ import forms
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect, HttpResponse
+from django.http import Http404, HttpResponseRedirect, HttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.utils.timezone import utc
 from django.utils.translation import ugettext as _
 
 from models import addressAliases
 from mybitbank.apps.addressbook.models import savedAddress
-from mybitbank.libs import events, misc
+from mybitbank.libs import events, fragments, misc
 from mybitbank.libs.config import MainConfig
 from mybitbank.libs.connections import connector
-from mybitbank.libs.entities import getWallets, getWalletByProviderId
+from mybitbank.libs.entities import getStateVersion, getWallets, getWalletByProviderId
 
 
 current_section = 'accounts'
@@ -48,7 +49,7 @@ current_section = 'accounts'
 @login_required
 def index(request):
     '''
-    Handler for the accounts view
+    Handler for the accounts view, a skeleton the accounts of every wallet are loaded into
     '''
     
     # set the request in the connector object
@@ -56,11 +57,6 @@ def index(request):
     
     # get all wallets
     wallets = getWallets(connector)
-
-    accounts = []
-    for wallet in wallets:
-        accounts_by_wallet = wallet.listAccounts(gethidden=True)
-        accounts = accounts + accounts_by_wallet
     
     sections = misc.getSiteSections(current_section)
     
@@ -72,11 +68,34 @@ def index(request):
                'system_alerts': connector.alerts,
                'page_title': page_title,
                'page_sections': sections,
-               'accounts': accounts,
+               'wallets': wallets,
                'request': request,
                }
     return render(request, 'accounts/index.html', context)
 
+@login_required
+def accountsFragment(request, provider_id):
+    '''
+    JSON fragment with the account rows of a wallet, the last good rows are served when the node is slow
+    '''
+    wallet = getWalletByProviderId(connector, int(provider_id))
+    if wallet.provider_id is None:
+        raise Http404
+    
+    def renderAccounts():
+        accounts = wallet.listAccounts(gethidden=True)
+        
+        # addresses and last activity for all the accounts of the wallet in one go
+        wallet.prefetchAccountDetails(accounts)
+        return render_to_string('accounts/fragments/accounts.html', {'accounts': accounts, 'wallet_name': wallet.get('name', "")})
+    
+    render_key = fragments.getRenderKey(request, 'accounts', wallet.provider_id)
+    
+    def buildAccounts():
+        return fragments.cached(render_key, getStateVersion(connector, [wallet.provider_id]), renderAccounts)
+    
+    return fragments.response(render_key, buildAccounts)
+
 @login_required
 def add(request):
     '''
@@ -136,6 +155,7 @@ def create(request):
             new_address = connector.getNewAddress(provider_id, new_account_name)
             
             if new_address:
+                getWalletByProviderId(connector, provider_id).forgetAccountAddresses()
                 messages.success(request, 'New account created with one address (%s)' % new_address, extra_tags="success")
                 events.addEvent(request, 'Created new account with address "%s"' % (new_address), 'info')
                 
@@ -212,14 +232,25 @@ def details_with_transactions(request, provider_id, account_identifier="pipes",
     # get account details
     account = wallet.getAccountByIdentifier(account_identifier)
     
-    transactions = []
-    if account:
-        # get transaction details
-        transactions = account.listTransactions(limit=transactions_per_page, start=(transactions_per_page * (page - 1)))
-
     page_title = _('Account details for "%s"') % (account['name'])
     sender_address_tooltip_text = "This address has been calculated using the Input Script Signature. You should verify before using it."
     
+    def renderTransactions():
+        transactions = []
+        if account:
+            # get transaction details
+            transactions = account.listTransactions(limit=transactions_per_page, start=(transactions_per_page * (page - 1)))
+            
+            # decode the sender addresses of the whole page in one go
+            wallet.resolveSenderAddresses(transactions)
+        
+        rows = render_to_string('accounts/fragments/transactions.html', {'transactions': transactions, 'sender_address_tooltip_text': sender_address_tooltip_text})
+        return {'rows': rows, 'count': len(transactions), 'newest_time': transactions[0]['time_human'] if transactions else None}
+    
+    # the rendered rows are reused until a block or a transaction arrives
+    render_key = fragments.getRenderKey(request, 'account_transactions', provider_id, account_identifier, page)
+    rendered = fragments.cached(render_key, getStateVersion(connector, [provider_id]), renderTransactions)
+    
     context = {
                'globals': MainConfig['globals'],
                'request': request,
@@ -235,7 +266,9 @@ def details_with_transactions(request, provider_id, account_identifier="pipes",
                'page_sections': sections,
                'wallet': wallet,
                'account': account,
-               'transactions': transactions,
+               'transactions_rows': rendered['rows'],
+               'transactions_count': rendered['count'],
+               'newest_transaction_time': rendered['newest_time'],
                'sender_address_tooltip_text': sender_address_tooltip_text,
                'transactions_per_page': transactions_per_page,
                }
@@ -293,6 +326,7 @@ def createNewAddress(request, provider_id, account_identifier):
         account = wallet.getAccountByIdentifier(account_identifier)
         if account:
             new_address = connector.getNewAddress(account['provider_id'], account['name'])
+            wallet.forgetAccountAddresses()
             messages.success(request, 'New address "%s" created for account "%s"' % (new_address, account['name']), extra_tags="success")
             events.addEvent(request, 'New address "%s" created for account "%s"' % (new_address, account['name']), 'info')
         return HttpResponseRedirect(reverse('accounts:details_with_addresses', kwargs={'provider_id': provider_id, 'account_identifier': account_identifier, 'page': 1}))
@@ -0,0 +1,4 @@
+from django.db import models
+
+
+# Create your models here.
@@ -0,0 +1,106 @@
+"""
+This file demonstrates writing tests using the unittest module. These will pass
+when you run "manage.py test".
+
+Replace this with more appropriate tests for your application.
+"""
+
+from django.test import TestCase
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        '''
+        Point the connector to a stubbed service and log a user in
+        '''
+        from decimal import Decimal
+        from django.contrib.auth.models import User
+        from django.test.client import RequestFactory
+        from mybitbank.apps.api import views
+        from mybitbank.libs.connections import connector
+        from mybitbank.libs.entities.coinaccount import history_versions
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.views = views
+        self.history_versions = history_versions
+        self.connector = connector
+        self.original_services, self.original_config = connector.services, connector.config
+        connector.services = {1: ServiceProxyStubBTC()}
+        connector.services[1].getbalance = lambda account_name: Decimal("1.5")
+        connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        
+        connector.tip_heights, connector.tip_hashes = {}, {}
+        history_versions.clear()
+        
+        self.user = User.objects.create_user('api', 'api@example.com', 'api')
+        self.factory = RequestFactory()
+    
+    def tearDown(self):
+        self.connector.services, self.connector.config = self.original_services, self.original_config
+        self.history_versions.clear()
+    
+    def get(self, view, path, user=True, **kwargs):
+        from django.contrib.auth.models import AnonymousUser
+        headers = {}
+        if 'etag' in kwargs:
+            headers['HTTP_IF_NONE_MATCH'] = kwargs.pop('etag')
+        request = self.factory.get(path, **headers)
+        request.user = self.user if user else AnonymousUser()
+        return view(request, **kwargs)
+    
+    def test_conditional(self):
+        '''
+        Test that a matching If-None-Match is answered with 304 until the data changes
+        '''
+        import json
+        from mybitbank.libs.events.models import Events
+        
+        response = self.get(self.views.wallet, "/api/v1/wallets/1/", provider_id="1")
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(json.loads(response.content)['balance'], "1.50000000")
+        etag = response["ETag"]
+        
+        response = self.get(self.views.wallet, "/api/v1/wallets/1/", provider_id="1", etag=etag)
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response['ETag'], etag)
+        
+        # another url of the same wallet has its own ETag
+        self.assertNotEquals(self.get(self.views.accounts, "/api/v1/wallets/1/accounts/", provider_id="1")['ETag'], etag)
+        
+        Events.objects.create(user=self.user, description="Added alias", level="info", entered="2013-09-22 10:00:00")
+        self.assertEquals(self.get(self.views.wallet, "/api/v1/wallets/1/", provider_id="1", etag=etag).status_code, 200)
+        
+        self.assertEquals(self.get(self.views.wallet, "/api/v1/wallets/1/", provider_id="1", user=False).status_code, 401)
+        self.assertEquals(self.get(self.views.wallet, "/api/v1/wallets/2/", provider_id="2").status_code, 404)
+    
+    def test_getETag_rpc_calls(self):
+        '''
+        Test that the ETag of a warm wallet costs no JSON-RPC call within the tip poll interval
+        '''
+        calls = []
+        service = self.connector.services[1]
+        for method in ['listtransactions', 'getblockcount', 'getblockhash']:
+            setattr(service, method, (lambda method, call: lambda *args: calls.append(method) or call(*args))(method, getattr(service, method)))
+        
+        request = self.factory.get("/api/v1/wallets/1/")
+        etag = self.views.getETag(request, [1])
+        self.assertEquals(sorted(calls), ['getblockcount', 'getblockhash', 'listtransactions'])
+        
+        del calls[:]
+        self.assertEquals(self.views.getETag(request, [1]), etag)
+        self.assertEquals(calls, [])
+    
+    def test_transactions(self):
+        '''
+        Test that transaction pages are plain JSON with cursors to the next page
+        '''
+        import json
+        
+        page = json.loads(self.get(self.views.transactions, "/api/v1/wallets/1/transactions/?limit=2", provider_id="1").content)
+        self.assertEquals(len(page['transactions']), 2)
+        self.assertTrue(page['next'])
+        self.assertTrue(all(isinstance(transaction['account'], basestring) for transaction in page['transactions']))
+        
+        older = json.loads(self.get(self.views.transactions, "/api/v1/wallets/1/transactions/?limit=2&before=%s" % page['next'], provider_id="1").content)
+        self.assertEquals(older['previous'] is not None, True)
+        self.assertTrue(older['transactions'][0]['time'] <= page['transactions'][-1]['time'])
@@ -0,0 +1,37 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+from django.conf.urls import patterns, url
+
+import views
+
+urlpatterns = patterns('',
+    url(r'^wallets/$', views.wallets, name='wallets'),
+    url(r'^wallets/(?P<provider_id>\d+)/$', views.wallet, name='wallet'),
+    url(r'^wallets/(?P<provider_id>\d+)/accounts/$', views.accounts, name='accounts'),
+    url(r'^wallets/(?P<provider_id>\d+)/accounts/(?P<account_identifier>\w+)/addresses/$', views.addresses, name='addresses'),
+    url(r'^wallets/(?P<provider_id>\d+)/accounts/(?P<account_identifier>\w+)/transactions/$', views.accountTransactions, name='account_transactions'),
+    url(r'^wallets/(?P<provider_id>\d+)/transactions/$', views.transactions, name='transactions'),
+)
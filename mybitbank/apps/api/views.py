@@ -0,0 +1,223 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import hashlib
+import json
+from functools import wraps
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+from mybitbank.apps.transactions import export, feed
+from mybitbank.libs import misc
+from mybitbank.libs.connections import connector
+from mybitbank.libs.entities import getStateVersion, getWallets, getWalletByProviderId
+
+
+# version of the API, part of the urls and of every ETag
+api_version = 1
+
+# transactions per page, unless asked for fewer
+max_page_size = 100
+
+
+def jsonResponse(content, status=200):
+    '''
+    Return content as a JSON response
+    '''
+    return HttpResponse(json.dumps(content), content_type="application/json", status=status)
+
+def getETag(request, provider_ids):
+    '''
+    Return the strong ETag of an API response for the request, unquoted
+    '''
+    version = (api_version, request.get_full_path(), getStateVersion(connector, provider_ids))
+    return hashlib.sha1(repr(version)).hexdigest()
+
+def conditional(view):
+    '''
+    Decorator for the API views. Answers a conditional GET with 304 Not Modified when the
+    ETag still matches, before the view does any entity work
+    '''
+    @wraps(view)
+    def wrapper(request, provider_id=None, *args, **kwargs):
+        if not request.user.is_authenticated():
+            return jsonResponse({'error': "authentication required"}, 401)
+        
+        # set the request in the connector object
+        connector.request = request
+        
+        if provider_id is None:
+            provider_ids = connector.config.keys()
+        else:
+            provider_id = int(provider_id)
+            if provider_id not in connector.config:
+                return jsonResponse({'error': "no such wallet"}, 404)
+            provider_ids = [provider_id]
+            args = (provider_id,) + args
+        
+        etag = getETag(request, provider_ids)
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ""))
+        if etag in if_none_match or '*' in if_none_match:
+            response = HttpResponseNotModified()
+            response['ETag'] = quote_etag(etag)
+            return response
+        
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = quote_etag(etag)
+            response['Cache-Control'] = "private, no-cache"
+        return response
+    
+    return wrapper
+
+def walletToDict(wallet):
+    '''
+    Return the JSON representation of a wallet
+    '''
+    return {
+            'provider_id': wallet.provider_id,
+            'name': wallet.get('name', ""),
+            'currency': wallet.getCurrencyCode(),
+            'symbol': wallet.getCurrencySymbol(),
+            'enabled': bool(wallet.enabled),
+            'balance': wallet.balance(),
+            }
+
+def accountToDict(account):
+    '''
+    Return the JSON representation of an account
+    '''
+    return {
+            'name': account['name'],
+            'identifier': account.getIdentifier(),
+            'balance': misc.longNumber(account['balance']),
+            'hidden': bool(account.isHidden()),
+            'addresses_count': account.getAddressesCount(),
+            'last_activity': account.getLastActivity(),
+            }
+
+def transactionToDict(transaction):
+    '''
+    Return the JSON representation of a transaction, with its current confirmations
+    '''
+    row = export.toRow(transaction)
+    # CoinTransaction swaps the account names and addresses for entity objects
+    for field in ['account', 'otheraccount']:
+        if field in row and not isinstance(row[field], basestring):
+            row[field] = row[field]['name']
+    if 'address' in row:
+        row['address'] = str(row['address'])
+    row['confirmations'] = transaction['confirmations']
+    return row
+
+def getLimit(request, default=10):
+    '''
+    Read the page size of a request, capped at max_page_size
+    '''
+    try:
+        return max(1, min(int(request.GET.get('limit', default)), max_page_size))
+    except ValueError:
+        return default
+
+@conditional
+def wallets(request):
+    '''
+    JSON list of the wallets and their balances
+    '''
+    return jsonResponse({'wallets': [walletToDict(wallet) for wallet in getWallets(connector)]})
+
+@conditional
+def wallet(request, provider_id):
+    '''
+    JSON details of a wallet
+    '''
+    return jsonResponse(walletToDict(getWalletByProviderId(connector, provider_id)))
+
+@conditional
+def accounts(request, provider_id):
+    '''
+    JSON list of the accounts of a wallet
+    '''
+    wallet = getWalletByProviderId(connector, provider_id)
+    accounts = wallet.listAccounts(gethidden=True)
+    
+    # addresses and last activity for all the accounts of the wallet in one go
+    wallet.prefetchAccountDetails(accounts)
+    return jsonResponse({'provider_id': provider_id, 'accounts': [accountToDict(account) for account in accounts]})
+
+@conditional
+def addresses(request, provider_id, account_identifier):
+    '''
+    JSON list of the addresses of an account along with their aliases
+    '''
+    account = getWalletByProviderId(connector, provider_id).getAccountByIdentifier(account_identifier)
+    if not account:
+        return jsonResponse({'error': "no such account"}, 404)
+    
+    addresses = []
+    for address in account.getAddresses():
+        addresses.append({'address': str(address), 'alias': address.alias or ""})
+    
+    return jsonResponse({'provider_id': provider_id, 'account': account['name'], 'addresses': addresses})
+
+@conditional
+def transactions(request, provider_id):
+    '''
+    JSON page of the wallet transactions newest first, paged with the before and after cursors
+    and filtered like the transaction timeline
+    '''
+    wallet = getWalletByProviderId(connector, provider_id)
+    page = feed.getFeed([wallet], getLimit(request), request.GET.get('before', None), request.GET.get('after', None), feed.getFilters(request.GET))
+    
+    return jsonResponse({
+                         'provider_id': provider_id,
+                         'transactions': [transactionToDict(transaction) for transaction in page['transactions']],
+                         'next': page['next'],
+                         'previous': page['previous'],
+                         })
+
+@conditional
+def accountTransactions(request, provider_id, account_identifier):
+    '''
+    JSON page of the account transactions newest first
+    '''
+    account = getWalletByProviderId(connector, provider_id).getAccountByIdentifier(account_identifier)
+    if not account:
+        return jsonResponse({'error': "no such account"}, 404)
+    
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+    limit = getLimit(request)
+    
+    transactions = account.listTransactions(limit, limit * (page - 1))
+    return jsonResponse({
+                         'provider_id': provider_id,
+                         'account': account['name'],
+                         'page': page,
+                         'transactions': [transactionToDict(transaction) for transaction in transactions],
+                         })
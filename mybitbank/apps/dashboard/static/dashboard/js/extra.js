@@ -228,3 +228,74 @@ function convertSpecificCurrencies(from, to) {
 	});
 }
 
+
+function loadFragments(onLoad, selector) {
+	// fill the placeholders of a page skeleton, every fragment is fetched in parallel
+	$(selector || '[data-fragment]').each(function(i, element) {
+		$.ajax({
+			type: "GET",
+			url: $(element).attr('data-fragment'),
+			dataType: 'json',
+			success: function(fragment) {
+				if (fragment.content !== null) {
+					$(element).html(fragment.content);
+					if (fragment.stale) {
+						$(element).css('opacity', 0.6).attr('title', 'Node is slow, showing data of ' + new Date(fragment.updated * 1000).toLocaleString());
+					}
+				} else {
+					$(element).find('em').html('Not available right now');
+				}
+				if (onLoad) {
+					onLoad(element);
+				}
+			},
+			error: function (xhr, textStatus, errorThrown) {
+				$(element).find('em').html('Not available right now');
+			}
+		});
+	});
+}
+
+function listenLiveEvents(url, handlers) {
+	// server-sent events, or a long poll where EventSource is not supported
+	if (!window.EventSource) {
+		pollLiveEvents(url, handlers);
+		return;
+	}
+	
+	var source = new EventSource(url);
+	$.each(handlers, function(type, handler) {
+		source.addEventListener(type, function(e) {
+			handler(JSON.parse(e.data));
+		});
+	});
+}
+
+function pollLiveEvents(url, handlers, since) {
+	$.ajax({
+		type: "GET",
+		url: url,
+		data: since === undefined ? {'poll': 1} : {'poll': 1, 'since': since},
+		dataType: 'json',
+		success: function(response) {
+			$.each(response.events, function(i, event) {
+				if (handlers[event.type]) {
+					handlers[event.type](event.data);
+				}
+			});
+			pollLiveEvents(url, handlers, response.last_id);
+		},
+		error: function (xhr, textStatus, errorThrown) {
+			setTimeout(function() { pollLiveEvents(url, handlers, since); }, 5000);
+		}
+	});
+}
+
+function showProviderHealth(data) {
+	var alert = $('#live-alert-' + data.provider_id);
+	if (data.enabled) {
+		alert.remove();
+	} else if (!alert.length) {
+		$('#live-alerts').append('<div id="live-alert-' + data.provider_id + '" class="alert alert-danger">Currency service provider ' + data.provider_id + ' is not responding.</div>');
+	}
+}
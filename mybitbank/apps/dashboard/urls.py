@@ -5,4 +5,7 @@ import views
 urlpatterns = patterns('',
     url(r'^$', views.index, name='index'),
     url(r'^proxy/$', views.proxy, name='proxy'),
+    url(r'^fragment/balance/(?P<provider_id>\d+)/$', views.balanceFragment, name='balance_fragment'),
+    url(r'^fragment/transactions/$', views.transactionsFragment, name='transactions_fragment'),
+    url(r'^slow/$', views.slowRequests, name='slow'),
 )
@@ -27,21 +27,24 @@ import calendar
 import urllib2
 
 from django.contrib.auth.decorators import login_required
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.template.loader import render_to_string
 from django.views.decorators.csrf import csrf_exempt
 
-from mybitbank.libs import misc
+from mybitbank.apps.transactions import feed, unconfirmed
+from mybitbank.libs import fragments, misc
 from mybitbank.libs.config import MainConfig
 from mybitbank.libs.connections import connector
-from mybitbank.libs.entities import getWallets
+from mybitbank.libs.entities import getStateVersion, getWallets, getWalletByProviderId
 from mybitbank.libs.events import Events
+from mybitbank.libs.profiling import slowlog
 
 
 @login_required
 def index(request):
     '''
-    Handler for the dashboard main page
+    Handler for the dashboard main page, a skeleton the balances and recent transactions are loaded into
     '''
     currect_section = 'dashboard'
     
@@ -50,17 +53,11 @@ def index(request):
     
     # get all wallets
     wallets = getWallets(connector)
-
-    # more efficient if we do only one call
-    transactions = []
-    for wallet in wallets:
-        transactions = transactions + wallet.listTransactions(5, 0)
-    
-    # sort result
-    transactions = sorted(transactions, key=lambda k: k.get('time', 0), reverse=True)
     
-    # get only 10 transactions
-    transactions = transactions[0:5]
+    # transactions still waiting for confirmations, read from the tracker hot set
+    unconfirmed_transactions = unconfirmed.listUnconfirmed()
+    for unconfirmed_transaction in unconfirmed_transactions:
+        unconfirmed_transaction['currency'] = connector.config.get(unconfirmed_transaction['provider_id'], {}).get('currency', "")
 
     # events
     list_of_events = Events.objects.all().order_by('-entered')[:5]  
@@ -79,11 +76,71 @@ def index(request):
                'page_title': page_title,
                'page_sections': sections,
                'wallets': wallets,
-               'transactions': transactions,
+               'unconfirmed_transactions': unconfirmed_transactions,
+               'conf_limit': MainConfig['globals']['confirmation_limit'],
                'events': list_of_events
                }
     return render(request, 'dashboard/index.html', context)
 
+@login_required
+def balanceFragment(request, provider_id):
+    '''
+    JSON fragment with the balance of a wallet
+    '''
+    wallet = getWalletByProviderId(connector, int(provider_id))
+    if wallet.provider_id is None:
+        raise Http404
+    
+    def buildBalance():
+        return render_to_string('dashboard/fragments/balance.html', {'wallet': wallet, 'balance': wallet.balance()})
+    
+    return fragments.response(fragments.getRenderKey(request, 'balance', wallet.provider_id), buildBalance)
+
+@login_required
+def transactionsFragment(request):
+    '''
+    JSON fragment with the newest 5 transactions of all currencies merged in one timeline
+    '''
+    def renderTransactions():
+        transactions = feed.getFeed(getWallets(connector), 5)['transactions']
+        return render_to_string('dashboard/fragments/transactions.html', {'transactions': transactions})
+    
+    render_key = fragments.getRenderKey(request, 'dashboard_transactions')
+    
+    def buildTransactions():
+        return fragments.cached(render_key, getStateVersion(connector, connector.config.keys()), renderTransactions)
+    
+    return fragments.response(render_key, buildTransactions)
+
+@login_required
+def slowRequests(request):
+    '''
+    Viewer of the recently logged slow requests and their span trees
+    '''
+    if not misc.isMonitoringAllowed(request):
+        return HttpResponseForbidden("Forbidden")
+    
+    traces = slowlog.readRecent()
+    for trace in traces:
+        trace['when_pretty'] = misc.twitterizeDate(trace.get('when', 0))
+        trace['span_rows'] = slowlog.flattenSpans(trace['spans'])
+        for span in trace['span_rows']:
+            span['indent'] = 8 + span['depth'] * 15
+    
+    page_title = "Slow requests"
+    context = {
+               'globals': MainConfig['globals'],
+               'system_errors': connector.errors,
+               'system_alerts': connector.alerts,
+               'request': request,
+               'breadcrumbs': misc.buildBreadcrumbs('dashboard', '', page_title),
+               'page_title': page_title,
+               'page_sections': misc.getSiteSections('dashboard'),
+               'traces': traces,
+               'threshold': slowlog.getThreshold(),
+               }
+    return render(request, 'dashboard/slowrequests.html', context)
+
 @login_required
 @csrf_exempt
 def proxy(request):
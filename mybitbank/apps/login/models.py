@@ -34,5 +34,15 @@ class Setting(models.Model):
     name = models.CharField(max_length=200, unique=True)
     value = models.CharField(max_length=200)
     
+
+def getUserSettings(user):
+    '''
+    Return the UserSettings of user, kept on the User object so that the settings are read
+    once per request (the request.user object)
+    '''
+    if getattr(user, '_user_settings', None) is None:
+        user._user_settings = UserSettings(user=user)
+    return user._user_settings
+
 # attach a UserSettings object in the User object
-User.setting = property(lambda u: UserSettings(user=u))
+User.setting = property(getUserSettings)
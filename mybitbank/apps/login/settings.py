@@ -31,29 +31,48 @@ import models
 
 
 class UserSettings(object):
+    '''
+    Dict-like access to the settings of a user, all of them are read with one query on first use
+    '''
     user_id = None
     user_object = None
     
     def __init__(self, user):
         self.user_object = user
         self.user_id = user.id
+        self._settings = None
+    
+    def load(self):
+        '''
+        Return the settings of the user by name, queried only the first time
+        '''
+        if self._settings is None:
+            self._settings = dict(models.Setting.objects.filter(user_id=self.user_id).values_list('name', 'value'))
+        return self._settings
+    
+    def __getitem__(self, name):
+        return self.load()[name]
+    
+    def __contains__(self, name):
+        return name in self.load()
     
     def set(self, name, value):
         existing = models.Setting.objects.filter(name=name)
         if existing:
             existing.update(value=value)
-            return True
         else:
             new_setting = models.Setting(user_id=self.user_id, name=name, value=value)
             new_setting.save()
-            return True
-
-    def get(self, name):
-        try:
-            stored_settings = models.Setting.objects.filter(user_id=self.user_id, name=name)
-            if len(stored_settings):
-                return stored_settings[0].value
-            else:
-                return None
-        except:
-            raise AttributeError('No attribute {0} found !'.format(name))
+        
+        if self._settings is not None:
+            self._settings[name] = value
+        return True
+
+    def get(self, name, default=None):
+        return self.load().get(name, default)
+    
+    def getAll(self):
+        '''
+        Return all the settings of the user as sorted (name, value) pairs
+        '''
+        return tuple(sorted(self.load().items()))
@@ -367,3 +367,27 @@ class LoginTests(TestCase):
         response = client.post(reverse('login:processLogin'), post_data)
         self.assertContains(response, text='', count=None, status_code=302)
         
+
+
+class UserSettingsTests(TestCase):
+    def test_settings_per_request(self):
+        '''
+        Test that the settings of a user are read with one query and kept up to date by set()
+        '''
+        from django.contrib.auth.models import User
+        from mybitbank.apps.login.models import Setting
+        
+        user = User.objects.create_user('settings', 'settings@example.com', 'settings')
+        Setting.objects.create(user=user, name="hide_moves", value="1")
+        
+        self.assertTrue(user.setting is user.setting)
+        with self.assertNumQueries(1):
+            self.assertEquals(user.setting.get('hide_moves'), "1")
+            self.assertEquals(user.setting['hide_moves'], "1")
+            self.assertEquals(user.setting.get('missing'), None)
+            self.assertFalse('missing' in user.setting)
+            self.assertEquals(user.setting.getAll(), (('hide_moves', "1"),))
+        
+        user.setting.set('hide_moves', "0")
+        self.assertEquals(user.setting.get('hide_moves'), "0")
+        self.assertEquals(User.objects.get(id=user.id).setting.get('hide_moves'), "0")
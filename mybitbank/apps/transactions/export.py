@@ -0,0 +1,135 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import csv
+import json
+
+import mirror
+from mybitbank.libs import misc
+from mybitbank.libs.connections import connector
+
+
+# entries fetched per xxxcoind call or mirror query while exporting
+chunk_size = 1000
+
+# amounts are exported as fixed 8 decimal strings to keep their precision
+amount_fields = ['amount', 'fee']
+
+# columns of the exported entries
+export_fields = ['provider_id', 'currency', 'account', 'category', 'address', 'otheraccount', 'amount', 'fee', 'confirmations', 'txid', 'vout', 'blockhash', 'blocktime', 'time', 'timereceived', 'comment', 'to']
+
+
+def iterEntries(provider_id, account_name=None):
+    '''
+    Yield the raw history of a wallet (or of an account of it) newest first, chunk by chunk
+    '''
+    if mirror.isSynced(provider_id):
+        filters = {'account': account_name} if account_name is not None else None
+        cursor_time, cursor_key = None, None
+        while True:
+            entries = mirror.listTransactionsByCursor(provider_id, cursor_time, cursor_key, True, chunk_size, filters)
+            for entry in entries:
+                yield entry
+            if len(entries) < chunk_size:
+                break
+            cursor_time, cursor_key = entries[-1]['time'], entries[-1]['entry_key']
+    else:
+        start = 0
+        previous_keys = set()
+        while True:
+            entries = connector.listTransactionsByAccount(account_name if account_name is not None else "*", provider_id, chunk_size, start)
+            # entries arriving while exporting shift the offsets, skip what the previous chunk already had
+            keys = set()
+            for entry in reversed(entries):
+                entry_key = mirror.getEntryKey(entry)
+                keys.add(entry_key)
+                if entry_key not in previous_keys:
+                    yield entry
+            if len(entries) < chunk_size:
+                break
+            previous_keys = keys
+            start = start + chunk_size
+
+
+def iterWalletsEntries(wallets, account_name=None):
+    '''
+    Yield the history of several wallets one after the other, tagged with provider and currency
+    '''
+    for wallet in wallets:
+        currency = wallet.getCurrencyCode()
+        for entry in iterEntries(wallet.provider_id, account_name):
+            entry['provider_id'] = wallet.provider_id
+            entry['currency'] = currency
+            yield entry
+
+
+def toRow(entry):
+    '''
+    Pick the exported fields of an entry, the confirmations of an entry pinned to a block
+    follow the chain tip
+    '''
+    row = {}
+    for field in export_fields:
+        if entry.get(field, None) is not None:
+            row[field] = misc.longNumber(entry[field]) if field in amount_fields else entry[field]
+    
+    if entry.get('blockheight', None) is not None:
+        tip_height = connector.getTipHeight(entry.get('provider_id', None))
+        if tip_height is not None:
+            row['confirmations'] = max(tip_height - entry['blockheight'] + 1, 0)
+    return row
+
+
+class LineBuffer(object):
+    '''
+    File-like object handing back what the csv writer writes to it
+    '''
+    def write(self, value):
+        return value
+
+
+def toCsv(entries):
+    '''
+    Render entries as CSV lines, one line at a time
+    '''
+    writer = csv.writer(LineBuffer())
+    yield writer.writerow(export_fields)
+    for entry in entries:
+        row = toRow(entry)
+        yield writer.writerow([unicode(row.get(field, "")).encode('utf-8') for field in export_fields])
+
+
+def toNdjson(entries):
+    '''
+    Render entries as newline delimited JSON, one line at a time
+    '''
+    for entry in entries:
+        yield json.dumps(toRow(entry)) + "\n"
+
+
+export_formats = {
+                  'csv': (toCsv, 'text/csv'),
+                  'ndjson': (toNdjson, 'application/x-ndjson'),
+                  }
@@ -0,0 +1,259 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import base64
+import calendar
+import datetime
+import heapq
+import string
+from decimal import Decimal, InvalidOperation
+
+import mirror
+import rollups
+from mybitbank.libs.connections import connector
+
+
+# reverses the order of hex digits, used to merge newest first with an ascending heap
+descending_hex = string.maketrans('0123456789abcdef', 'fedcba9876543210')
+
+
+def encodeCursor(entry):
+    '''
+    Build an opaque cursor pointing at a feed entry
+    '''
+    position = "%s:%s:%s" % (int(entry['time']), entry['entry_key'], entry['provider_id'])
+    return base64.urlsafe_b64encode(position)
+
+
+def decodeCursor(cursor):
+    '''
+    Decode a cursor to a (time, entry_key, provider_id) position, None if it is invalid
+    '''
+    if not cursor:
+        return None
+    
+    try:
+        cursor_time, entry_key, provider_id = base64.urlsafe_b64decode(str(cursor)).split(':')
+        return (int(cursor_time), entry_key, int(provider_id))
+    except (UnicodeError, ValueError, TypeError):
+        return None
+
+
+def getFilters(params):
+    '''
+    Read the transaction filters out of a request query dict. Dates are expected
+    as YYYY-MM-DD and are converted to timestamps, invalid values are ignored
+    '''
+    filters = {}
+    for field in ['category', 'account', 'address']:
+        if params.get(field, False):
+            filters[field] = params[field]
+    
+    for field in ['min_amount', 'max_amount']:
+        try:
+            filters[field] = Decimal(params[field])
+        except (KeyError, InvalidOperation):
+            pass
+    
+    for field, day_offset in [('since', 0), ('until', 1)]:
+        try:
+            day = datetime.datetime.strptime(params[field], "%Y-%m-%d") + datetime.timedelta(days=day_offset)
+            filters[field] = calendar.timegm(day.timetuple()) - day_offset
+        except (KeyError, ValueError):
+            pass
+    
+    return filters
+
+
+def matchesFilters(entry, filters=None):
+    '''
+    Check a raw transaction entry against the filters
+    '''
+    if not filters:
+        return True
+    
+    for field in ['category', 'account', 'address']:
+        if field in filters and entry.get(field, "") != filters[field]:
+            return False
+    
+    if filters.get('exclude_category', None) == entry.get('category', None):
+        return False
+    
+    if 'min_amount' in filters or 'max_amount' in filters:
+        amount = rollups.toDecimal(entry.get('amount', 0))
+        if amount < filters.get('min_amount', amount) or amount > filters.get('max_amount', amount):
+            return False
+    
+    entry_time = entry.get('time', 0)
+    if entry_time < filters.get('since', entry_time) or entry_time > filters.get('until', entry_time):
+        return False
+    
+    return True
+
+
+def getPosition(entry):
+    '''
+    Return the (time, entry_key, provider_id) position of an entry in the feed
+    '''
+    return (int(entry.get('time', 0)), entry['entry_key'], entry['provider_id'])
+
+
+def getProviderStream(provider_id, position=None, older=True, limit=10, filters=None):
+    '''
+    Return up to limit entries of provider_id past position that match the filters,
+    newest first if older is True or oldest first otherwise
+    '''
+    cursor_time, cursor_key = (position[0], position[1]) if position else (None, None)
+    
+    if mirror.isSynced(provider_id):
+        entries = mirror.listTransactionsByCursor(provider_id, cursor_time, cursor_key, older, limit, filters)
+    else:
+        entries = getCoindStream(provider_id, position, older, limit, filters)
+    
+    for entry in entries:
+        entry['provider_id'] = provider_id
+    
+    return entries
+
+
+def fetchCoindEntries(provider_id, window):
+    '''
+    Return the newest window entries of provider_id from xxxcoind, newest first
+    '''
+    entries = connector.listTransactionsByAccount("*", provider_id, window, 0)
+    for entry in entries:
+        entry['provider_id'] = provider_id
+        entry['entry_key'] = mirror.getEntryKey(entry)
+    
+    return sorted(entries, key=getPosition, reverse=True)
+
+
+def getCoindStream(provider_id, position=None, older=True, limit=10, filters=None):
+    '''
+    Fallback for providers without a mirror, xxxcoind can only page by offset from the
+    newest entry so the window grows until it holds enough matching entries past the cursor
+    '''
+    window = limit
+    while True:
+        fetched = fetchCoindEntries(provider_id, window)
+        exhausted = len(fetched) < window
+        
+        if older:
+            entries = [entry for entry in fetched if (position is None or getPosition(entry) < position) and matchesFilters(entry, filters)]
+            if exhausted or len(entries) >= limit:
+                break
+        else:
+            # everything newer than the cursor is in the window once the window reaches past it
+            if exhausted or not fetched or getPosition(fetched[-1]) <= position:
+                entries = [entry for entry in fetched if getPosition(entry) > position and matchesFilters(entry, filters)]
+                entries.reverse()
+                break
+        window = window * 4
+    
+    return entries[:limit]
+
+
+def getPage(wallet, limit=10, start=0, filters=None):
+    '''
+    Return a full offset page of matching wallet transactions, newest first
+    '''
+    if mirror.isSynced(wallet.provider_id):
+        entries = mirror.listTransactions(wallet.provider_id, None, limit, start, filters)
+    else:
+        window = start + limit
+        while True:
+            fetched = fetchCoindEntries(wallet.provider_id, window)
+            entries = [entry for entry in fetched if matchesFilters(entry, filters)]
+            if len(fetched) < window or len(entries) >= start + limit:
+                break
+            window = window * 4
+        entries = entries[start:start + limit]
+    
+    return wallet.toCoinTransactions(entries)
+
+
+def mergeStreams(streams, limit, older=True):
+    '''
+    Heap based k-way merge of already ordered provider streams
+    '''
+    if older:
+        merge_key = lambda entry: (-int(entry.get('time', 0)), entry['entry_key'].translate(descending_hex), -entry['provider_id'])
+    else:
+        merge_key = getPosition
+    
+    heap = []
+    for stream_index, stream in enumerate(streams):
+        if stream:
+            heap.append((merge_key(stream[0]), stream_index, 0))
+    heapq.heapify(heap)
+    
+    merged = []
+    while heap and len(merged) < limit:
+        sort_key, stream_index, entry_index = heapq.heappop(heap)
+        merged.append(streams[stream_index][entry_index])
+        entry_index = entry_index + 1
+        if entry_index < len(streams[stream_index]):
+            heapq.heappush(heap, (merge_key(streams[stream_index][entry_index]), stream_index, entry_index))
+    
+    return merged
+
+
+def getFeed(wallets, limit=10, before=None, after=None, filters=None):
+    '''
+    Return a page of the cross-currency transaction timeline, newest first, along with
+    the cursors of the next (older) and previous (newer) pages
+    '''
+    position = decodeCursor(after)
+    older = position is None
+    if older:
+        position = decodeCursor(before)
+    
+    wallets_by_provider = dict([(wallet.provider_id, wallet) for wallet in wallets])
+    
+    # one entry more than needed tells if there is another page
+    streams = [getProviderStream(provider_id, position, older, limit + 1, filters) for provider_id in wallets_by_provider.keys()]
+    entries = mergeStreams(streams, limit + 1, older)
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not older:
+        entries.reverse()
+    
+    transactions = []
+    for entry in entries:
+        transactions = transactions + wallets_by_provider[entry['provider_id']].toCoinTransactions([entry])
+    
+    next_cursor = None
+    previous_cursor = None
+    if entries:
+        if (older and has_more) or not older:
+            next_cursor = encodeCursor(entries[-1])
+        if (older and position is not None) or (not older and has_more):
+            previous_cursor = encodeCursor(entries[0])
+    
+    return {
+            'transactions': transactions,
+            'next': next_cursor,
+            'previous': previous_cursor,
+            }
@@ -0,0 +1,248 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import collections
+import json
+import threading
+import time
+
+from django.db import connection
+
+from mybitbank.libs import misc
+from mybitbank.libs.config import MainConfig
+from mybitbank.libs.connections import connector
+import mirror
+
+
+# seconds between two polls of a provider
+poll_interval = 5
+
+# a watcher stops polling after this many seconds without listeners
+idle_timeout = 60
+
+# events kept for browsers that reconnect
+history_size = 500
+
+# seconds an event stream holds a worker thread before the browser reconnects
+stream_duration = 55
+
+# event streams a process keeps open at once, the other browsers are answered
+# with the pending events and reconnect later, like a long poll
+max_streams = 8
+
+# seconds between keep-alive comments on a quiet event stream
+heartbeat_interval = 15
+
+
+class EventLog(object):
+    '''
+    Numbered events shared by all listeners, listeners wait for the ones after the last they saw
+    '''
+    
+    def __init__(self, size=history_size):
+        self._events = collections.deque(maxlen=size)
+        self._last_id = 0
+        self._condition = threading.Condition()
+    
+    def publish(self, event_type, data):
+        with self._condition:
+            self._last_id += 1
+            self._events.append({'id': self._last_id, 'type': event_type, 'data': data})
+            self._condition.notify_all()
+    
+    def getLastId(self):
+        return self._last_id
+    
+    def since(self, last_id, timeout=0):
+        '''
+        Return the events after last_id, waiting up to timeout seconds for one to be published
+        '''
+        with self._condition:
+            if self._last_id <= last_id and timeout:
+                self._condition.wait(timeout)
+            return [event for event in self._events if event['id'] > last_id]
+
+
+# the event log and the watchers live in the process memory, every process of a
+# multi-process deployment polls the providers on its own and numbers its events
+# on its own, run the WSGI application in a single process with threads
+event_log = EventLog()
+
+streams = threading.BoundedSemaphore(max_streams)
+
+
+class ProviderWatcher(object):
+    '''
+    Polls one provider for its listeners and publishes what changed: new transactions,
+    confirmations, balance and health. N listeners cost one poll.
+    '''
+    
+    def __init__(self, provider_id, events=event_log):
+        self.provider_id = provider_id
+        self.events = events
+        self.enabled = None
+        self.balance = None
+        self.confirmations = None
+        self.last_listened = 0
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def listen(self):
+        '''
+        Called by every listener, keeps the watcher polling
+        '''
+        self.last_listened = time.time()
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run)
+                self._thread.daemon = True
+                self._thread.start()
+    
+    def run(self):
+        try:
+            while time.time() - self.last_listened < idle_timeout:
+                self.poll()
+                time.sleep(poll_interval)
+        finally:
+            connection.close()
+    
+    def poll(self):
+        '''
+        Compare the provider with the previous poll and publish the differences,
+        the first poll only records the state
+        '''
+        enabled = connector.config.get(self.provider_id, {}).get('enabled', False) is True
+        if self.enabled is not None and enabled != self.enabled:
+            self.events.publish('health', {'provider_id': self.provider_id, 'enabled': enabled})
+        self.enabled = enabled
+        if not enabled:
+            return
+        
+        # the blocks within the confirmation limit, like the unconfirmed tracker reads them
+        tip_height = connector.getBlockCount(self.provider_id)
+        if tip_height is None:
+            return
+        limit = MainConfig['globals']['confirmation_limit']
+        since_hash = connector.getBlockHash(self.provider_id, max(tip_height - limit - 1, 0))
+        since_block = connector.listSinceBlock(self.provider_id, since_hash or "", 1)
+        if not since_block:
+            return
+        
+        confirmations = {}
+        for entry in since_block.get('transactions', []):
+            entry_key = mirror.getEntryKey(entry)
+            if entry_key in confirmations:
+                continue
+            confirmations[entry_key] = entry.get('confirmations', 0)
+            if self.confirmations is None:
+                continue
+            
+            if entry_key not in self.confirmations:
+                self.events.publish('transaction', {
+                                                    'provider_id': self.provider_id,
+                                                    'entry_key': entry_key,
+                                                    'txid': entry.get('txid', ""),
+                                                    'category': entry.get('category', ""),
+                                                    'account': entry.get('account', ""),
+                                                    'amount': misc.longNumber(entry.get('amount', 0)),
+                                                    'confirmations': confirmations[entry_key],
+                                                    'time': entry.get('time', 0),
+                                                    })
+            elif self.confirmations[entry_key] != confirmations[entry_key]:
+                self.events.publish('confirmations', {'provider_id': self.provider_id, 'entry_key': entry_key, 'confirmations': confirmations[entry_key], 'limit': limit})
+        self.confirmations = confirmations
+        
+        balance = connector.getBalance(self.provider_id).get(self.provider_id, None)
+        if balance is not None:
+            if self.balance is not None and balance != self.balance:
+                self.events.publish('balance', {'provider_id': self.provider_id, 'balance': misc.longNumber(balance)})
+            self.balance = balance
+
+
+watchers = {}
+watchers_lock = threading.Lock()
+
+
+def getWatcher(provider_id):
+    with watchers_lock:
+        if provider_id not in watchers:
+            watchers[provider_id] = ProviderWatcher(provider_id)
+        return watchers[provider_id]
+
+
+def listen(provider_ids):
+    '''
+    Keep the watchers of provider_ids polling
+    '''
+    for provider_id in provider_ids:
+        getWatcher(provider_id).listen()
+
+
+def formatEvent(event):
+    '''
+    Format an event for a text/event-stream
+    '''
+    return "id: %s\nevent: %s\ndata: %s\n\n" % (event['id'], event['type'], json.dumps(event['data']))
+
+
+def getEvents(provider_ids, last_id, timeout):
+    '''
+    Return the events of provider_ids after last_id, waiting up to timeout seconds, and the new last_id
+    '''
+    # ids of a previous process are newer than anything published here
+    if last_id > event_log.getLastId():
+        last_id = event_log.getLastId()
+    
+    listen(provider_ids)
+    events = event_log.since(last_id, timeout)
+    if events:
+        last_id = events[-1]['id']
+    return [event for event in events if event['data'].get('provider_id') in provider_ids], last_id
+
+
+def streamEvents(provider_ids, last_id, duration=stream_duration):
+    '''
+    Generator of the text/event-stream of provider_ids after event last_id
+    '''
+    if not streams.acquire(False):
+        # all the streams are open, send what is pending and let the browser come back later
+        yield "retry: %s\n\n" % (heartbeat_interval * 1000)
+        for event in getEvents(provider_ids, last_id, 0)[0]:
+            yield formatEvent(event)
+        return
+    
+    try:
+        # tell the browser how long to wait before reconnecting
+        yield "retry: %s\n\n" % (poll_interval * 1000)
+        
+        ends = time.time() + duration
+        while time.time() < ends:
+            events, last_id = getEvents(provider_ids, last_id, heartbeat_interval)
+            if not events:
+                yield ": heartbeat\n\n"
+            for event in events:
+                yield formatEvent(event)
+    finally:
+        streams.release()
@@ -0,0 +1,48 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from mybitbank.apps.transactions import mirror, rollups, search, unconfirmed
+
+
+class Command(BaseCommand):
+    '''
+    Sync the local transaction mirror from the currency providers and index the new entries
+    '''
+    help = 'Sync the local transaction mirror with listsinceblock, once or every --interval seconds'
+    
+    option_list = BaseCommand.option_list + (
+        make_option('--interval', type='int', dest='interval', default=0,
+                    help='Keep running and sync every INTERVAL seconds'),
+        make_option('--provider', type='int', dest='provider_id', default=None,
+                    help='Sync only this provider id'),
+        make_option('--rebuild-rollups', action='store_true', dest='rebuild_rollups', default=False,
+                    help='Recompute the daily rollups from the whole mirror before syncing'),
+    )
+    
+    def handle(self, *args, **options):
+        if options['rebuild_rollups']:
+            provider_ids = [options['provider_id']] if options['provider_id'] else mirror.connector.config.keys()
+            for provider_id in provider_ids:
+                rollups.rebuildProvider(provider_id)
+        
+        while True:
+            if options['provider_id']:
+                results = {options['provider_id']: mirror.syncProvider(options['provider_id'])}
+            else:
+                results = mirror.syncAll()
+            
+            for provider_id, stored in results.items():
+                if stored is None:
+                    self.stderr.write("provider %s: not reachable" % provider_id)
+                    continue
+                
+                indexed = search.indexProvider(provider_id)
+                unconfirmed.refresh(provider_id)
+                if int(options['verbosity']) > 1:
+                    self.stdout.write("provider %s: %s entries, %s search terms" % (provider_id, stored, indexed))
+            
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
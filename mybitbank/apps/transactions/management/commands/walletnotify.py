@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from mybitbank.apps.transactions import unconfirmed
+
+
+class Command(BaseCommand):
+    '''
+    walletnotify hook of the unconfirmed transactions tracker, to be set in the xxxcoin.conf as
+    walletnotify=/path/to/manage.py walletnotify <provider id> %s
+    '''
+    args = '<provider id> <txid>'
+    help = 'Update the unconfirmed transactions tracker with a wallet transaction'
+    
+    def handle(self, *args, **options):
+        if len(args) != 2 or not args[0].isdigit():
+            raise CommandError("Usage: walletnotify %s" % self.args)
+        
+        if not unconfirmed.notify(int(args[0]), args[1]):
+            raise CommandError("Could not update transaction %s of provider %s" % (args[1], args[0]))
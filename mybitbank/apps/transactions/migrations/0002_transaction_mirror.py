@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'TransactionMirrorState'
+        db.create_table(u'transactions_transactionmirrorstate', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('provider_id', self.gf('django.db.models.fields.IntegerField')(unique=True)),
+            ('lastblock', self.gf('django.db.models.fields.CharField')(max_length=64)),
+            ('updated', self.gf('django.db.models.fields.DateTimeField')()),
+        ))
+        db.send_create_signal(u'transactions', ['TransactionMirrorState'])
+
+        # Adding model 'TransactionMirror'
+        db.create_table(u'transactions_transactionmirror', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('provider_id', self.gf('django.db.models.fields.IntegerField')()),
+            ('entry_key', self.gf('django.db.models.fields.CharField')(max_length=40)),
+            ('txid', self.gf('django.db.models.fields.CharField')(max_length=64, db_index=True)),
+            ('category', self.gf('django.db.models.fields.CharField')(max_length=12)),
+            ('account', self.gf('django.db.models.fields.CharField')(max_length=200)),
+            ('otheraccount', self.gf('django.db.models.fields.CharField')(max_length=200)),
+            ('address', self.gf('django.db.models.fields.CharField')(max_length=200, db_index=True)),
+            ('vout', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('amount', self.gf('django.db.models.fields.DecimalField')(max_digits=20, decimal_places=8)),
+            ('fee', self.gf('django.db.models.fields.DecimalField')(null=True, max_digits=20, decimal_places=8)),
+            ('confirmations', self.gf('django.db.models.fields.IntegerField')()),
+            ('blockhash', self.gf('django.db.models.fields.CharField')(max_length=64, db_index=True)),
+            ('blockindex', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('blocktime', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('time', self.gf('django.db.models.fields.IntegerField')()),
+            ('timereceived', self.gf('django.db.models.fields.IntegerField')(null=True)),
+            ('comment', self.gf('django.db.models.fields.CharField')(max_length=500)),
+            ('comment_to', self.gf('django.db.models.fields.CharField')(max_length=500)),
+        ))
+        db.send_create_signal(u'transactions', ['TransactionMirror'])
+
+        # Adding unique constraint on 'TransactionMirror', fields ['provider_id', 'entry_key']
+        db.create_unique(u'transactions_transactionmirror', ['provider_id', 'entry_key'])
+
+        # Adding index on 'TransactionMirror', fields ['provider_id', 'time']
+        db.create_index(u'transactions_transactionmirror', ['provider_id', 'time'])
+
+        # Adding index on 'TransactionMirror', fields ['provider_id', 'account', 'time']
+        db.create_index(u'transactions_transactionmirror', ['provider_id', 'account', 'time'])
+
+
+    def backwards(self, orm):
+        # Removing index on 'TransactionMirror', fields ['provider_id', 'account', 'time']
+        db.delete_index(u'transactions_transactionmirror', ['provider_id', 'account', 'time'])
+
+        # Removing index on 'TransactionMirror', fields ['provider_id', 'time']
+        db.delete_index(u'transactions_transactionmirror', ['provider_id', 'time'])
+
+        # Removing unique constraint on 'TransactionMirror', fields ['provider_id', 'entry_key']
+        db.delete_unique(u'transactions_transactionmirror', ['provider_id', 'entry_key'])
+
+        # Deleting model 'TransactionMirrorState'
+        db.delete_table(u'transactions_transactionmirrorstate')
+
+        # Deleting model 'TransactionMirror'
+        db.delete_table(u'transactions_transactionmirror')
+
+
+    models = {
+        u'transactions.transactionmirror': {
+            'Meta': {'unique_together': "(('provider_id', 'entry_key'),)", 'object_name': 'TransactionMirror', 'index_together': "[['provider_id', 'time'], ['provider_id', 'account', 'time']]"},
+            'account': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'address': ('django.db.models.fields.CharField', [], {'max_length': '200', 'db_index': 'True'}),
+            'amount': ('django.db.models.fields.DecimalField', [], {'max_digits': '20', 'decimal_places': '8'}),
+            'blockhash': ('django.db.models.fields.CharField', [], {'max_length': '64', 'db_index': 'True'}),
+            'blockindex': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'blocktime': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'category': ('django.db.models.fields.CharField', [], {'max_length': '12'}),
+            'comment': ('django.db.models.fields.CharField', [], {'max_length': '500'}),
+            'comment_to': ('django.db.models.fields.CharField', [], {'max_length': '500'}),
+            'confirmations': ('django.db.models.fields.IntegerField', [], {}),
+            'entry_key': ('django.db.models.fields.CharField', [], {'max_length': '40'}),
+            'fee': ('django.db.models.fields.DecimalField', [], {'null': 'True', 'max_digits': '20', 'decimal_places': '8'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'otheraccount': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {}),
+            'time': ('django.db.models.fields.IntegerField', [], {}),
+            'timereceived': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'txid': ('django.db.models.fields.CharField', [], {'max_length': '64', 'db_index': 'True'}),
+            'vout': ('django.db.models.fields.IntegerField', [], {'null': 'True'})
+        },
+        u'transactions.transactionmirrorstate': {
+            'Meta': {'object_name': 'TransactionMirrorState'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'lastblock': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {'unique': 'True'}),
+            'updated': ('django.db.models.fields.DateTimeField', [], {})
+        }
+    }
+
+    complete_apps = ['transactions']
\ No newline at end of file
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from south.utils import datetime_utils as datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'TransactionDailyRollup'
+        db.create_table(u'transactions_transactiondailyrollup', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('provider_id', self.gf('django.db.models.fields.IntegerField')()),
+            ('account', self.gf('django.db.models.fields.CharField')(max_length=200)),
+            ('day', self.gf('django.db.models.fields.DateField')()),
+            ('count', self.gf('django.db.models.fields.IntegerField')(default=0)),
+            ('received', self.gf('django.db.models.fields.DecimalField')(default=0, max_digits=20, decimal_places=8)),
+            ('sent', self.gf('django.db.models.fields.DecimalField')(default=0, max_digits=20, decimal_places=8)),
+            ('fees', self.gf('django.db.models.fields.DecimalField')(default=0, max_digits=20, decimal_places=8)),
+            ('balance', self.gf('django.db.models.fields.DecimalField')(default=0, max_digits=20, decimal_places=8)),
+        ))
+        db.send_create_signal(u'transactions', ['TransactionDailyRollup'])
+
+        # Adding unique constraint on 'TransactionDailyRollup', fields ['provider_id', 'account', 'day']
+        db.create_unique(u'transactions_transactiondailyrollup', ['provider_id', 'account', 'day'])
+
+
+    def backwards(self, orm):
+        # Removing unique constraint on 'TransactionDailyRollup', fields ['provider_id', 'account', 'day']
+        db.delete_unique(u'transactions_transactiondailyrollup', ['provider_id', 'account', 'day'])
+
+        # Deleting model 'TransactionDailyRollup'
+        db.delete_table(u'transactions_transactiondailyrollup')
+
+
+    models = {
+        u'transactions.transactiondailyrollup': {
+            'Meta': {'unique_together': "(('provider_id', 'account', 'day'),)", 'object_name': 'TransactionDailyRollup'},
+            'account': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'balance': ('django.db.models.fields.DecimalField', [], {'default': '0', 'max_digits': '20', 'decimal_places': '8'}),
+            'count': ('django.db.models.fields.IntegerField', [], {'default': '0'}),
+            'day': ('django.db.models.fields.DateField', [], {}),
+            'fees': ('django.db.models.fields.DecimalField', [], {'default': '0', 'max_digits': '20', 'decimal_places': '8'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {}),
+            'received': ('django.db.models.fields.DecimalField', [], {'default': '0', 'max_digits': '20', 'decimal_places': '8'}),
+            'sent': ('django.db.models.fields.DecimalField', [], {'default': '0', 'max_digits': '20', 'decimal_places': '8'})
+        },
+        u'transactions.transactionmirror': {
+            'Meta': {'unique_together': "(('provider_id', 'entry_key'),)", 'object_name': 'TransactionMirror', 'index_together': "[['provider_id', 'time'], ['provider_id', 'account', 'time']]"},
+            'account': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'address': ('django.db.models.fields.CharField', [], {'max_length': '200', 'db_index': 'True'}),
+            'amount': ('django.db.models.fields.DecimalField', [], {'max_digits': '20', 'decimal_places': '8'}),
+            'blockhash': ('django.db.models.fields.CharField', [], {'max_length': '64', 'db_index': 'True'}),
+            'blockindex': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'blocktime': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'category': ('django.db.models.fields.CharField', [], {'max_length': '12'}),
+            'comment': ('django.db.models.fields.CharField', [], {'max_length': '500'}),
+            'comment_to': ('django.db.models.fields.CharField', [], {'max_length': '500'}),
+            'confirmations': ('django.db.models.fields.IntegerField', [], {}),
+            'entry_key': ('django.db.models.fields.CharField', [], {'max_length': '40'}),
+            'fee': ('django.db.models.fields.DecimalField', [], {'null': 'True', 'max_digits': '20', 'decimal_places': '8'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'indexed': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'otheraccount': ('django.db.models.fields.CharField', [], {'max_length': '200'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {}),
+            'time': ('django.db.models.fields.IntegerField', [], {}),
+            'timereceived': ('django.db.models.fields.IntegerField', [], {'null': 'True'}),
+            'txid': ('django.db.models.fields.CharField', [], {'max_length': '64', 'db_index': 'True'}),
+            'vout': ('django.db.models.fields.IntegerField', [], {'null': 'True'})
+        },
+        u'transactions.transactionmirrorstate': {
+            'Meta': {'object_name': 'TransactionMirrorState'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'lastblock': ('django.db.models.fields.CharField', [], {'max_length': '64'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {'unique': 'True'}),
+            'updated': ('django.db.models.fields.DateTimeField', [], {})
+        },
+        u'transactions.transactionsearchterm': {
+            'Meta': {'object_name': 'TransactionSearchTerm', 'index_together': "[['field', 'term']]"},
+            'entry': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'search_terms'", 'to': u"orm['transactions.TransactionMirror']"}),
+            'field': ('django.db.models.fields.CharField', [], {'max_length': '10'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'provider_id': ('django.db.models.fields.IntegerField', [], {}),
+            'term': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        }
+    }
+
+    complete_apps = ['transactions']
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import datetime
+
+from django.db import transaction as db_transaction
+from django.utils.timezone import utc
+
+from models import TransactionMirror, TransactionMirrorState
+import rollups
+from mybitbank.libs.connections import connector
+from mybitbank.libs.entities.transactionmirror import getEntryKey, isSynced, getLastBlock, toEntry, filterMirrored, listTransactions, countTransactions, listTransactionsByCursor
+from mybitbank.libs.misc import findForkHeight, pinBlockHeights
+
+
+# blocks re-scanned on every sync, confirmations and reorgs inside this depth are picked up again
+target_confirmations = 6
+
+# number of newest wallet entries scanned for account moves, they are not returned by listsinceblock
+moves_window = 200
+
+# recent blocks with mirrored entries that are compared with the chain on every sync
+reorg_depth = 500
+
+
+def getEntryValues(entry):
+    '''
+    Map a transaction entry to TransactionMirror field values
+    '''
+    return {
+            'txid': entry.get('txid', ''),
+            'category': entry.get('category', ''),
+            'account': entry.get('account', ''),
+            'otheraccount': entry.get('otheraccount', ''),
+            'address': entry.get('address', ''),
+            'vout': entry.get('vout', None),
+            'amount': entry.get('amount', 0),
+            'fee': entry.get('fee', None),
+            'confirmations': entry.get('confirmations', 0),
+            'blockhash': entry.get('blockhash', ''),
+            'blockheight': entry.get('blockheight', None),
+            'blockindex': entry.get('blockindex', None),
+            'blocktime': entry.get('blocktime', None),
+            'time': entry.get('time', 0),
+            'timereceived': entry.get('timereceived', None),
+            'comment': entry.get('comment', ''),
+            'comment_to': entry.get('to', ''),
+            }
+
+
+def getChanges(row, values):
+    '''
+    Return the field values of an entry that differ from its mirrored row. The confirmations
+    of a row pinned to a block height follow the tip on read and are not compared
+    '''
+    changes = {}
+    for field, value in values.items():
+        current = getattr(row, field)
+        if field in ['amount', 'fee']:
+            if (current is None) != (value is None) or rollups.toDecimal(current) != rollups.toDecimal(value):
+                changes[field] = value
+        elif field == 'confirmations':
+            if (row.blockheight is None or row.blockheight != values['blockheight']) and current != value:
+                changes[field] = value
+        elif current != value:
+            changes[field] = value
+    return changes
+
+
+def storeEntries(provider_id, entries, chunk_size=500):
+    '''
+    Insert new entries in bulk and update the mirrored ones that changed, one UPDATE per
+    group of rows getting the same changes
+    '''
+    values_by_key = {}
+    for entry in entries:
+        values_by_key[getEntryKey(entry)] = getEntryValues(entry)
+    
+    keys = values_by_key.keys()
+    existing_rows = {}
+    for i in range(0, len(keys), chunk_size):
+        for row in TransactionMirror.objects.filter(provider_id=provider_id, entry_key__in=keys[i:i + chunk_size]):
+            existing_rows[row.entry_key] = row
+    
+    new_rows = [TransactionMirror(provider_id=provider_id, entry_key=key, **values_by_key[key]) for key in keys if key not in existing_rows]
+    TransactionMirror.objects.bulk_create(new_rows, batch_size=chunk_size)
+    rollups.applyRows(provider_id, new_rows)
+    
+    # the entries of a block get confirmed together and end up in the same group
+    updates = {}
+    old_rows, moved_rows = [], []
+    for key, row in existing_rows.items():
+        changes = getChanges(row, values_by_key[key])
+        if changes:
+            updates.setdefault(tuple(sorted(changes.items())), []).append(key)
+        
+        # an entry that got another time or fee moves in the rollups
+        if 'time' in changes or 'fee' in changes:
+            old_rows.append(row)
+            moved_rows.append(TransactionMirror(provider_id=provider_id, entry_key=key, **values_by_key[key]))
+    
+    if moved_rows:
+        rollups.replaceRows(provider_id, old_rows, moved_rows)
+    
+    for changes, update_keys in updates.items():
+        for i in range(0, len(update_keys), chunk_size):
+            TransactionMirror.objects.filter(provider_id=provider_id, entry_key__in=update_keys[i:i + chunk_size]).update(**dict(changes))
+    
+    return len(new_rows)
+
+
+def dropRows(provider_id, rows):
+    '''
+    Delete mirrored rows and take them out of the rollups
+    '''
+    rollups.applyRows(provider_id, rows, -1)
+    TransactionMirror.objects.filter(id__in=[row.id for row in rows]).delete()
+
+
+def dropOrphaned(provider_id, tip_height):
+    '''
+    Compare the blocks of the recent mirrored entries with the chain, drop the entries of
+    orphaned blocks and rewind the sync cursor below the fork. Return the fork height or None
+    '''
+    # only heights the xxxcoind reports for the recorded block hashes are compared with the chain,
+    # rows pinned to a height derived from their confirmations are corrected on the way
+    recorded_blocks = {}
+    for blockheight, blockhash in TransactionMirror.objects.filter(provider_id=provider_id, blockheight__gt=tip_height - reorg_depth).exclude(blockhash='').values_list('blockheight', 'blockhash').distinct():
+        height = connector.getBlockHeight(provider_id, blockhash)
+        if height is None:
+            continue
+        if height != blockheight:
+            TransactionMirror.objects.filter(provider_id=provider_id, blockhash=blockhash).update(blockheight=height)
+        
+        # two recorded blocks at one height, one of them was orphaned
+        if recorded_blocks.get(height, blockhash) != blockhash:
+            blockhash = None
+        recorded_blocks[height] = blockhash
+    
+    fork_height = findForkHeight(recorded_blocks, tip_height, lambda height: connector.getBlockHash(provider_id, height), reorg_depth)
+    if fork_height is None:
+        return None
+    
+    dropRows(provider_id, list(TransactionMirror.objects.filter(provider_id=provider_id, blockheight__gte=fork_height)))
+    
+    # the entries that made it into the new chain come back with the next listsinceblock
+    TransactionMirrorState.objects.filter(provider_id=provider_id).update(lastblock=connector.getBlockHash(provider_id, fork_height - 1) or "")
+    return fork_height
+
+
+def syncProvider(provider_id):
+    '''
+    Bring the mirror of provider_id up to date with a listsinceblock delta call.
+    Return the number of entries stored or None if the provider could not be reached
+    '''
+    tip_height = connector.getBlockCount(provider_id)
+    if tip_height is None:
+        return None
+    
+    with db_transaction.commit_on_success():
+        dropOrphaned(provider_id, tip_height)
+    
+    try:
+        state = TransactionMirrorState.objects.get(provider_id=provider_id)
+        lastblock = state.lastblock
+    except TransactionMirrorState.DoesNotExist:
+        state = None
+        lastblock = ""
+    
+    # when lastblock has been orphaned the xxxcoind returns everything since the fork point
+    since_block = connector.listSinceBlock(provider_id, lastblock, target_confirmations)
+    if not since_block or not since_block.get('lastblock', False):
+        return None
+    
+    entries = since_block.get('transactions', [])
+    
+    # moves never make it into blocks, scan the whole history once and a small window afterwards
+    if state is None:
+        window = connector.listTransactionsByAccount("*", provider_id)
+    else:
+        window = connector.listTransactionsByAccount("*", provider_id, moves_window, 0)
+    entries = entries + [entry for entry in window if entry.get('category') == 'move']
+    
+    # store block heights so that confirmations can be computed from the tip on read
+    pinBlockHeights(entries, connector.getBlockCount(provider_id) or tip_height)
+    
+    with db_transaction.commit_on_success():
+        # entries removed from the chain by a reorg
+        removed_keys = [getEntryKey(entry) for entry in since_block.get('removed', [])]
+        
+        # conflicted entries, and unconfirmed entries the xxxcoind does not return anymore
+        # because they were evicted or double spent
+        removed_keys = removed_keys + [getEntryKey(entry) for entry in entries if entry.get('confirmations', 0) < 0]
+        entries = [entry for entry in entries if entry.get('confirmations', 0) >= 0]
+        if state is not None:
+            returned_keys = set([getEntryKey(entry) for entry in entries])
+            unconfirmed_keys = TransactionMirror.objects.filter(provider_id=provider_id, confirmations__lte=0).exclude(category='move').values_list('entry_key', flat=True)
+            removed_keys = removed_keys + [key for key in unconfirmed_keys if key not in returned_keys]
+        
+        if removed_keys:
+            dropRows(provider_id, list(TransactionMirror.objects.filter(provider_id=provider_id, entry_key__in=removed_keys)))
+        
+        storeEntries(provider_id, entries)
+        
+        now = datetime.datetime.utcnow().replace(tzinfo=utc)
+        if state is None:
+            TransactionMirrorState.objects.create(provider_id=provider_id, lastblock=since_block['lastblock'], updated=now)
+        else:
+            TransactionMirrorState.objects.filter(provider_id=provider_id).update(lastblock=since_block['lastblock'], updated=now)
+    
+    return len(entries)
+
+
+def syncAll():
+    '''
+    Sync the mirror of every enabled currency provider
+    '''
+    results = {}
+    for provider_id in connector.config.keys():
+        results[provider_id] = syncProvider(provider_id)
+    return results
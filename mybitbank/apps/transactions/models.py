@@ -1,4 +1,93 @@
 from django.db import models
 
 
-# Create your models here.
+class TransactionMirror(models.Model):
+    '''
+    Local copy of a wallet transaction entry (one row per listtransactions entry)
+    '''
+    provider_id = models.IntegerField()
+    entry_key = models.CharField(max_length=40)
+    txid = models.CharField(max_length=64, db_index=True)
+    category = models.CharField(max_length=12)
+    account = models.CharField(max_length=200)
+    otheraccount = models.CharField(max_length=200)
+    address = models.CharField(max_length=200, db_index=True)
+    vout = models.IntegerField(null=True)
+    amount = models.DecimalField(max_digits=20, decimal_places=8)
+    fee = models.DecimalField(max_digits=20, decimal_places=8, null=True)
+    confirmations = models.IntegerField()
+    blockhash = models.CharField(max_length=64, db_index=True)
+    blockheight = models.IntegerField(null=True)
+    blockindex = models.IntegerField(null=True)
+    blocktime = models.IntegerField(null=True)
+    time = models.IntegerField()
+    timereceived = models.IntegerField(null=True)
+    comment = models.CharField(max_length=500)
+    comment_to = models.CharField(max_length=500)
+    indexed = models.BooleanField(default=False)
+    
+    class Meta:
+        unique_together = (('provider_id', 'entry_key'),)
+        index_together = [
+                          ['provider_id', 'time'],
+                          ['provider_id', 'account', 'time'],
+                          ]
+
+
+class TransactionMirrorState(models.Model):
+    '''
+    Sync cursor of the transaction mirror, one row per currency provider
+    '''
+    provider_id = models.IntegerField(unique=True)
+    lastblock = models.CharField(max_length=64)
+    updated = models.DateTimeField('date updated')
+
+
+class TransactionSearchTerm(models.Model):
+    '''
+    Inverted index of the mirrored transactions, one row per searchable term of an entry
+    '''
+    entry = models.ForeignKey(TransactionMirror, related_name='search_terms')
+    provider_id = models.IntegerField()
+    field = models.CharField(max_length=10)
+    term = models.CharField(max_length=100)
+    
+    class Meta:
+        index_together = [
+                          ['field', 'term'],
+                          ]
+
+
+class TransactionDailyRollup(models.Model):
+    '''
+    Per-day aggregates of the mirrored transactions of an account, account "*" holds the wallet totals
+    '''
+    provider_id = models.IntegerField()
+    account = models.CharField(max_length=200)
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+    received = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    sent = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    fees = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    balance = models.DecimalField(max_digits=20, decimal_places=8, default=0)
+    
+    class Meta:
+        unique_together = (('provider_id', 'account', 'day'),)
+
+
+class UnconfirmedTransaction(models.Model):
+    '''
+    Hot set of the wallet entries that have not yet reached the confirmation limit
+    '''
+    provider_id = models.IntegerField()
+    entry_key = models.CharField(max_length=40)
+    txid = models.CharField(max_length=64)
+    category = models.CharField(max_length=20)
+    account = models.CharField(max_length=200)
+    address = models.CharField(max_length=200)
+    amount = models.DecimalField(max_digits=20, decimal_places=8)
+    blockheight = models.IntegerField(null=True)
+    time = models.IntegerField()
+    
+    class Meta:
+        unique_together = (('provider_id', 'entry_key'),)
@@ -0,0 +1,172 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import datetime
+from decimal import Decimal
+
+from django.db.models import F
+
+from models import TransactionMirror, TransactionDailyRollup
+
+
+# account name of the wallet-wide rollups
+wallet_account = "*"
+
+
+def toDecimal(value):
+    '''
+    Convert an amount to Decimal, floats coming from the JSON-RPC go through repr to keep all 8 decimals
+    '''
+    if value is None:
+        return Decimal(0)
+    elif isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def getDay(timestamp):
+    '''
+    Return the UTC date of a timestamp
+    '''
+    return datetime.datetime.utcfromtimestamp(timestamp).date()
+
+
+def getDeltas(rows, sign=1, deltas=None):
+    '''
+    Sum the mirrored rows per (account, day), sign -1 gives the deltas of removing them.
+    The sums are added to deltas when given
+    '''
+    if deltas is None:
+        deltas = {}
+    for row in rows:
+        amount = toDecimal(row.amount)
+        fee = toDecimal(row.fee)
+        for account in [row.account, wallet_account]:
+            key = (account, getDay(row.time))
+            delta = deltas.setdefault(key, {'count': 0, 'received': Decimal(0), 'sent': Decimal(0), 'fees': Decimal(0), 'balance': Decimal(0)})
+            delta['count'] = delta['count'] + sign
+            if row.category in ['receive', 'generate', 'immature'] and amount > 0:
+                delta['received'] = delta['received'] + sign * amount
+            elif row.category == 'send':
+                delta['sent'] = delta['sent'] - sign * amount
+            delta['fees'] = delta['fees'] - sign * fee
+            delta['balance'] = delta['balance'] + sign * (amount + fee)
+    
+    return deltas
+
+
+def applyDeltas(provider_id, deltas):
+    '''
+    Add per (account, day) deltas to the daily rollups. The closing balances are moved in one
+    cumulative pass: every day after the first changed one is updated once, by the sum of the
+    balance deltas up to it
+    '''
+    days_by_account = {}
+    for (account, day), delta in deltas.items():
+        days_by_account.setdefault(account, []).append(day)
+    
+    for account, days in days_by_account.items():
+        days.sort()
+        rollups = TransactionDailyRollup.objects.filter(provider_id=provider_id, account=account)
+        
+        # the days without a rollup start from the closing balance of the day before them
+        closing_balances = list(rollups.filter(day__gte=days[0]).order_by('day').values_list('day', 'balance'))
+        previous = rollups.filter(day__lt=days[0]).order_by('-day')[:1]
+        opening_balance = previous[0].balance if previous else Decimal(0)
+        existing_days = set([day for day, balance in closing_balances])
+        new_rollups = []
+        for day in days:
+            if day not in existing_days:
+                balance = opening_balance
+                for closing_day, closing_balance in closing_balances:
+                    if closing_day > day:
+                        break
+                    balance = closing_balance
+                new_rollups.append(TransactionDailyRollup(provider_id=provider_id, account=account, day=day, balance=balance))
+        TransactionDailyRollup.objects.bulk_create(new_rollups)
+        
+        shift = Decimal(0)
+        for index, day in enumerate(days):
+            delta = deltas[(account, day)]
+            rollups.filter(day=day).update(count=F('count') + delta['count'],
+                                           received=F('received') + delta['received'],
+                                           sent=F('sent') + delta['sent'],
+                                           fees=F('fees') + delta['fees'])
+            
+            # the days up to the next changed one move by the same amount
+            shift = shift + delta['balance']
+            following = rollups.filter(day__gte=day)
+            if index + 1 < len(days):
+                following = following.filter(day__lt=days[index + 1])
+            if shift:
+                following.update(balance=F('balance') + shift)
+
+
+def applyRows(provider_id, rows, sign=1):
+    '''
+    Add (or with sign -1 subtract) mirrored rows to the daily rollups, the closing balances
+    of all the following days move along
+    '''
+    applyDeltas(provider_id, getDeltas(rows, sign))
+
+
+def replaceRows(provider_id, old_rows, new_rows):
+    '''
+    Move mirrored rows whose day or fee changed from their old to their new values
+    '''
+    applyDeltas(provider_id, getDeltas(new_rows, 1, getDeltas(old_rows, -1)))
+
+
+def rebuildProvider(provider_id, chunk_size=1000):
+    '''
+    Recompute the rollups of provider_id from the whole mirror
+    '''
+    TransactionDailyRollup.objects.filter(provider_id=provider_id).delete()
+    
+    last_id = 0
+    while True:
+        rows = list(TransactionMirror.objects.filter(provider_id=provider_id, id__gt=last_id).order_by('id')[:chunk_size])
+        if not rows:
+            break
+        applyRows(provider_id, rows)
+        last_id = rows[-1].id
+
+
+def getSeries(provider_id, account=wallet_account, since=None, until=None):
+    '''
+    Return the opening balance before since and the daily rollups from since to until
+    '''
+    rollups = TransactionDailyRollup.objects.filter(provider_id=provider_id, account=account)
+    
+    opening_balance = Decimal(0)
+    if since is not None:
+        previous = rollups.filter(day__lt=since).order_by('-day')[:1]
+        if previous:
+            opening_balance = previous[0].balance
+        rollups = rollups.filter(day__gte=since)
+    if until is not None:
+        rollups = rollups.filter(day__lte=until)
+    
+    return opening_balance, list(rollups.order_by('day'))
@@ -0,0 +1,214 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Q
+
+from models import TransactionMirror, TransactionSearchTerm
+import rollups
+from mybitbank.apps.accounts.models import addressAliases
+from mybitbank.apps.addressbook.models import savedAddress
+from mybitbank.libs.connections import connector
+from mybitbank.libs.entities import getWalletByProviderId
+from mybitbank.libs.misc import addresscodec
+import mirror
+
+
+# shortest txid prefix that is looked up in the index
+min_txid_prefix = 4
+
+# words of comments shorter than this are not indexed
+min_word_length = 2
+
+word_pattern = re.compile(r"\w+", re.UNICODE)
+hex_pattern = re.compile(r"^[0-9a-f]+$")
+
+
+def getWords(text):
+    '''
+    Split free text into lowercase index terms
+    '''
+    return [word[:100] for word in word_pattern.findall(text.lower()) if len(word) >= min_word_length]
+
+
+def getSenderAddress(raw_transaction, currency, net):
+    '''
+    Decode the sender address out of the first input script signature, None if there is none
+    '''
+    try:
+        pubkey = raw_transaction['vin'][0]['scriptSig']['asm'].split()[1]
+        return addresscodec.pubkeyToAddress(pubkey, currency, net)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def getAmountTerm(amount):
+    '''
+    Index term of an amount, sent and received amounts are found alike
+    '''
+    return str(abs(rollups.toDecimal(amount)).quantize(Decimal("0.00000001")))
+
+
+def getTerms(mirrored, sender_address=None):
+    '''
+    Return the (field, term) pairs a mirrored entry is found by
+    '''
+    terms = set()
+    if mirrored.txid:
+        terms.add(('txid', mirrored.txid.lower()))
+    if mirrored.address:
+        terms.add(('address', mirrored.address))
+    if sender_address:
+        terms.add(('address', sender_address))
+    if mirrored.amount:
+        terms.add(('amount', getAmountTerm(mirrored.amount)))
+    
+    for word in getWords(mirrored.comment) + getWords(mirrored.comment_to):
+        terms.add(('text', word))
+    
+    return terms
+
+
+def indexEntries(provider_id, mirrored_rows):
+    '''
+    Add the terms of mirrored entries to the search index, the sender addresses of
+    receive entries are decoded with a single batch call. Transactions getrawtransaction
+    does not know are decoded from the wallet copy gettransaction returns. Receive entries
+    whose transaction could not be fetched at all stay unindexed and are tried again on the next run
+    '''
+    if not mirrored_rows:
+        return 0
+    
+    sender_addresses = {}
+    receive_txids = set([row.txid for row in mirrored_rows if row.category == 'receive' and row.txid])
+    if receive_txids:
+        wallet = getWalletByProviderId(connector, provider_id)
+        currency, net = wallet.getCurrencyCode(), wallet.getNet()
+        raw_transactions = connector.getRawTransactions(list(receive_txids), provider_id)
+        for txid in receive_txids:
+            raw_transaction = raw_transactions.get(txid, None)
+            if not raw_transaction:
+                # nodes without txindex only find the transactions of the mempool
+                transaction = connector.getTransaction(txid, provider_id)
+                if transaction and transaction.get('hex', False):
+                    raw_transaction = connector.decodeRawTransaction(transaction['hex'], provider_id)
+            if raw_transaction:
+                sender_addresses[txid] = getSenderAddress(raw_transaction, currency, net)
+    
+    search_terms = []
+    for row in mirrored_rows:
+        sender_address = sender_addresses.get(row.txid, None) if row.category == 'receive' else None
+        for field, term in getTerms(row, sender_address):
+            search_terms.append(TransactionSearchTerm(entry=row, provider_id=provider_id, field=field, term=term))
+    
+    TransactionSearchTerm.objects.filter(entry__in=mirrored_rows).delete()
+    TransactionSearchTerm.objects.bulk_create(search_terms)
+    resolved_rows = [row for row in mirrored_rows if row.category != 'receive' or not row.txid or row.txid in sender_addresses]
+    TransactionMirror.objects.filter(id__in=[row.id for row in resolved_rows]).update(indexed=True)
+    return len(search_terms)
+
+
+def indexProvider(provider_id, chunk_size=500):
+    '''
+    Index the mirrored entries of provider_id that are not in the search index yet
+    '''
+    indexed = 0
+    last_id = 0
+    while True:
+        mirrored_rows = list(TransactionMirror.objects.filter(provider_id=provider_id, indexed=False, id__gt=last_id).order_by('id')[:chunk_size])
+        if not mirrored_rows:
+            break
+        indexed = indexed + indexEntries(provider_id, mirrored_rows)
+        last_id = mirrored_rows[-1].id
+    
+    return indexed
+
+
+def getNamedAddresses(name):
+    '''
+    Return the addresses whose alias or addressbook name contains name
+    '''
+    addresses = set()
+    for address_alias in addressAliases.objects.filter(alias__icontains=name, status__gt=1):
+        addresses.add(address_alias.address)
+    for saved_address in savedAddress.objects.filter(name__icontains=name, status__gt=1):
+        addresses.add(saved_address.address)
+    return addresses
+
+
+def search(query, provider_ids=None, limit=50):
+    '''
+    Search the mirrored transactions by txid prefix, address, alias or addressbook name,
+    comment words and amount. Return the matching entries newest first
+    '''
+    query = query.strip()
+    if not query:
+        return []
+    
+    matches = []
+    if hex_pattern.match(query.lower()) and len(query) >= min_txid_prefix:
+        # a range on the term index instead of a LIKE
+        matches.append(Q(field='txid', term__gte=query.lower(), term__lt=query.lower() + u"\xff"))
+    
+    addresses = getNamedAddresses(query)
+    addresses.add(query)
+    matches.append(Q(field='address', term__in=list(addresses)))
+    
+    words = getWords(query)
+    if len(words) == 1:
+        matches.append(Q(field='text', term=words[0]))
+    
+    try:
+        amount = Decimal(query)
+        if amount.is_finite():
+            matches.append(Q(field='amount', term=getAmountTerm(amount)))
+    except InvalidOperation:
+        pass
+    
+    terms = TransactionSearchTerm.objects.all()
+    if provider_ids is not None:
+        terms = terms.filter(provider_id__in=provider_ids)
+    
+    entry_match = Q(id__in=terms.filter(reduce(lambda a, b: a | b, matches)).values('entry_id'))
+    
+    # all the words of a phrase have to be in the comments
+    if len(words) > 1:
+        phrase_entries = TransactionMirror.objects.all()
+        for word in words:
+            phrase_entries = phrase_entries.filter(id__in=terms.filter(field='text', term=word).values('entry_id'))
+        entry_match = entry_match | Q(id__in=phrase_entries.values('id'))
+    
+    mirrored = TransactionMirror.objects.filter(entry_match)
+    if provider_ids is not None:
+        mirrored = mirrored.filter(provider_id__in=provider_ids)
+    
+    results = []
+    for row in mirrored.order_by('-time', '-id')[:limit]:
+        entry = mirror.toEntry(row)
+        entry['provider_id'] = row.provider_id
+        results.append(entry)
+    return results
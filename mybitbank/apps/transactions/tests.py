@@ -14,3 +14,591 @@ class SimpleTest(TestCase):
         Tests that 1 + 1 always equals 2.
         """
         self.assertEqual(1 + 1, 2)
+
+
+class MirrorTests(TestCase):
+    def setUp(self):
+        '''
+        Point the mirror to a stubbed connector
+        '''
+        from mybitbank.apps.transactions import mirror
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.mirror = mirror
+        self.original_connector = mirror.connector
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        mirror.connector = self.connector
+    
+    def tearDown(self):
+        self.mirror.connector = self.original_connector
+    
+    def test_syncProvider(self):
+        '''
+        Test that a synced mirror holds the same entries as the xxxcoind history
+        '''
+        self.assertFalse(self.mirror.isSynced(1))
+        
+        # the heights are derived from the tip, a cold block height cache costs no getblockheader calls
+        calls = []
+        self.connector.block_heights.clear()
+        self.connector.services[1].getblockheader = lambda blockhash: calls.append(blockhash)
+        self.mirror.syncProvider(1)
+        self.assertTrue(self.mirror.isSynced(1))
+        self.assertEquals(calls, [])
+        del self.connector.services[1].getblockheader
+        
+        history = self.connector.listTransactionsByAccount("*", 1, 1000, 0)
+        history_keys = set([self.mirror.getEntryKey(entry) for entry in history])
+        mirrored = self.mirror.listTransactions(1, None, 1000, 0)
+        self.assertEquals(len(history_keys), len(mirrored))
+        
+        # confirmed entries are pinned to their block height
+        for entry in mirrored:
+            self.assertEquals(entry['blockheight'], 263427 - entry['confirmations'] + 1)
+        
+        # a second sync must not duplicate anything
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), len(history_keys))
+    
+    def test_dropOrphaned(self):
+        '''
+        Test that entries of orphaned blocks are dropped and the sync cursor rewound
+        '''
+        self.mirror.syncProvider(1)
+        self.assertEquals(self.mirror.dropOrphaned(1, 263427), None)
+        mirrored = len(self.mirror.listTransactions(1, None, 1000, 0))
+        
+        self.connector.services[1].getblockhash = lambda height: "%064x" % height
+        # only the entry with 345 confirmations is recent enough to be checked
+        self.assertEquals(self.mirror.dropOrphaned(1, 263427), 263427 - 345 + 1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored - 1)
+        self.assertEquals(self.mirror.TransactionMirrorState.objects.get(provider_id=1).lastblock, "%064x" % (263427 - 345))
+        
+        self.connector.services[1].getblockhash = lambda height: "0000000000000009b4bec9a4374031762c7c9700eab2a9442336712fc769d7e7"
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored)
+    
+    def test_dropUnconfirmed(self):
+        '''
+        Test that unconfirmed entries the xxxcoind stops returning leave the mirror and the rollups
+        '''
+        from mybitbank.apps.transactions import rollups
+        self.mirror.syncProvider(1)
+        mirrored = len(self.mirror.listTransactions(1, None, 1000, 0))
+        balance = rollups.getSeries(1)[1][-1].balance
+        
+        service = self.connector.services[1]
+        listsinceblock = service.listsinceblock
+        pending = {'account': "pipes", 'address': "address for pipes account", 'category': "receive", 'amount': 2.5, 'confirmations': 0, 'txid': "cc" * 32, 'time': 1379839400}
+        
+        def pendingSinceBlock(blockhash="", target_confirmations=1):
+            since_block = listsinceblock(blockhash, target_confirmations)
+            since_block['transactions'].append(dict(pending))
+            return since_block
+        
+        service.listsinceblock = pendingSinceBlock
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored + 1)
+        self.assertNotEquals(rollups.getSeries(1)[1][-1].balance, balance)
+        
+        # double spent
+        pending['confirmations'] = -1
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored)
+        
+        pending['confirmations'] = 0
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored + 1)
+        
+        # evicted from the mempool
+        service.listsinceblock = listsinceblock
+        self.mirror.syncProvider(1)
+        self.assertEquals(len(self.mirror.listTransactions(1, None, 1000, 0)), mirrored)
+        self.assertEquals(rollups.getSeries(1)[1][-1].balance, balance)
+    
+    def test_storeEntries_unchanged(self):
+        '''
+        Test that entries which did not change are not written again
+        '''
+        entries = [dict(entry) for entry in self.connector.listTransactionsByAccount("*", 1, 1000, 0)]
+        for entry in entries:
+            entry['blockheight'] = self.connector.getBlockHeight(1, entry.get('blockhash', None))
+        self.mirror.storeEntries(1, entries)
+        
+        for entry in entries:
+            entry['confirmations'] = entry['confirmations'] + 1
+        with self.assertNumQueries(1):
+            self.assertEquals(self.mirror.storeEntries(1, entries), 0)
+        
+        # an entry that gets another time moves to its new day in the rollups
+        from mybitbank.apps.transactions import rollups
+        balance = rollups.getSeries(1)[1][-1].balance
+        moved = [dict(entry, time=entry['time'] + 86400 * 400) for entry in entries]
+        self.mirror.storeEntries(1, moved)
+        series = rollups.getSeries(1)[1]
+        first_day = rollups.getDay(min([entry['time'] for entry in moved]))
+        self.assertEquals(series[-1].balance, balance)
+        self.assertEquals(sum([rollup.count for rollup in series if rollup.day < first_day]), 0)
+        self.mirror.storeEntries(1, entries)
+        
+        # the entries of one block get one UPDATE
+        for entry in entries:
+            if entry.get('blockhash', None) == entries[0]['blockhash']:
+                entry['blocktime'] = entry['blocktime'] + 1
+        with self.assertNumQueries(2):
+            self.mirror.storeEntries(1, entries)
+    
+    def test_listTransactions_by_account(self):
+        '''
+        Test paging the mirror of a single account
+        '''
+        self.mirror.syncProvider(1)
+        history = self.connector.listTransactionsByAccount("pipes", 1, 1000, 0)
+        mirrored = self.mirror.listTransactions(1, "pipes", 1000, 0)
+        self.assertEquals(len(history), len(mirrored))
+        self.assertTrue(all(entry['account'] == "pipes" for entry in mirrored))
+        self.assertEquals(self.mirror.listTransactions(1, "pipes", 1, 0), mirrored[:1])
+
+
+class FeedTests(TestCase):
+    def setUp(self):
+        '''
+        Point the feed to a stubbed connector
+        '''
+        from mybitbank.apps.transactions import feed
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.feed = feed
+        self.original_connector = feed.connector
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        feed.connector = self.connector
+    
+    def tearDown(self):
+        self.feed.connector = self.original_connector
+    
+    def test_cursor(self):
+        '''
+        Test cursor encoding and decoding
+        '''
+        entry = {'time': 1379839327, 'entry_key': 'ab12', 'provider_id': 2}
+        self.assertEquals(self.feed.decodeCursor(self.feed.encodeCursor(entry)), (1379839327, 'ab12', 2))
+        self.assertEquals(self.feed.decodeCursor("not a cursor"), None)
+        self.assertEquals(self.feed.decodeCursor(None), None)
+        self.assertEquals(self.feed.decodeCursor(u"\xe9t\xe9"), None)
+        self.assertEquals(self.feed.decodeCursor("MTox"), None)
+    
+    def test_mergeStreams(self):
+        '''
+        Test merging of per provider streams newest first
+        '''
+        stream_1 = [{'time': 30, 'entry_key': 'a', 'provider_id': 1}, {'time': 10, 'entry_key': 'a', 'provider_id': 1}]
+        stream_2 = [{'time': 20, 'entry_key': 'b', 'provider_id': 2}, {'time': 10, 'entry_key': 'b', 'provider_id': 2}]
+        merged = self.feed.mergeStreams([stream_1, stream_2], 3)
+        self.assertEquals([(entry['time'], entry['provider_id']) for entry in merged], [(30, 1), (20, 2), (10, 2)])
+        
+        merged = self.feed.mergeStreams([list(reversed(stream_1)), list(reversed(stream_2))], 4, older=False)
+        self.assertEquals([(entry['time'], entry['provider_id']) for entry in merged], [(10, 1), (10, 2), (20, 2), (30, 1)])
+    
+    def test_getCoindStream(self):
+        '''
+        Test walking the xxxcoind history with cursors one entry at a time
+        '''
+        keys = set()
+        position = None
+        while True:
+            entries = self.feed.getCoindStream(1, position, True, 1)
+            if not entries:
+                break
+            self.assertTrue(position is None or self.feed.getPosition(entries[0]) < position)
+            position = self.feed.getPosition(entries[0])
+            keys.add(entries[0]['entry_key'])
+        
+        history = self.connector.listTransactionsByAccount("*", 1, 1000, 0)
+        self.assertEquals(keys, set([entry['entry_key'] for entry in history]))
+        
+        # and back again
+        newer = self.feed.getCoindStream(1, position, False, 1000)
+        self.assertEquals(set([entry['entry_key'] for entry in newer]), keys - set([position[1]]))
+    
+    def test_getFilters(self):
+        '''
+        Test reading filters from request parameters
+        '''
+        filters = self.feed.getFilters({'category': 'receive', 'min_amount': '1.5', 'max_amount': 'lots', 'since': '2013-09-22', 'until': '2013-09-22'})
+        self.assertEquals(filters['category'], 'receive')
+        self.assertEquals(str(filters['min_amount']), '1.5')
+        self.assertFalse('max_amount' in filters)
+        self.assertEquals(filters['since'], 1379808000)
+        self.assertEquals(filters['until'], 1379894399)
+    
+    def test_filtered_streams(self):
+        '''
+        Test that filtered streams return only matching entries and full pages
+        '''
+        from mybitbank.apps.transactions import mirror
+        
+        filters = {'account': 'pipes', 'min_amount': self.feed.Decimal('1')}
+        entries = self.feed.getCoindStream(1, None, True, 2, filters)
+        self.assertEquals(len(entries), 2)
+        self.assertTrue(all(self.feed.matchesFilters(entry, filters) for entry in entries))
+        
+        filters = {'account': 'pipes', 'since': 1379000000}
+        self.assertEquals(len(self.feed.getCoindStream(1, None, True, 10, filters)), 1)
+        
+        original_connector = mirror.connector
+        mirror.connector = self.connector
+        try:
+            mirror.syncProvider(1)
+        finally:
+            mirror.connector = original_connector
+        mirrored = self.feed.getProviderStream(1, None, True, 10, filters)
+        self.assertEquals([entry['amount'] for entry in mirrored], [self.feed.Decimal('12.20073359')])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        '''
+        Point the export to a stubbed connector
+        '''
+        from mybitbank.apps.transactions import export
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.export = export
+        self.original_connector = export.connector
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        export.connector = self.connector
+    
+    def tearDown(self):
+        self.export.connector = self.original_connector
+    
+    def test_iterEntries(self):
+        '''
+        Test that the export walks the account history in chunks
+        '''
+        original_chunk_size = self.export.chunk_size
+        self.export.chunk_size = 1
+        try:
+            entries = list(self.export.iterEntries(1, None))
+        finally:
+            self.export.chunk_size = original_chunk_size
+        
+        # the stub history has the same entry twice, it is exported once
+        history = self.connector.listTransactionsByAccount("*", 1, 1000, 0)
+        self.assertEquals(len(entries), len(set([self.export.mirror.getEntryKey(entry) for entry in history])))
+        self.assertEquals(len(list(self.export.iterEntries(1, "pipes"))), 2)
+    
+    def test_formats(self):
+        '''
+        Test the CSV and NDJSON renderers
+        '''
+        import json
+        
+        entries = [{'provider_id': 1, 'account': u'pipes', 'category': 'receive', 'amount': 12345.12345678, 'time': 1379839327}]
+        
+        lines = list(self.export.toCsv(entries))
+        self.assertEquals(len(lines), 2)
+        self.assertTrue(lines[0].startswith("provider_id,currency,account"))
+        self.assertTrue("12345.12345678" in lines[1])
+        
+        lines = list(self.export.toNdjson(entries))
+        self.assertEquals(json.loads(lines[0])['amount'], "12345.12345678")
+        self.assertTrue(lines[0].endswith("\n"))
+    
+    def test_toRow_confirmations(self):
+        '''
+        Test that the confirmations of a mirrored entry follow the tip, not the value stored at sync time
+        '''
+        import time
+        self.connector.tip_heights = {1: (263427, time.time())}
+        self.assertEquals(self.export.toRow({'provider_id': 1, 'confirmations': 3, 'blockheight': 263083})['confirmations'], 345)
+        self.assertEquals(self.export.toRow({'provider_id': 1, 'confirmations': 0})['confirmations'], 0)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        '''
+        Mirror and index the stub history
+        '''
+        from mybitbank.apps.transactions import mirror, search
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.search = search
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        
+        original_connector = mirror.connector
+        mirror.connector = self.connector
+        try:
+            mirror.syncProvider(1)
+        finally:
+            mirror.connector = original_connector
+        
+        # index without sender addresses, the stub raw transaction is not from this history
+        for row in mirror.TransactionMirror.objects.all():
+            row.comment = "rent for september"
+            row.save()
+            search.TransactionSearchTerm.objects.bulk_create([search.TransactionSearchTerm(entry=row, provider_id=1, field=field, term=term) for field, term in search.getTerms(row)])
+    
+    def test_search(self):
+        '''
+        Test the search by txid prefix, address, comment and amount
+        '''
+        self.assertEquals(self.search.search(""), [])
+        self.assertEquals(len(self.search.search("9599c2c4")), 3)
+        self.assertEquals(len(self.search.search("9599C2C4", provider_ids=[2])), 0)
+        self.assertEquals(len(self.search.search("address for pipes account")), 2)
+        self.assertEquals(len(self.search.search("September")), 3)
+        self.assertEquals(len(self.search.search("rent september")), 3)
+        self.assertEquals(len(self.search.search("1.245")), 1)
+        self.assertEquals(len(self.search.search("-1.24500")), 1)
+        self.assertEquals(len(self.search.search("9599c2c44e1be0001ad8c03038b50b47e634329917eb6d08f7fc675310075f02")), 3)
+        self.assertEquals(len(self.search.search("9599c2c5")), 0)
+        self.assertEquals(len(self.search.search("dcba")), 0)
+    
+    def test_indexEntries(self):
+        '''
+        Test that receive entries stay unindexed until their transaction is fetched, from
+        getrawtransaction or from the wallet copy on nodes without txindex
+        '''
+        from mybitbank.libs.bitcoinrpc.authproxy import JSONRPCException
+        from mybitbank.libs.entities import getWalletByProviderId
+        from mybitbank.libs.misc.stubconnector import rawData
+        original_connector = self.search.connector
+        self.search.connector = self.connector
+        try:
+            service = self.connector.services[1]
+            def getrawtransaction(txid, verbose=1):
+                raise JSONRPCException({'code': -5, 'message': "No information available about transaction"})
+            service.getrawtransaction = getrawtransaction
+            service.gettransaction = lambda txid, verbose=1: {'txid': txid}
+            
+            self.search.indexProvider(1)
+            rows = self.search.TransactionMirror.objects.filter(provider_id=1)
+            self.assertEquals(rows.filter(indexed=True).count(), 0)
+            self.assertEquals(len(self.search.search("1.245")), 1)
+            
+            raw_hex = rawData['rawtransactions'][0]['hex']
+            service.gettransaction = lambda txid, verbose=1: {'txid': txid, 'hex': raw_hex}
+            self.search.indexProvider(1)
+            self.assertEquals(rows.filter(indexed=False).count(), 0)
+            
+            sender_address = self.search.getSenderAddress(self.connector.decodeRawTransaction(raw_hex, 1), 'btc', getWalletByProviderId(self.connector, 1).getNet())
+            self.assertEquals(len(self.search.search(sender_address)), 3)
+        finally:
+            self.search.connector = original_connector
+    
+    def test_getWords(self):
+        '''
+        Test splitting of comments to terms
+        '''
+        self.assertEquals(self.search.getWords(u"Rent, for a  House!"), [u"rent", u"for", u"house"])
+
+
+class RollupTests(TestCase):
+    def test_applyRows(self):
+        '''
+        Test daily aggregates and the closing balances moving with late entries
+        '''
+        from decimal import Decimal
+        from mybitbank.apps.transactions import rollups
+        from mybitbank.apps.transactions.models import TransactionMirror
+        
+        day = 86400
+        rows = [
+                TransactionMirror(account="pipes", category="receive", amount=10.5, fee=None, time=day * 2),
+                TransactionMirror(account="pipes", category="send", amount=-2.0, fee=-0.0001, time=day * 2 + 5),
+                TransactionMirror(account="pipes", category="receive", amount=1.12345678, fee=None, time=day * 4),
+                ]
+        rollups.applyRows(1, rows)
+        
+        opening_balance, series = rollups.getSeries(1, "pipes")
+        self.assertEquals([rollup.count for rollup in series], [2, 1])
+        self.assertEquals([rollup.balance for rollup in series], [Decimal("8.49990000"), Decimal("9.62335678")])
+        self.assertEquals(series[0].sent, Decimal("2.00000000"))
+        self.assertEquals(series[0].fees, Decimal("0.00010000"))
+        
+        # an entry of an earlier day moves all the closing balances after it
+        late_row = TransactionMirror(account="pipes", category="receive", amount=1, fee=None, time=day * 3)
+        rollups.applyRows(1, [late_row])
+        opening_balance, series = rollups.getSeries(1, "pipes")
+        self.assertEquals([rollup.balance for rollup in series], [Decimal("8.49990000"), Decimal("9.49990000"), Decimal("10.62335678")])
+        
+        opening_balance, series = rollups.getSeries(1, rollups.wallet_account, since=rollups.getDay(day * 3))
+        self.assertEquals(opening_balance, Decimal("8.49990000"))
+        self.assertEquals(len(series), 2)
+        
+        # and removing it again
+        rollups.applyRows(1, [late_row], -1)
+        opening_balance, series = rollups.getSeries(1, "pipes")
+        self.assertEquals(series[-1].balance, Decimal("9.62335678"))
+        
+        # a row moved to another day, in one pass over the days
+        moved_row = TransactionMirror(account="pipes", category="receive", amount=1.12345678, fee=None, time=day * 1)
+        rollups.replaceRows(1, [rows[2]], [moved_row])
+        opening_balance, series = rollups.getSeries(1, "pipes")
+        self.assertEquals([rollup.balance for rollup in series], [Decimal("1.12345678"), Decimal("9.62335678"), Decimal("9.62335678"), Decimal("9.62335678")])
+        self.assertEquals([rollup.count for rollup in series], [1, 2, 0, 0])
+        
+        # the same days rebuilt from the rows give the same closing balances
+        rollups.TransactionDailyRollup.objects.all().delete()
+        rollups.applyRows(1, [moved_row, rows[0], rows[1]])
+        self.assertEquals([rollup.balance for rollup in rollups.getSeries(1, "pipes")[1]], [Decimal("1.12345678"), Decimal("9.62335678")])
+
+
+class UnconfirmedTests(TestCase):
+    def setUp(self):
+        '''
+        Point the tracker to a stubbed connector
+        '''
+        from mybitbank.apps.transactions import unconfirmed
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        
+        self.unconfirmed = unconfirmed
+        self.original_connector = unconfirmed.connector
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        self.connector.tip_heights = {}
+        unconfirmed.connector = self.connector
+    
+    def tearDown(self):
+        self.unconfirmed.connector = self.original_connector
+    
+    def test_updateEntries(self):
+        '''
+        Test that entries enter the hot set and leave it past the confirmation limit
+        '''
+        import time
+        entry = {'txid': 'aa' * 32, 'category': 'receive', 'account': 'pipes', 'address': 'an address', 'amount': 1.5, 'confirmations': 0, 'time': 1379839327}
+        self.unconfirmed.updateEntries(1, [entry], 263427)
+        self.assertEquals([row['confirmations'] for row in self.unconfirmed.listUnconfirmed()], [0])
+        
+        # the height comes from the tip read with the entries, not from a polled tip that may be behind
+        self.connector.tip_heights = {1: (263427, time.time())}
+        entry.update({'confirmations': 3, 'blockhash': 'bb' * 32})
+        self.unconfirmed.updateEntries(1, [entry], 263428)
+        self.assertEquals([row['confirmations'] for row in self.unconfirmed.listUnconfirmed()], [2])
+        
+        # the tip moves on
+        self.unconfirmed.prune(1, 263427 + 100)
+        self.assertEquals(self.unconfirmed.listUnconfirmed(), [])
+    
+    def test_notify(self):
+        '''
+        Test the walletnotify handler, the stub transaction is past the limit already
+        '''
+        self.assertTrue(self.unconfirmed.notify(1, "9599c2c44e1be0001ad8c03038b50b47e634329917eb6d08f7fc675310075f02"))
+        self.assertEquals(self.unconfirmed.listUnconfirmed(), [])
+        self.assertTrue(self.unconfirmed.refresh(1))
+        self.assertFalse(self.unconfirmed.notify(5, "9599c2c4"))
+
+
+class LiveTests(TestCase):
+    
+    def setUp(self):
+        from mybitbank.apps.transactions import live
+        from mybitbank.libs.connections.connectors import Connector
+        from mybitbank.libs.misc.stubconnector import ServiceProxyStubBTC
+        self.live = live
+        self.original_connector = live.connector
+        self.connector = Connector()
+        self.connector.services = {1: ServiceProxyStubBTC()}
+        self.connector.config = {1: {'id': 1, 'name': 'Bitcoin (BTC)', 'currency': 'btc', 'symbol': "B", 'enabled': True}}
+        live.connector = self.connector
+        
+    def tearDown(self):
+        self.live.connector = self.original_connector
+    
+    def test_poll(self):
+        '''
+        Test that a watcher publishes only what changed since its previous poll
+        '''
+        from decimal import Decimal
+        events = self.live.EventLog()
+        watcher = self.live.ProviderWatcher(1, events)
+        self.connector.services[1].getbalance = lambda account_name: Decimal("1.5")
+        
+        # the first poll only records the state
+        watcher.poll()
+        self.assertEquals(events.since(0), [])
+        self.assertTrue(watcher.confirmations)
+        
+        entry_key = watcher.confirmations.keys()[0]
+        watcher.confirmations[entry_key] -= 1
+        del watcher.confirmations[watcher.confirmations.keys()[1]]
+        watcher.balance = Decimal("1")
+        watcher.poll()
+        
+        published = events.since(0)
+        self.assertEquals(sorted([event['type'] for event in published]), ['balance', 'confirmations', 'transaction'])
+        self.assertEquals([event['data']['entry_key'] for event in published if event['type'] == 'confirmations'], [entry_key])
+        self.assertEquals([event['data']['balance'] for event in published if event['type'] == 'balance'], ["1.50000000"])
+        
+        self.connector.removeCurrencyService(1)
+        watcher.poll()
+        self.assertEquals(events.since(published[-1]['id'])[0]['data'], {'provider_id': 1, 'enabled': False})
+    
+    def test_getEvents(self):
+        '''
+        Test that listeners get the events of their providers after the last one they saw
+        '''
+        original_event_log = self.live.event_log
+        self.live.event_log = self.live.EventLog()
+        original_listen = self.live.listen
+        self.live.listen = lambda provider_ids: None
+        try:
+            self.live.event_log.publish('balance', {'provider_id': 1, 'balance': "1.00000000"})
+            self.live.event_log.publish('balance', {'provider_id': 2, 'balance': "2.00000000"})
+            
+            events, last_id = self.live.getEvents([1], 0, 0)
+            self.assertEquals(([event['id'] for event in events], last_id), ([1], 2))
+            self.assertEquals(self.live.getEvents([1], last_id, 0.01), ([], 2))
+            
+            # ids of a previous process
+            self.assertEquals(self.live.getEvents([2], 100, 0)[1], 2)
+            self.assertEquals(self.live.formatEvent(events[0]).split("\n")[:2], ["id: 1", "event: balance"])
+        finally:
+            self.live.event_log = original_event_log
+            self.live.listen = original_listen
+    
+    def test_streamEvents_limit(self):
+        '''
+        Test that streams over max_streams only send the pending events and that closed streams free their place
+        '''
+        original_event_log = self.live.event_log
+        self.live.event_log = self.live.EventLog()
+        original_listen = self.live.listen
+        self.live.listen = lambda provider_ids: None
+        original_streams = self.live.streams
+        self.live.streams = self.live.threading.BoundedSemaphore(1)
+        try:
+            self.live.event_log.publish('balance', {'provider_id': 1, 'balance': "1.00000000"})
+            
+            stream = self.live.streamEvents([1], 0, 60)
+            self.assertTrue(stream.next().startswith("retry: %s" % (self.live.poll_interval * 1000)))
+            self.assertTrue(stream.next().startswith("id: 1"))
+            
+            busy = list(self.live.streamEvents([1], 0, 60))
+            self.assertEquals(len(busy), 2)
+            self.assertTrue(busy[0].startswith("retry: %s" % (self.live.heartbeat_interval * 1000)))
+            
+            stream.close()
+            stream = self.live.streamEvents([1], 0, 60)
+            self.assertTrue(stream.next().startswith("retry: %s" % (self.live.poll_interval * 1000)))
+            stream.close()
+        finally:
+            self.live.event_log = original_event_log
+            self.live.listen = original_listen
+            self.live.streams = original_streams
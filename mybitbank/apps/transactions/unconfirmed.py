@@ -0,0 +1,152 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+from models import UnconfirmedTransaction
+from mybitbank.libs.config import MainConfig
+from mybitbank.libs.connections import connector
+from mybitbank.libs.misc import pinBlockHeights
+import mirror
+import rollups
+
+
+def getEntries(transaction):
+    '''
+    Flatten a gettransaction result to listtransactions-like entries, one per detail
+    '''
+    entries = []
+    for detail in transaction.get('details', [transaction]):
+        entry = dict(detail)
+        for field in ['txid', 'confirmations', 'time', 'blockhash']:
+            if field in transaction:
+                entry[field] = transaction[field]
+        entries.append(entry)
+    return entries
+
+
+def updateEntries(provider_id, entries, tip_height):
+    '''
+    Put the low confirmation entries in the hot set and drop the ones past the confirmation limit.
+    tip_height is the chain tip read right after listing the entries
+    '''
+    limit = MainConfig['globals']['confirmation_limit']
+    pinBlockHeights(entries, tip_height)
+    for entry in entries:
+        if entry.get('category') not in ['receive', 'send', 'generate', 'immature']:
+            continue
+        
+        entry_key = mirror.getEntryKey(entry)
+        confirmations = entry.get('confirmations', 0)
+        if confirmations < 0 or confirmations > limit:
+            UnconfirmedTransaction.objects.filter(provider_id=provider_id, entry_key=entry_key).delete()
+            continue
+        
+        values = {
+                  'txid': entry.get('txid', ''),
+                  'category': entry['category'],
+                  'account': entry.get('account', ''),
+                  'address': entry.get('address', ''),
+                  'amount': rollups.toDecimal(entry.get('amount', 0)),
+                  'blockheight': entry.get('blockheight', None) if confirmations > 0 else None,
+                  'time': entry.get('time', 0),
+                  }
+        updated = UnconfirmedTransaction.objects.filter(provider_id=provider_id, entry_key=entry_key).update(**values)
+        if not updated:
+            UnconfirmedTransaction.objects.create(provider_id=provider_id, entry_key=entry_key, **values)
+
+
+def prune(provider_id, tip_height):
+    '''
+    Drop the entries of provider_id that got past the confirmation limit
+    '''
+    limit = MainConfig['globals']['confirmation_limit']
+    UnconfirmedTransaction.objects.filter(provider_id=provider_id, blockheight__lte=tip_height - limit).delete()
+
+
+def notify(provider_id, txid):
+    '''
+    walletnotify handler, update the hot set with a single transaction
+    '''
+    transaction = connector.getTransaction(txid, provider_id)
+    tip_height = connector.getBlockCount(provider_id)
+    if tip_height is None or not transaction or 'code' in transaction:
+        return False
+    
+    updateEntries(provider_id, getEntries(transaction), tip_height)
+    prune(provider_id, tip_height)
+    return True
+
+
+def refresh(provider_id):
+    '''
+    Re-read the blocks within the confirmation limit with a listsinceblock delta call
+    '''
+    tip_height = connector.getBlockCount(provider_id)
+    if tip_height is None:
+        return False
+    
+    limit = MainConfig['globals']['confirmation_limit']
+    since_hash = connector.getBlockHash(provider_id, max(tip_height - limit - 1, 0))
+    since_block = connector.listSinceBlock(provider_id, since_hash or "", 1)
+    if not since_block:
+        return False
+    
+    entries = since_block.get('transactions', [])
+    
+    # entries of the old set that are no longer returned were orphaned or got past the limit
+    entry_keys = [mirror.getEntryKey(entry) for entry in entries]
+    UnconfirmedTransaction.objects.filter(provider_id=provider_id).exclude(entry_key__in=entry_keys).delete()
+    
+    updateEntries(provider_id, entries, connector.getBlockCount(provider_id) or tip_height)
+    prune(provider_id, tip_height)
+    return True
+
+
+def listUnconfirmed(provider_ids=None):
+    '''
+    Return the hot set entries newest first, with their current confirmations
+    '''
+    unconfirmed = UnconfirmedTransaction.objects.all()
+    if provider_ids is not None:
+        unconfirmed = unconfirmed.filter(provider_id__in=provider_ids)
+    
+    entries = []
+    for row in unconfirmed.order_by('-time'):
+        tip_height = connector.getTipHeight(row.provider_id)
+        confirmations = 0
+        if row.blockheight is not None and tip_height is not None:
+            confirmations = max(tip_height - row.blockheight + 1, 0)
+        
+        entries.append({
+                        'provider_id': row.provider_id,
+                        'entry_key': row.entry_key,
+                        'txid': row.txid,
+                        'category': row.category,
+                        'account': row.account,
+                        'address': row.address,
+                        'amount': row.amount,
+                        'confirmations': confirmations,
+                        'time': row.time,
+                        })
+    return entries
@@ -30,5 +30,13 @@ import views
 urlpatterns = patterns('',
     url(r'^$', views.index, name='index'),
     url(r'^(?P<selected_provider_id>\d+)/(?P<page>\d+)/$', views.index, name='index'),
+    url(r'^all/$', views.timeline, name='timeline'),
+    url(r'^search/$', views.searchTransactions, name='search'),
+    url(r'^chart/(?P<provider_id>\d+)/$', views.chart, name='chart'),
+    url(r'^unconfirmed/$', views.unconfirmedTransactions, name='unconfirmed'),
+    url(r'^live/$', views.liveEvents, name='live'),
+    url(r'^export/(?P<export_format>\w+)/$', views.exportTransactions, name='export'),
+    url(r'^export/(?P<export_format>\w+)/(?P<provider_id>\d+)/$', views.exportTransactions, name='export'),
+    url(r'^export/(?P<export_format>\w+)/(?P<provider_id>\d+)/(?P<account_identifier>\w+)/$', views.exportTransactions, name='export'),
     url(r'^details/(?P<provider_id>[0-9]+)/(?P<txid>\w+)/$', views.transactionDetails, name='details'),
 )
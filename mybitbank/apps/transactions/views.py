@@ -23,14 +23,20 @@ SOFTWARE.
 
 """
 
+import datetime
+import json
+
 from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render
+from django.template.loader import render_to_string
 
 from mybitbank.apps.addressbook.models import savedAddress
-from mybitbank.libs import misc
+from mybitbank.apps.transactions import export, feed, live, rollups, search, unconfirmed
+from mybitbank.libs import fragments, misc
 from mybitbank.libs.config import MainConfig
 from mybitbank.libs.connections import connector
-from mybitbank.libs.entities import getWallets, getWalletByProviderId
+from mybitbank.libs.entities import getStateVersion, getWallets, getWalletByProviderId
 
 
 current_section = 'transactions'
@@ -67,22 +73,28 @@ def index(request, selected_provider_id=False, page=1):
         if w.provider_id == selected_provider_id:
             wallet = w
             
-    # get transactions
-    transactions_list = wallet.listTransactions(items_per_page, (items_per_page * (page - 1)))
-    # sort transactions
-    transactions_list = sorted(transactions_list, key=lambda k: k.get('time', 0), reverse=True)
-    
-    # remove moves if there is a user setting for it
-    transactions = []
-    if bool(hide_moves):
-        for transaction in transactions_list:
-            if transaction['category'] != "move":
-                transactions.append(transaction)
-    else:
-        transactions = transactions_list
-
     sender_address_tooltip_text = "This address has been calculated using the Input Script Signature. You should verify before using it."
     
+    def renderTransactions():
+        # get transactions
+        if bool(hide_moves):
+            # filter before paging so that pages without moves are still full
+            transactions = feed.getPage(wallet, items_per_page, (items_per_page * (page - 1)), {'exclude_category': 'move'})
+        else:
+            transactions = wallet.listTransactions(items_per_page, (items_per_page * (page - 1)))
+            # sort transactions
+            transactions = sorted(transactions, key=lambda k: k.get('time', 0), reverse=True)
+        
+        # decode the sender addresses of the whole page in one go
+        wallet.resolveSenderAddresses(transactions)
+        
+        rows = render_to_string('transactions/fragments/rows.html', {'transactions': transactions, 'sender_address_tooltip_text': sender_address_tooltip_text})
+        return {'rows': rows, 'count': len(transactions)}
+    
+    # the rendered rows are reused until a block or a transaction arrives
+    render_key = fragments.getRenderKey(request, 'transactions', selected_provider_id, page)
+    rendered = fragments.cached(render_key, getStateVersion(connector, [selected_provider_id]), renderTransactions)
+    
     providers = {}
     for provider_id in connector.config:
         providers[provider_id] = connector.config[provider_id]['name']
@@ -95,7 +107,8 @@ def index(request, selected_provider_id=False, page=1):
                'breadcrumbs': misc.buildBreadcrumbs(current_section, '', connector.config[selected_provider_id]['name']),
                'page_title': page_title,
                'page_sections': misc.getSiteSections(current_section),
-               'transactions': transactions,
+               'transactions_rows': rendered['rows'],
+               'transactions_count': rendered['count'],
                'transactions_per_page': items_per_page,
                'show_pager': True,
                'next_page': (page + 1),
@@ -109,6 +122,213 @@ def index(request, selected_provider_id=False, page=1):
                }
     return render(request, 'transactions/index.html', context)
 
+@login_required
+def timeline(request):
+    '''
+    handler for the transactions of all currencies in one timeline
+    '''
+    items_per_page = 10
+    page_title = "Transactions"
+    
+    hide_moves = request.user.setting.get('hide_moves')
+    
+    # set the request in the connector object
+    connector.request = request
+    
+    wallets = getWallets(connector)
+    if request.GET.get('provider', False):
+        wallets = [wallet for wallet in wallets if str(wallet.provider_id) == request.GET['provider']]
+    
+    filters = feed.getFilters(request.GET)
+    if bool(hide_moves):
+        filters['exclude_category'] = 'move'
+    
+    sender_address_tooltip_text = "This address has been calculated using the Input Script Signature. You should verify before using it."
+    
+    def renderTransactions():
+        page = feed.getFeed(wallets, items_per_page, request.GET.get('before', None), request.GET.get('after', None), filters)
+        transactions = page['transactions']
+        
+        # decode the sender addresses of the page in one go per wallet
+        for wallet in wallets:
+            wallet.resolveSenderAddresses(transactions)
+        
+        rows = render_to_string('transactions/fragments/rows.html', {'transactions': transactions, 'sender_address_tooltip_text': sender_address_tooltip_text})
+        return {'rows': rows, 'next': page['next'], 'previous': page['previous']}
+    
+    # the rendered rows are reused until a block or a transaction arrives
+    render_key = fragments.getRenderKey(request, 'timeline', tuple(sorted(request.GET.lists())))
+    rendered = fragments.cached(render_key, getStateVersion(connector, [wallet.provider_id for wallet in wallets]), renderTransactions)
+    
+    # keep the filters in the pager links
+    filter_params = request.GET.copy()
+    for cursor_param in ['before', 'after']:
+        if cursor_param in filter_params:
+            del filter_params[cursor_param]
+    
+    providers = {}
+    for provider_id in connector.config:
+        providers[provider_id] = connector.config[provider_id]['name']
+    
+    context = {
+               'globals': MainConfig['globals'],
+               'system_errors': connector.errors,
+               'system_alerts': connector.alerts,
+               'request': request,
+               'breadcrumbs': misc.buildBreadcrumbs(current_section, '', 'All'),
+               'page_title': page_title,
+               'page_sections': misc.getSiteSections(current_section),
+               'transactions_rows': rendered['rows'],
+               'show_timeline_pager': True,
+               'next_cursor': rendered['next'],
+               'previous_cursor': rendered['previous'],
+               'filter_query': filter_params.urlencode(),
+               'filter_values': request.GET,
+               'sender_address_tooltip_text': sender_address_tooltip_text,
+               'providers': providers,
+               'selected_provider_id': 'all',
+               }
+    return render(request, 'transactions/index.html', context)
+
+@login_required
+def exportTransactions(request, export_format, provider_id=None, account_identifier=None):
+    '''
+    Stream the transaction history of all wallets, a wallet or an account as CSV or NDJSON
+    '''
+    if export_format not in export.export_formats:
+        raise Http404
+    
+    # set the request in the connector object
+    connector.request = request
+    
+    account_name = None
+    filename = "transactions"
+    if provider_id is None:
+        wallets = getWallets(connector)
+    else:
+        if not connector.config.get(int(provider_id), False):
+            raise Http404
+        wallet = getWalletByProviderId(connector, int(provider_id))
+        wallets = [wallet]
+        filename = "%s-%s" % (filename, wallet.getCurrencyCode())
+        
+        if account_identifier is not None:
+            account = wallet.getAccountByIdentifier(account_identifier)
+            if not account:
+                raise Http404
+            account_name = account['name']
+            filename = "%s-%s" % (filename, account_identifier)
+    
+    formatter, content_type = export.export_formats[export_format]
+    response = StreamingHttpResponse(formatter(export.iterWalletsEntries(wallets, account_name)), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (filename, export_format)
+    return response
+
+@login_required
+def searchTransactions(request):
+    '''
+    JSON search over the indexed transactions of all providers
+    '''
+    query = request.GET.get('q', "")
+    provider_ids = None
+    if request.GET.get('provider', "").isdigit():
+        provider_ids = [int(request.GET['provider'])]
+    
+    results = []
+    for entry in search.search(query, provider_ids):
+        results.append({
+                        'provider_id': entry['provider_id'],
+                        'currency': connector.config.get(entry['provider_id'], {}).get('currency', ""),
+                        'txid': entry.get('txid', ""),
+                        'category': entry['category'],
+                        'account': entry['account'],
+                        'address': entry.get('address', ""),
+                        'amount': misc.longNumber(entry['amount']),
+                        'time': entry['time'],
+                        'comment': entry.get('comment', ""),
+                        })
+    
+    return HttpResponse(json.dumps({'query': query, 'results': results}), content_type="application/json")
+
+@login_required
+def chart(request, provider_id):
+    '''
+    JSON daily volume and closing balance series of a wallet or account from the rollups
+    '''
+    provider_id = int(provider_id)
+    account = request.GET.get('account', rollups.wallet_account)
+    
+    days = {}
+    for param in ['since', 'until']:
+        try:
+            days[param] = datetime.datetime.strptime(request.GET[param], "%Y-%m-%d").date()
+        except (KeyError, ValueError):
+            days[param] = None
+    
+    opening_balance, daily_rollups = rollups.getSeries(provider_id, account, days['since'], days['until'])
+    
+    series = []
+    for rollup in daily_rollups:
+        series.append({
+                       'day': rollup.day.isoformat(),
+                       'count': rollup.count,
+                       'received': misc.longNumber(rollup.received),
+                       'sent': misc.longNumber(rollup.sent),
+                       'fees': misc.longNumber(rollup.fees),
+                       'balance': misc.longNumber(rollup.balance),
+                       })
+    
+    response = {
+                'provider_id': provider_id,
+                'account': account,
+                'opening_balance': misc.longNumber(opening_balance),
+                'series': series,
+                }
+    return HttpResponse(json.dumps(response), content_type="application/json")
+
+@login_required
+def unconfirmedTransactions(request):
+    '''
+    JSON list of the tracked unconfirmed and low confirmation transactions
+    '''
+    provider_ids = None
+    if request.GET.get('provider', "").isdigit():
+        provider_ids = [int(request.GET['provider'])]
+    
+    results = []
+    for entry in unconfirmed.listUnconfirmed(provider_ids):
+        entry['currency'] = connector.config.get(entry['provider_id'], {}).get('currency', "")
+        entry['amount'] = misc.longNumber(entry['amount'])
+        results.append(entry)
+    
+    return HttpResponse(json.dumps({'transactions': results}), content_type="application/json")
+
+@login_required
+def liveEvents(request):
+    '''
+    Server-sent events with new transactions, confirmations, balance and health changes of the
+    providers. With poll=1 it answers as a long poll with the events after since.
+    '''
+    provider_ids = connector.config.keys()
+    if request.GET.get('provider', "").isdigit():
+        provider_ids = [int(request.GET['provider'])]
+    
+    last_id = request.META.get('HTTP_LAST_EVENT_ID', request.GET.get('since', ""))
+    if last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        # a new listener only gets what happens from now on
+        last_id = live.event_log.getLastId()
+    
+    if request.GET.get('poll', False):
+        events, last_id = live.getEvents(provider_ids, last_id, live.heartbeat_interval)
+        return HttpResponse(json.dumps({'events': events, 'last_id': last_id}), content_type="application/json")
+    
+    response = StreamingHttpResponse(live.streamEvents(provider_ids, last_id), content_type="text/event-stream")
+    response['Cache-Control'] = "no-cache"
+    response['X-Accel-Buffering'] = "no"
+    return response
+
 @login_required
 def transactionDetails(request, txid, provider_id):
     provider_id = int(provider_id)
@@ -28,6 +28,7 @@ from django.forms import CharField, IntegerField
 
 from mybitbank.libs.connections import connector
 from mybitbank.libs import misc
+from mybitbank.libs.misc import addresscodec
 
 class CoinAccount(CharField):
     def validate(self, value):
@@ -39,7 +40,8 @@ class CoinAddress(CharField):
         if value == "":
             raise forms.ValidationError("Please provide a valid address")
         
-        if len(value) < 27 or 34 > len(value):
+        # bech32 addresses are validated by the xxxcoind when sending
+        if not addresscodec.isBech32Address(value) and not addresscodec.isValidAddress(value):
             raise forms.ValidationError("Please provide a valid address")
             
 class CoinAmount(CharField):
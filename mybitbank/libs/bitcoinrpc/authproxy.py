@@ -41,6 +41,8 @@ except ImportError:
 import base64
 import decimal
 import json
+import threading
+import time
 
 
 try:
@@ -52,6 +54,9 @@ USER_AGENT = "AuthServiceProxy/0.1"
 
 HTTP_TIMEOUT = 10
 
+# called as call_observer(host, method, seconds, response_bytes, error) after every call, used for profiling and metrics
+call_observers = []
+
 
 class JSONRPCException(Exception):
     def __init__(self, rpc_error):
@@ -81,16 +86,28 @@ class AuthServiceProxy(object):
         authpair = user + b':' + passwd
         self.__auth_header = b'Basic ' + base64.b64encode(authpair)
         
-        if connection: 
-            # Callables re-use the connection of the original proxy 
-            self.__conn = connection
-        elif self.__url.scheme == 'https':
-            self.__conn = httplib.HTTPSConnection(self.__url.hostname, port,
-                                                  None, None, False,
-                                                  timeout)
+        self.__port = port
+        self.__timeout = timeout
+        
+        # httplib connections can not be shared between threads, every thread gets its own
+        # connection to the server. Callables re-use the connections of the original proxy
+        if connection:
+            self.__connections = connection
         else:
-            self.__conn = httplib.HTTPConnection(self.__url.hostname, port,
-                                                 False, timeout)
+            self.__connections = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.__connections, 'conn', None)
+        if conn is None:
+            if self.__url.scheme == 'https':
+                conn = httplib.HTTPSConnection(self.__url.hostname, self.__port,
+                                               None, None, False,
+                                               self.__timeout)
+            else:
+                conn = httplib.HTTPConnection(self.__url.hostname, self.__port,
+                                              False, self.__timeout)
+            self.__connections.conn = conn
+        return conn
 
     def __getattr__(self, name):
         if name.startswith('__') and name.endswith('__'):
@@ -98,22 +115,17 @@ class AuthServiceProxy(object):
             raise AttributeError
         if self.__service_name is not None:
             name = "%s.%s" % (self.__service_name, name)
-        return AuthServiceProxy(self.__service_url, name, connection=self.__conn)
+        return AuthServiceProxy(self.__service_url, name, connection=self.__connections)
 
     def __call__(self, *args):
+        started = time.time()
         self.__id_count += 1
 
         postdata = json.dumps({'version': '1.1',
                                'method': self.__service_name,
                                'params': args,
                                'id': self.__id_count})
-        self.__conn.request('POST', self.__url.path, postdata,
-                            {'Host': self.__url.hostname,
-                             'User-Agent': USER_AGENT,
-                             'Authorization': self.__auth_header,
-                             'Content-type': 'application/json'})
-
-        response = self._get_response()
+        response = self._post(postdata, self.__service_name, started)
         if response['error'] is not None:
             raise JSONRPCException(response['error'])
         elif 'result' not in response:
@@ -123,20 +135,42 @@ class AuthServiceProxy(object):
             return response['result']
 
     def _batch(self, rpc_call_list):
-        postdata = json.dumps(list(rpc_call_list))
-        self.__conn.request('POST', self.__url.path, postdata,
-                            {'Host': self.__url.hostname,
-                             'User-Agent': USER_AGENT,
-                             'Authorization': self.__auth_header,
-                             'Content-type': 'application/json'})
-
-        return self._get_response()
-
-    def _get_response(self):
-        http_response = self.__conn.getresponse()
+        started = time.time()
+        rpc_call_list = list(rpc_call_list)
+        postdata = json.dumps(rpc_call_list)
+        method = rpc_call_list[0].get('method', '') if rpc_call_list else ''
+        return self._post(postdata, "batch(%s x%s)" % (method, len(rpc_call_list)), started)
+
+    def _post(self, postdata, method, started):
+        conn = self._connection()
+        response_bytes = 0
+        try:
+            conn.request('POST', self.__url.path, postdata,
+                         {'Host': self.__url.hostname,
+                          'User-Agent': USER_AGENT,
+                          'Authorization': self.__auth_header,
+                          'Content-type': 'application/json'})
+            response, response_bytes = self._get_response(conn)
+        except Exception:
+            # start over with a fresh socket on the next call of this thread
+            conn.close()
+            self._observe(method, started, response_bytes, True)
+            raise
+        self._observe(method, started, response_bytes, isinstance(response, dict) and response.get('error') is not None)
+        return response
+
+    def _get_response(self, conn):
+        http_response = conn.getresponse()
         if http_response is None:
             raise JSONRPCException({
                 'code':-342, 'message': 'missing HTTP response from server'})
 
-        return json.loads(http_response.read().decode('utf8'),
-                          parse_float=decimal.Decimal)
+        body = http_response.read()
+        return (json.loads(body.decode('utf8'),
+                           parse_float=decimal.Decimal), len(body))
+
+    def _observe(self, method, started, response_bytes, error):
+        host = "%s:%s" % (self.__url.hostname, self.__url.port)
+        seconds = time.time() - started
+        for call_observer in call_observers:
+            call_observer(host, method, seconds, response_bytes, error)
@@ -25,7 +25,9 @@ SOFTWARE.
 
 import datetime
 import hashlib
+import heapq
 import signal
+import threading
 import time
 import mybitbank.libs.jsonrpc
 
@@ -33,7 +35,11 @@ from httplib import CannotSendRequest
 from django.utils.timezone import utc
 
 from mybitbank.libs import events
+from mybitbank.libs import metrics
+from mybitbank.libs import profiling
 from mybitbank.libs import misc
+from mybitbank.libs.misc import rawtransaction
+from mybitbank.libs.misc.addresscodec import LRUCache
 from mybitbank.libs.bitcoinrpc.authproxy import JSONRPCException
 from mybitbank.libs.jsonrpc import ServiceProxy
 #from mybitbank.libs.entities.cacher import Cacher
@@ -43,6 +49,7 @@ measure_time = False
 
 
 def timeit(method):
+    method = profiling.traced("Connector.%s" % method.__name__)(method)
     if measure_time is not True:
         return method
     
@@ -77,24 +84,44 @@ class Connector(object):
     # ServiceProxies objects
     services = {}
     
-    # errors 
-    errors = []
-    
-    # alerts shown on the UI as alerts
+    # alerts shown on the UI as alerts, shared between all requests
     alerts = {}
     
-    # the WSGIRequest object we are serving
-    request = None
+    # guards the state shared between threads, config, services and alerts
+    lock = threading.RLock()
     
     # cache object
     cache = []
     
+    # last known chain tip height per provider, (height, time polled)
+    tip_heights = {}
+    
+    # how long a polled tip height is used before asking getblockcount again
+    tip_poll_interval = 5
+    
+    # heights of blocks by (provider_id, blockhash), the height of a block never changes
+    block_heights = LRUCache(10000)
+    
+    # hash of the chain tip per provider, (height, hash)
+    tip_hashes = {}
+    
     @timeit
     def __init__(self):
         '''
         Constructor, load config 
         '''
         
+        # errors and the WSGIRequest object being served belong to the thread serving it
+        self._local = threading.local()
+        
+        # disabled services waiting to be re-enabled, a heap of (wake up time, provider id)
+        self._wakeups = []
+        self._wakeup_condition = threading.Condition(self.lock)
+        self._scheduler = None
+        
+        # ServiceProxy objects of the disabled services, put back when re-enabled
+        self._parked_services = {}
+        
         mybitbank.libs.jsonrpc.HTTP_TIMEOUT = 2
         
         try:
@@ -103,15 +130,22 @@ class Connector(object):
         except (AttributeError, ImportError) as e:
             self.errors.append({'message': 'Error occurred while loading the wallet configuration file (%s)' % (e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
 
-        for currency_config in currency_configs:
-            if currency_config.get('enabled', True):
-                self.config[currency_config['id']] = currency_config
-                self.config[currency_config['id']]['enabled'] = True
-                self.services[currency_config['id']] = ServiceProxy("http://%s:%s@%s:%s" % 
-                                                         (currency_config['rpcusername'],
-                                                          currency_config['rpcpassword'],
-                                                          currency_config['rpchost'],
-                                                          currency_config['rpcport']))
+        with self.lock:
+            for currency_config in currency_configs:
+                if currency_config.get('enabled', True):
+                    self.config[currency_config['id']] = currency_config
+                    self.config[currency_config['id']]['enabled'] = True
+                    self.services[currency_config['id']] = self.createServiceProxy(currency_config)
+    
+    def createServiceProxy(self, currency_config):
+        '''
+        Return a new ServiceProxy object for a currency provider config
+        '''
+        return ServiceProxy("http://%s:%s@%s:%s" % 
+                            (currency_config['rpcusername'],
+                             currency_config['rpcpassword'],
+                             currency_config['rpchost'],
+                             currency_config['rpcport']))
 
     def executeCommand(self, provider_id, command, *args):
         '''
@@ -135,7 +169,7 @@ class Connector(object):
         signal.alarm(self.signal_timeout)
         
         try: 
-            rpc_method = getattr(self.services[provider_id], command)
+            rpc_method = getattr(self.getService(provider_id), command)
             rpc_response = rpc_method(*args)
             print rpc_response
         except ExecuteCommandTimeoutException:
@@ -151,29 +185,122 @@ class Connector(object):
         signal.alarm(0)
         return rpc_response
 
+    @property
+    def request(self):
+        '''
+        The WSGIRequest object served by the current thread
+        '''
+        return getattr(self._local, 'request', None)
+    
+    @request.setter
+    def request(self, request):
+        self._local.request = request
+    
+    @property
+    def errors(self):
+        '''
+        Errors that occurred while serving the current request
+        '''
+        if not hasattr(self._local, 'errors'):
+            self._local.errors = []
+        return self._local.errors
+    
+    @errors.setter
+    def errors(self, errors):
+        self._local.errors = errors
+    
     def addAlert(self, category, alert):
         '''
         Add an alert for the UI
         '''
-        if self.alerts.get(category, True) is True:
-            self.alerts[category] = []
-        
-        self.alerts[category].append(alert)
+        with self.lock:
+            if self.alerts.get(category, True) is True:
+                self.alerts[category] = []
+            
+            self.alerts[category].append(alert)
         return True
     
+    def removeAlerts(self, category, provider_id):
+        '''
+        Remove the alerts of category about provider_id
+        '''
+        with self.lock:
+            if self.alerts.get(category, False):
+                self.alerts[category][:] = [alert for alert in self.alerts[category] if alert.get('provider_id') != provider_id]
+    
     @timeit
     def removeCurrencyService(self, provider_id):
         '''
         Remove the ServiceProxy object from the list of service in case of a xxxcoind daemon not responding in time
         '''
-        if self.config.get(provider_id, False):
+        with self.lock:
             currency_provider_config = self.config.get(provider_id, {})
-            if currency_provider_config.get('enabled', False) is True:
-                self.addAlert('currencybackend', {'provider_id': provider_id, 'message': 'Currency service provider %s named %s is disabled for %s seconds due an error communicating.' % (provider_id, currency_provider_config['name'], self.disable_time), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
-                currency_provider_config['enabled'] = datetime.datetime.utcnow().replace(tzinfo=utc) + datetime.timedelta(0, self.disable_time)
-                events.addEvent(self.request, "Currency service %s has being disabled for %s seconds due to error communicating" % (currency_provider_config['currency'], self.disable_time), 'error')
-                if self.services.get(provider_id, None):
-                    del self.services[provider_id]
+            if currency_provider_config.get('enabled', False) is not True:
+                return
+            
+            self.addAlert('currencybackend', {'provider_id': provider_id, 'message': 'Currency service provider %s named %s is disabled for %s seconds due an error communicating.' % (provider_id, currency_provider_config['name'], self.disable_time), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+            currency_provider_config['enabled'] = datetime.datetime.utcnow().replace(tzinfo=utc) + datetime.timedelta(0, self.disable_time)
+            service = self.services.pop(provider_id, None)
+            if service is not None:
+                self._parked_services[provider_id] = service
+            self.scheduleEnable(provider_id, time.time() + self.disable_time)
+            metrics.inc('mybitbank_provider_disabled_total', {'provider': provider_id})
+        
+        events.addEvent(self.request, "Currency service %s has being disabled for %s seconds due to error communicating" % (currency_provider_config['currency'], self.disable_time), 'error')
+    
+    def getService(self, provider_id):
+        '''
+        Return the ServiceProxy object of provider_id, None while it is missing or disabled
+        '''
+        with self.lock:
+            return self.services.get(provider_id, None)
+    
+    def scheduleEnable(self, provider_id, when):
+        '''
+        Re-enable the currency service of provider_id at when (a timestamp), on the scheduler thread
+        '''
+        with self._wakeup_condition:
+            heapq.heappush(self._wakeups, (when, provider_id))
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(target=self.runScheduler, name="currency-enabler")
+                self._scheduler.daemon = True
+                self._scheduler.start()
+            self._wakeup_condition.notify()
+    
+    def runScheduler(self):
+        '''
+        Scheduler thread body: sleep until the next wake up time and re-enable the services due
+        '''
+        with self._wakeup_condition:
+            while True:
+                if not self._wakeups:
+                    self._wakeup_condition.wait()
+                    continue
+                
+                delay = self._wakeups[0][0] - time.time()
+                if delay > 0:
+                    self._wakeup_condition.wait(delay)
+                    continue
+                
+                when, provider_id = heapq.heappop(self._wakeups)
+                self.enableCurrencyService(provider_id)
+    
+    def enableCurrencyService(self, provider_id):
+        '''
+        Put back the ServiceProxy object of a disabled currency service and clear its alerts
+        '''
+        with self.lock:
+            currency_provider_config = self.config.get(provider_id, {})
+            if not isinstance(currency_provider_config.get('enabled', None), datetime.datetime):
+                return False
+            
+            service = self._parked_services.pop(provider_id, None)
+            if service is None:
+                service = self.createServiceProxy(currency_provider_config)
+            self.services[provider_id] = service
+            currency_provider_config['enabled'] = True
+            self.removeAlerts('currencybackend', provider_id)
+        return True
 
     def longNumber(self, x):
         '''
@@ -200,19 +327,117 @@ class Connector(object):
         Get xxxcoind info
         '''
         
-        if provider_id not in self.services.keys():
+        if self.getService(provider_id) is None:
             return {'message': 'Non-existing currency provider id %s' % provider_id, 'code':-100}
         
         peerinfo = {}
         try:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-                peerinfo = self.services[provider_id].getinfo()
+                peerinfo = self.getService(provider_id).getinfo()
         except (JSONRPCException, Exception), e:
             self.errors.append({'message': 'Error occurred while doing getinfo (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
             self.removeCurrencyService(provider_id)
         
         return peerinfo
     
+    @timeit
+    def getBlockCount(self, provider_id):
+        '''
+        Get the height of the chain tip
+        '''
+        
+        blockcount = None
+        if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
+            try:
+                blockcount = self.getService(provider_id).getblockcount()
+            except Exception as e:
+                self.errors.append({'message': 'Error occurred while doing getblockcount (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+                self.removeCurrencyService(provider_id)
+        
+        return blockcount
+    
+    @timeit
+    def getBlockHash(self, provider_id, height):
+        '''
+        Get the hash of the block at height
+        '''
+        
+        blockhash = None
+        if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
+            try:
+                blockhash = self.getService(provider_id).getblockhash(height)
+            except Exception as e:
+                self.errors.append({'message': 'Error occurred while doing getblockhash (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+                self.removeCurrencyService(provider_id)
+        
+        return blockhash
+    
+    @timeit
+    def getBlockHeight(self, provider_id, blockhash):
+        '''
+        Get the height of the block blockhash with getblockheader, or getblock on nodes without it.
+        Returns None for unknown blocks
+        '''
+        if not blockhash:
+            return None
+        
+        height = self.block_heights.get((provider_id, blockhash))
+        if height is not None:
+            return height
+        
+        if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
+            service = self.getService(provider_id)
+            try:
+                try:
+                    header = service.getblockheader(blockhash)
+                except JSONRPCException:
+                    header = service.getblock(blockhash)
+                height = header.get('height', None)
+            except JSONRPCException:
+                # unknown block
+                return None
+            except Exception as e:
+                self.errors.append({'message': 'Error occurred while doing getblockheader (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+                self.removeCurrencyService(provider_id)
+                return None
+            
+            if height is not None:
+                self.block_heights.set((provider_id, blockhash), height)
+        
+        return height
+    
+    def getTipHeight(self, provider_id):
+        '''
+        Return the chain tip height of provider_id, polled with getblockcount at most
+        every tip_poll_interval seconds. The last known height is used if polling fails
+        '''
+        height, polled = self.tip_heights.get(provider_id, (None, 0))
+        if (time.time() - polled) >= self.tip_poll_interval:
+            blockcount = self.getBlockCount(provider_id)
+            if blockcount is not None:
+                height = blockcount
+                self.tip_heights[provider_id] = (height, time.time())
+        
+        return height
+    
+    def getTipHash(self, provider_id):
+        '''
+        Return the hash of the chain tip of provider_id, getblockhash is only called when the
+        polled tip height has moved
+        '''
+        height = self.getTipHeight(provider_id)
+        if height is None:
+            return None
+        
+        hash_height, blockhash = self.tip_hashes.get(provider_id, (None, None))
+        if hash_height != height:
+            blockhash = self.getBlockHash(provider_id, height)
+            if blockhash is None:
+                return None
+            self.tip_hashes[provider_id] = (height, blockhash)
+        
+        return blockhash
+    
     @timeit
     def getPeerInfo(self, provider_id):
         '''
@@ -221,7 +446,7 @@ class Connector(object):
         peers = []
         try:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-                peers = self.services[provider_id].getpeerinfo()
+                peers = self.getService(provider_id).getpeerinfo()
         except JSONRPCException:
             # in case coind not support getpeerinfo command
             return {'error'} 
@@ -249,7 +474,7 @@ class Connector(object):
         for provider_id in provider_ids:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
                 try:
-                    fresh_accounts[provider_id] = self.services[provider_id].listaccounts()
+                    fresh_accounts[provider_id] = self.getService(provider_id).listaccounts()
                     for fresh_account_name, fresh_account_balance in fresh_accounts[provider_id].items():
                         fresh_accounts[provider_id][fresh_account_name] = self.longNumber(fresh_account_balance)
                 except (Exception, CannotSendRequest) as e:
@@ -275,13 +500,29 @@ class Connector(object):
         addresses = []
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
             try:
-                addresses = self.services[provider_id].getaddressesbyaccount(name)
+                addresses = self.getService(provider_id).getaddressesbyaccount(name)
             except Exception, e:
                 self.errors.append({'message': 'Error occurred while doing getaddressesbyaccount (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
                 self.removeCurrencyService(provider_id)
 
         return addresses
     
+    @timeit
+    def listReceivedByAddress(self, provider_id, minconf=0, includeempty=True):
+        '''
+        Get the list of wallet addresses with their account names, wallet-wide in a single call
+        '''
+        
+        addresses = []
+        if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
+            try:
+                addresses = self.getService(provider_id).listreceivedbyaddress(minconf, includeempty)
+            except Exception, e:
+                self.errors.append({'message': 'Error occurred while doing listreceivedbyaddress (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+                self.removeCurrencyService(provider_id)
+        
+        return addresses
+    
     @timeit
     def listTransactionsByAccount(self, account_name, provider_id, limit=100000, start=0):    
         '''
@@ -291,13 +532,29 @@ class Connector(object):
         transactions = []
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
             try:
-                transactions = self.services[provider_id].listtransactions(account_name, limit, start)
+                transactions = self.getService(provider_id).listtransactions(account_name, limit, start)
             except Exception as e:
                 self.errors.append({'message': 'Error occurred while doing listtransactions (provider_id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
                 self.removeCurrencyService(provider_id)
             
         return transactions
     
+    @timeit
+    def listSinceBlock(self, provider_id, blockhash="", target_confirmations=1):
+        '''
+        Get the wallet transactions in blocks since blockhash (all if empty) and the lastblock cursor
+        '''
+        
+        since_block = {}
+        if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
+            try:
+                since_block = self.getService(provider_id).listsinceblock(blockhash, target_confirmations)
+            except Exception as e:
+                self.errors.append({'message': 'Error occurred while doing listsinceblock (provider_id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+                self.removeCurrencyService(provider_id)
+        
+        return since_block
+    
     @timeit
     def getNewAddress(self, provider_id, account_name):
         '''
@@ -309,8 +566,9 @@ class Connector(object):
             return False
         
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-            if self.services.get(provider_id, False) and type(account_name) in [str, unicode]:
-                new_address = self.services[provider_id].getnewaddress(account_name)
+            service = self.getService(provider_id)
+            if service and type(account_name) in [str, unicode]:
+                new_address = service.getnewaddress(account_name)
                 return new_address
         else:
             return False
@@ -324,7 +582,7 @@ class Connector(object):
         
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
             try:
-                balances[provider_id] = self.services[provider_id].getbalance(account_name)
+                balances[provider_id] = self.getService(provider_id).getbalance(account_name)
             except Exception as e:
                 # in case of an Exception continue on to the next currency service (xxxcoind)
                 self.errors.append({'message': 'Error occurred while doing getbalance (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
@@ -338,7 +596,8 @@ class Connector(object):
         Move amount from local to local accounts
         Note: from_account my be an empty string 
         '''
-        if provider_id not in self.services.keys():
+        service = self.getService(provider_id)
+        if service is None:
             return {'message': 'Non-existing currency provider id %s' % provider_id, 'code':-100}
         
         if self.config[provider_id]['enabled'] is not True:
@@ -355,7 +614,7 @@ class Connector(object):
         except:
             return {'message': 'Invalid minconf value', 'code':-105}
         
-        account_list = self.services[provider_id].listaccounts()
+        account_list = service.listaccounts()
 
         account_names = []
         for account_name in account_list:
@@ -364,7 +623,7 @@ class Connector(object):
         if from_account in account_names and to_account in account_names:
             # both accounts have being found, perform the move
             try:
-                reply = self.services[provider_id].move(from_account, to_account, amount, minconf, comment)
+                reply = service.move(from_account, to_account, amount, minconf, comment)
             except JSONRPCException, e: 
                 return e.error
             except ValueError, e:
@@ -383,7 +642,8 @@ class Connector(object):
         if not to_address or not provider_id:
             return {'message': 'Invalid input to account or address', 'code':-101}
 
-        if provider_id not in self.services.keys():
+        service = self.getService(provider_id)
+        if service is None:
             return {'message': 'Non-existing currency provider id %s' % provider_id, 'code':-100}
 
         if not misc.isFloat(amount) or type(amount) is bool:
@@ -392,7 +652,7 @@ class Connector(object):
         if type(comment) not in [str, unicode]  or type(comment_to) not in [str, unicode]:
             return {'message': 'Comment is not valid', 'code':-104}
         
-        account_list = self.services[provider_id].listaccounts()
+        account_list = service.listaccounts()
         
         account_names = []
         for account_name in account_list:
@@ -401,7 +661,7 @@ class Connector(object):
         if from_account in account_names:
             # account given exists, continue
             try:
-                reply = self.services[provider_id].sendfrom(from_account, to_address, amount, minconf, comment, comment_to)
+                reply = service.sendfrom(from_account, to_address, amount, minconf, comment, comment_to)
             except JSONRPCException, e:
                 return e.error
             except ValueError, e:
@@ -432,21 +692,80 @@ class Connector(object):
         transaction_details = None
         try:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-                transaction_details = self.services[provider_id].getrawtransaction(txid, 1)
+                # fetch the plain hex and decode it locally, much lighter than the verbose output
+                transaction_details = self.decodeRawTransaction(self.getService(provider_id).getrawtransaction(txid, 0), provider_id)
         except JSONRPCException:
             return {}
         except Exception:
             return {}
         
         return transaction_details
-    
+
+    @timeit
+    def getRawTransactions(self, txids, provider_id):
+        '''
+        Return the transaction details of a list of txids, keyed by txid. The getrawtransaction
+        calls are sent to the xxxcoind in a single JSON-RPC batch request whenever the service supports it
+        '''
+
+        raw_transactions = {}
+
+        if provider_id not in self.config.keys():
+            return raw_transactions
+
+        if self.config[provider_id]['enabled'] is not True:
+            return raw_transactions
+
+        # drop invalid and duplicate txids, keep the order
+        unique_txids = []
+        for txid in txids:
+            if type(txid) in [str, unicode] and len(txid) and txid not in unique_txids:
+                unique_txids.append(txid)
+
+        if not unique_txids:
+            return raw_transactions
+
+        service = self.getService(provider_id)
+        if service is None:
+            return raw_transactions
+        
+        try:
+            if isinstance(service, ServiceProxy):
+                rpc_calls = []
+                for i, txid in enumerate(unique_txids):
+                    rpc_calls.append({'version': '1.1', 'method': 'getrawtransaction', 'params': [txid, 0], 'id': i})
+
+                for response in service._batch(rpc_calls):
+                    if response.get('error', None) is None and response.get('result', None):
+                        raw_transactions[unique_txids[response['id']]] = self.decodeRawTransaction(response['result'], provider_id)
+            else:
+                for txid in unique_txids:
+                    raw_transactions[txid] = self.decodeRawTransaction(service.getrawtransaction(txid, 0), provider_id)
+        except JSONRPCException:
+            return raw_transactions
+        except Exception as e:
+            self.errors.append({'message': 'Error occurred while doing getrawtransaction (provider id: %s, error: %s)' % (provider_id, e), 'when': datetime.datetime.utcnow().replace(tzinfo=utc)})
+            self.removeCurrencyService(provider_id)
+
+        return raw_transactions
+
     @timeit
     def decodeRawTransaction(self, transaction, provider_id):
         '''
-        Decode raw transaction
+        Decode raw transaction. The hex is deserialized locally, the xxxcoind is only asked
+        to decode transactions in a format we do not understand
         '''
+        if type(transaction) is dict:
+            # already decoded
+            return transaction
+        
+        try:
+            return rawtransaction.deserializeTransaction(transaction)
+        except ValueError:
+            pass
+        
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-            return self.services[provider_id].decoderawtransaction(transaction)
+            return self.getService(provider_id).decoderawtransaction(transaction)
     
     @timeit
     def getTransaction(self, txid, provider_id):
@@ -465,7 +784,7 @@ class Connector(object):
         transaction_details = None
         try:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-                transaction_details = self.services[provider_id].gettransaction(txid)
+                transaction_details = self.getService(provider_id).gettransaction(txid)
         except JSONRPCException:
             return {}
         except Exception:
@@ -485,7 +804,8 @@ class Connector(object):
         if len(passphrase) < 1:
             return {'message': 'No passphrase given', 'code':-111}
         
-        if provider_id not in self.services.keys():
+        service = self.getService(provider_id)
+        if service is None:
             return {'message': 'Invalid non-existing or disabled currency', 'code':-112}
         
         if self.config[provider_id]['enabled'] is not True:
@@ -493,7 +813,7 @@ class Connector(object):
         
         try:
             if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-                unload_exit = self.services[provider_id].walletpassphrase(passphrase, 30)
+                unload_exit = service.walletpassphrase(passphrase, 30)
             else:
                 return False
         except JSONRPCException, e:
@@ -512,9 +832,10 @@ class Connector(object):
         '''
         Lock wallet
         '''
-        if provider_id not in self.services.keys():
+        service = self.getService(provider_id)
+        if service is None:
             return {'message': 'Invalid non-existing or disabled currency', 'code':-112}
         
         if self.config.get(provider_id, False) and self.config[provider_id]['enabled'] is True:
-            self.services[provider_id].walletlock()
+            service.walletlock()
         
@@ -1,4 +1,5 @@
 from coinwallet import CoinWallet
+from mybitbank.libs.events import Events
 
 
 def getWallets(connector):
@@ -31,3 +32,15 @@ def getWalletByProviderId(connector, provider_id):
         wallet = CoinWallet([])
     
     return wallet
+
+def getStateVersion(connector, provider_ids):
+    '''
+    Return a value that changes whenever what is shown about the wallets of provider_ids may change:
+    the state of each wallet and the last local event (aliases, new accounts and addresses, moves)
+    '''
+    version = []
+    for provider_id in sorted(provider_ids):
+        version.append(getWalletByProviderId(connector, provider_id).getStateVersion())
+    
+    version.append(list(Events.objects.order_by('-id').values_list('id', flat=True)[:1]))
+    return tuple(version)
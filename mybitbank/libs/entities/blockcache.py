@@ -0,0 +1,92 @@
+import threading
+
+from mybitbank.libs import metrics, profiling
+from mybitbank.libs.misc import findForkHeight
+from mybitbank.libs.misc.addresscodec import LRUCache
+
+
+class BlockCache(object):
+    '''
+    Long lived cache for data of confirmed transactions. Every entry is recorded with the hash of
+    the block it was confirmed in and is dropped when a reorg orphans that block
+    '''
+    # deepest reorg looked for
+    max_depth = 100
+    
+    # entries kept, the least recently used ones are evicted
+    max_entries = 10000
+    
+    def __init__(self):
+        self._entries = LRUCache(self.max_entries)
+        self._blocks = {}
+        self._orphaned = set()
+        self._tip_height = None
+        self._lock = threading.Lock()
+    
+    def store(self, key, value, height, blockhash):
+        '''
+        Cache value for key, only data of confirmed transactions is accepted. height is the
+        height of blockhash as the xxxcoind reports it
+        '''
+        if not key or not height or not blockhash:
+            return False
+        
+        with self._lock:
+            self._entries.set(key, (value, blockhash))
+            self._blocks[height] = blockhash
+            self._orphaned.discard(blockhash)
+        return True
+    
+    def fetch(self, key):
+        '''
+        Return the cached value of key or None
+        '''
+        entry = self._entries.get(key)
+        hit = entry is not None and entry[1] not in self._orphaned
+        profiling.recordCache(hit)
+        metrics.recordCache('blockcache', hit)
+        if not hit:
+            return None
+        return entry[0]
+    
+    def invalidateFrom(self, height):
+        '''
+        Orphan the recorded blocks at height or above, the entries confirmed in them are not served anymore
+        '''
+        with self._lock:
+            for block_height in self._blocks.keys():
+                if block_height >= height:
+                    self._orphaned.add(self._blocks.pop(block_height))
+    
+    def checkTip(self, tip_height, getBlockHash):
+        '''
+        When the tip has moved, compare the recorded blocks with the chain and drop the
+        entries of orphaned blocks. Return the fork height or None
+        '''
+        if tip_height is None or tip_height == self._tip_height:
+            return None
+        
+        with self._lock:
+            # blocks deeper than max_depth are not looked at anymore
+            for block_height in self._blocks.keys():
+                if block_height <= tip_height - self.max_depth:
+                    del self._blocks[block_height]
+            recorded_blocks = dict(self._blocks)
+        
+        fork_height = findForkHeight(recorded_blocks, tip_height, getBlockHash, self.max_depth)
+        if fork_height is not None:
+            self.invalidateFrom(fork_height)
+        
+        self._tip_height = tip_height
+        return fork_height
+
+
+# one block cache per currency provider, shared between requests
+block_caches = {}
+
+
+def getBlockCache(provider_id):
+    '''
+    Return the block cache of provider_id
+    '''
+    return block_caches.setdefault(provider_id, BlockCache())
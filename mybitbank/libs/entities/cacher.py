@@ -2,6 +2,8 @@ import datetime
 
 from django.utils.timezone import utc
 
+from mybitbank.libs import metrics, profiling
+
 
 class Cacher(object):
     '''
@@ -45,18 +47,28 @@ class Cacher(object):
         except:
             if self._debug:
                 print "Cache MISS for %s %s (with error)" % (section, hashkey)
+            self.recordLookup(False)
             return False
         
         if cache_object and cache_object.get('when', False) >= datetime.datetime.utcnow().replace(tzinfo=utc):
             cached_data = self._cache[section][hashkey]['data']
             if self._debug:
                 print "Cache HIT for %s %s" % (section, hashkey)
+            self.recordLookup(True)
             return cached_data
         else:
             if self._debug:
                 print "Cache MISS for %s %s" % (section, hashkey)
+            self.recordLookup(False)
             return False
         
+    def recordLookup(self, hit):
+        '''
+        Count the lookup in the request profile and the metrics
+        '''
+        profiling.recordCache(hit)
+        metrics.recordCache('cacher', hit)
+    
     def purge(self, section):
         '''
         Removed cached contents for section
@@ -24,13 +24,27 @@ SOFTWARE.
 """
 
 import hashlib
+import time
 
 from cacher import Cacher
 from coinaddress import CoinAddress
 from cointransaction import CoinTransaction
-from mybitbank.libs import misc
+import transactionmirror
+from mybitbank.libs import misc, profiling
 from mybitbank.libs.connections import connector
+from mybitbank.libs.misc.addresscodec import LRUCache
 
+# entries per history chunk, account pages are served out of these aligned chunks
+transactions_chunk_size = 100
+
+# account history chunks shared between requests, (provider id, account name, chunk index) to (version, block stamp, entries)
+transactions_chunks = LRUCache(1000)
+
+# seconds an account history version is reused before it is read again, like the polled chain tip
+history_version_max_age = 5
+
+# account history versions, (provider id, account name) to (version, time read)
+history_versions = LRUCache(1000)
 
 class CoinAccount(object):
     '''
@@ -41,6 +55,8 @@ class CoinAccount(object):
         self._errors = []
         self._account = {}
         self._hidden = False
+        self._addresses = None
+        self._last_activity_time = None
         self._cache = Cacher({
          'transactions': {},
          'balances': {},
@@ -144,12 +160,15 @@ class CoinAccount(object):
         '''
         Return bool if this account is hidden
         '''
-        return self._hidden or self._account['hidden'] or self.isDefault()
+        return self._hidden or self._account.get('hidden', False) or self.isDefault()
     
     def getAddresses(self):
         '''
         Get the address for an account name
         '''
+        if self._addresses is not None:
+            return self._addresses
+        
         # check for cached data, use that or get it again
         cache_hash = self.getParamHash("name=%s" % (self['name']))
         cached_object = self._cache.fetch('addressesbyaccount', cache_hash)
@@ -166,6 +185,12 @@ class CoinAccount(object):
         self._cache.store('addressesbyaccount', cache_hash, addresses_list)
         return addresses_list
     
+    def setAddresses(self, addresses):
+        '''
+        Attach the account addresses fetched in bulk, see CoinWallet.prefetchAccountDetails()
+        '''
+        self._addresses = [CoinAddress(address, self) for address in addresses]
+    
     def getAddressesCount(self):
         '''
         Return the number of address under this account
@@ -177,6 +202,14 @@ class CoinAccount(object):
         '''
         Return the date of the last activity
         '''
+        if self._last_activity_time is not None:
+            if self._last_activity_time:
+                last_activity = misc.twitterizeDate(self._last_activity_time)
+            else:
+                last_activity = "never"
+            self['last_activity'] = last_activity
+            return last_activity
+        
         last_transaction = self.listTransactions(1, 0)
         if last_transaction:
             last_activity = misc.twitterizeDate(last_transaction[0]['time'])
@@ -186,6 +219,12 @@ class CoinAccount(object):
         self['last_activity'] = last_activity
         return last_activity
     
+    def setLastActivityTime(self, timestamp):
+        '''
+        Attach the time of the last transaction found in bulk, 0 for no activity at all
+        '''
+        self._last_activity_time = timestamp
+    
     def getCurrencySymbol(self):
         '''
         Return the Unicode currency symbol
@@ -198,19 +237,27 @@ class CoinAccount(object):
         '''
         return self.get('currency', "").lower()
     
+    @profiling.traced("CoinAccount.listTransactions")
     def listTransactions(self, limit=100000, start=0, orderby='time', reverse=True):    
         '''
-        Get a list of transactions by account name and provider_id
+        Get a list of transactions by account name and provider_id. The pages follow the time
+        order of the history, orderby sorts the entries of the requested page
         '''
-
-        cache_hash = self.getParamHash("limit=%s&start=%sorderby=%s&reverse=%s" % (limit, start, orderby, reverse))
-        cached_object = self._cache.fetch('transactions', cache_hash)
-        if cached_object:
-            return cached_object
+        # serve the page out of the aligned history chunks covering it
+        transaction_list = []
+        version = self.getHistoryVersion()
+        for chunk_index in range(start // transactions_chunk_size, (start + limit - 1) // transactions_chunk_size + 1):
+            chunk = self.getHistoryChunk(chunk_index, version)
+            transaction_list = transaction_list + chunk
+            
+            # the end of the history
+            if len(chunk) < transactions_chunk_size:
+                break
         
-        transactions = []
-        transaction_list = connector.listTransactionsByAccount(self['name'], self['provider_id'], limit, start)
+        offset = start - (start // transactions_chunk_size) * transactions_chunk_size
+        transaction_list = [dict(entry) for entry in transaction_list[offset:offset + limit]]
         
+        transactions = []
         for entry in transaction_list:
             if entry.get('address', False):
                 entry['address'] = CoinAddress(entry['address'], self)
@@ -231,9 +278,67 @@ class CoinAccount(object):
             
         # sort result
         transactions = sorted(transactions, key=lambda transaction: transaction[orderby], reverse=reverse) 
-            
-        # cache the result
-        self._cache.store('transactions', cache_hash, transactions)
         return transactions
     
+    def getHistoryVersion(self):
+        '''
+        Return a value that changes whenever a transaction is added to the account history,
+        the count of mirrored entries or the key of the newest xxxcoind entry. It is read
+        at most every history_version_max_age seconds
+        '''
+        version_key = (self.provider_id, self['name'])
+        cached_version = history_versions.get(version_key)
+        if cached_version is not None and time.time() - cached_version[1] < history_version_max_age:
+            return cached_version[0]
+        
+        if transactionmirror.isSynced(self.provider_id):
+            version = ('mirror', transactionmirror.countTransactions(self.provider_id, self['name']))
+        else:
+            newest = connector.listTransactionsByAccount(self['name'], self.provider_id, 1, 0)
+            version = ('coind', transactionmirror.getEntryKey(newest[-1]) if newest else None)
+        
+        history_versions.set(version_key, (version, time.time()))
+        return version
+    
+    def getBlockStamp(self, version):
+        '''
+        Return a value that changes whenever a block is found, the chain tip hash or the
+        last block the mirror was synced to when the history is read from the mirror
+        '''
+        if version[0] == 'mirror':
+            return transactionmirror.getLastBlock(self.provider_id)
+        return connector.getTipHash(self.provider_id)
+    
+    def getHistoryChunk(self, chunk_index, version):
+        '''
+        Return the chunk_index-th chunk of the account history newest first, from the shared
+        chunk cache as long as the history version has not changed. A chunk holding entries
+        that are not pinned to a block yet is only reused until the next block
+        '''
+        chunk_key = (self.provider_id, self['name'], chunk_index)
+        cached_chunk = transactions_chunks.get(chunk_key)
+        if cached_chunk is not None and cached_chunk[0] == version:
+            if cached_chunk[1] is None or cached_chunk[1] == self.getBlockStamp(version):
+                return cached_chunk[2]
+        
+        # read before the history, a block found meanwhile only makes the chunk get read again
+        block_stamp = self.getBlockStamp(version)
+        
+        start = chunk_index * transactions_chunk_size
+        if version[0] == 'mirror':
+            chunk = transactionmirror.listTransactions(self.provider_id, self['name'], transactions_chunk_size, start)
+        else:
+            chunk = connector.listTransactionsByAccount(self['name'], self.provider_id, transactions_chunk_size, start)
+            chunk.reverse()
+            
+            # pin the confirmations to block heights so that the cached chunk does not get stale
+            misc.pinBlockHeights(chunk, connector.getBlockCount(self.provider_id))
+        
+        # moves never get into a block
+        if not [entry for entry in chunk if entry.get('category') != 'move' and not entry.get('blockheight', None)]:
+            block_stamp = None
+        
+        transactions_chunks.set(chunk_key, (version, block_stamp, chunk))
+        return chunk
+    
     
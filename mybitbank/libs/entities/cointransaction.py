@@ -26,7 +26,8 @@ SOFTWARE.
 import datetime
 import hashlib
 
-from mybitbank.libs import misc
+from mybitbank.libs import misc, profiling
+from mybitbank.libs.misc import addresscodec
 from mybitbank.libs.connections import connector
 from cacher import Cacher
 from coinaddress import CoinAddress
@@ -37,19 +38,11 @@ class CoinTransaction(object):
     Class for a transaction
     '''
     
-    # source: https://github.com/zamgo/PHPCoinAddress/blob/master/README.md
-    prefixes = {
-                'btc': {'mainnet': '\x00', 'testnet': '\x6f'},
-                'ltc': {'mainnet': '\x30', 'testnet': '\x6f'},
-                'ftc': {'mainnet': '\x0E', 'testnet': '\x6f'},
-                'ppc': {'mainnet': '\x37', 'testnet': '\x6f'},
-                'nmc': {'mainnet': '\x34', 'testnet': '\x6f'},
-                'nvc': {'mainnet': '\x08', 'testnet': '\x6f'},
-                'doge': {'mainnet': '\x30', 'testnet': '\x6f'},
-               }
-    
+    @profiling.traced("CoinTransaction.__init__")
     def __init__(self, transactionDetails):
         self._transaction = {}
+        self._raw_transaction = None
+        self._sender_address = None
         self. _cache = Cacher({
                      'details': {},
                      })
@@ -65,16 +58,6 @@ class CoinTransaction(object):
             self['blocktime_pretty'] = misc.twitterizeDate(self.get('blocktime', 'never'))
             self['currency_symbol'] = misc.getCurrencySymbol(connector, self['currency'])
             
-            if self.get('category', False) in ['receive', 'send']:
-                if self['confirmations'] <= MainConfig['globals']['confirmation_limit']:
-                    self['status_icon'] = 'glyphicon-time'
-                    self['status_color'] = '#AAA';
-                    self['tooltip'] = self['confirmations']
-                else:
-                    self['status_icon'] = 'glyphicon-ok-circle'
-                    self['status_color'] = '#1C9E3F';
-                    self['tooltip'] = self['confirmations']
-            
             accountObject = self['wallet'].getAccountByName(self['account'])
             self['account'] = accountObject
             
@@ -110,6 +93,10 @@ class CoinTransaction(object):
             return self.getSenderAddress()
         elif key == "address":
             return CoinAddress(self._transaction['address'], self._transaction['account'])
+        elif key == "confirmations":
+            return self.getConfirmations()
+        elif key in ["status_icon", "status_color", "tooltip"]:
+            return self.getStatus().get(key, None)
         
         transaction = getattr(self, '_transaction')
         return transaction.get(key, None)
@@ -188,6 +175,14 @@ class CoinTransaction(object):
         '''
         Get the raw transaction dict
         '''
+        if self._raw_transaction is not None:
+            return self._raw_transaction
+        
+        if self.get('hex', False):
+            # gettransaction already gave us the serialized transaction, decode it locally
+            self._raw_transaction = connector.decodeRawTransaction(self['hex'], self['wallet']['provider_id'])
+            return self._raw_transaction
+        
         cache_hash = self.getParamHash("details")
         cached_object = self._cache.fetch('details', cache_hash)
         if cached_object:
@@ -197,14 +192,32 @@ class CoinTransaction(object):
             self._cache.store('details', cache_hash, raw_transaction)
         return raw_transaction
 
+    def setRawTransaction(self, raw_transaction):
+        '''
+        Attach an already fetched raw transaction dict, see CoinWallet.resolveSenderAddresses()
+        '''
+        self._raw_transaction = raw_transaction
+    
+    def setSenderAddress(self, sender_address):
+        '''
+        Attach an already decoded sender address, see CoinWallet.resolveSenderAddresses()
+        '''
+        if sender_address:
+            self._sender_address = CoinAddress(sender_address, 'This is a sender address!')
+        else:
+            self._sender_address = False
+    
     def getSenderAddress(self):
         '''
         Getter function for the sender address
         '''
         if self['category'] == 'receive':
+            if self._sender_address is not None:
+                return self._sender_address or None
+            
             meta_properties = self.metaProperties()
-            if meta_properties.get('sender_address', False):
-                return CoinAddress(meta_properties['sender_address'], 'This is a sender address!')
+            self.setSenderAddress(meta_properties.get('sender_address', False))
+            return self._sender_address or None
             
         return None
 
@@ -218,27 +231,42 @@ class CoinTransaction(object):
         except:
             return "not enough info"
         
+        # coinbase, witness and other inputs without a signature and public key pair
         script = script_sig.split()
+        if len(script) < 2:
+            return "not enough info"
         
-        h = hashlib.sha256(script[1].decode("hex")).digest()
-        ripe160 = hashlib.new('ripemd160')
-        ripe160.update(h)
-        d = ripe160.digest()
-        
-        prefix = self.prefixes[currency.lower()][net]
-        address = (prefix + d)
-        
-        # calculate checksum
-        checksum = hashlib.sha256(hashlib.sha256(address).digest()).digest()[:4]
-        
-        # build the raw address
-        address += checksum
+        # hash160 the public key and encode it with the currency version byte
+        try:
+            return addresscodec.pubkeyToAddress(script[1], currency, net)
+        except ValueError:
+            return "not enough info"
+
+    def getConfirmations(self):
+        '''
+        Return the confirmations, computed from the block height and the current chain tip when known
+        '''
+        blockheight = self._transaction.get('blockheight', None)
+        if blockheight:
+            tip_height = connector.getTipHeight(self['wallet'].provider_id)
+            if tip_height is not None:
+                return max(tip_height - blockheight + 1, 0)
         
-        # encode the address in base58
-        encoded_address = misc.b58encode(address)
+        return self._transaction.get('confirmations', 0)
+    
+    def getStatus(self):
+        '''
+        Return the status icon, color and tooltip for the current confirmations
+        '''
+        if self.get('category', False) not in ['receive', 'send']:
+            return {}
         
-        return encoded_address
-
+        confirmations = self.getConfirmations()
+        if confirmations <= MainConfig['globals']['confirmation_limit']:
+            return {'status_icon': 'glyphicon-time', 'status_color': '#AAA', 'tooltip': confirmations}
+        else:
+            return {'status_icon': 'glyphicon-ok-circle', 'status_color': '#1C9E3F', 'tooltip': confirmations}
+    
     def getCurrencySymbol(self):
         '''
         Return the Unicode currency symbol
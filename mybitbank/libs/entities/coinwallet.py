@@ -24,14 +24,23 @@ SOFTWARE.
 """
 
 import hashlib
+import time
 
 from mybitbank.apps.accounts.models import accountFilter
 from mybitbank.libs.connections import connector
-from mybitbank.libs import misc
+from mybitbank.libs import misc, profiling
+from mybitbank.libs.misc.addresscodec import LRUCache
+from blockcache import getBlockCache
 from cacher import Cacher
 from coinaddress import CoinAddress
 from cointransaction import CoinTransaction
-from coinaccount import CoinAccount
+import transactionmirror
+from coinaccount import CoinAccount, history_versions, history_version_max_age
+
+# (provider id, account name) to (addresses, time read), shared between requests
+account_addresses_cache = LRUCache(10000)
+account_addresses_caching_time = 60  # seconds
+
 
 class CoinWallet(object):
     '''
@@ -40,6 +49,7 @@ class CoinWallet(object):
     def __init__(self, wallet_config):
         self._errors = []
         self._config = {}
+        self._account_addresses = {}
         self._cache = Cacher({
              'accounts': {},
              'transactions': {},
@@ -154,6 +164,7 @@ class CoinWallet(object):
         cache_hash = hashlib.sha224(param).hexdigest()
         return cache_hash
     
+    @profiling.traced("CoinWallet.listAccounts")
     def listAccounts(self, gethidden=False, getarchived=False):
         '''
         Get a list of accounts. This method also supports filtering, fetches address for each account etc.
@@ -209,6 +220,36 @@ class CoinWallet(object):
         self._cache.store('accounts', cache_hash, accountObjects)
         return accountObjects
     
+    def prefetchAccountDetails(self, accounts, activity_window=1000):
+        '''
+        Attach the addresses and the last activity to all the accounts using two wallet-wide
+        calls instead of a getaddressesbyaccount and a listtransactions call per account
+        '''
+        addresses_by_account = {}
+        for received in connector.listReceivedByAddress(self.provider_id, 0, True):
+            addresses_by_account.setdefault(received.get('account', ''), []).append(received['address'])
+        
+        last_activity = {}
+        transactions = connector.listTransactionsByAccount("*", self.provider_id, activity_window, 0)
+        for transaction in transactions:
+            account_name = transaction.get('account', '')
+            last_activity[account_name] = max(last_activity.get(account_name, 0), transaction.get('time', 0))
+        
+        # when the window holds the complete history, accounts not in it have no activity at all
+        complete_history = len(transactions) < activity_window
+        
+        for account in accounts:
+            if account.provider_id != self.provider_id:
+                continue
+            
+            account.setAddresses(addresses_by_account.get(account['name'], []))
+            if account['name'] in last_activity:
+                account.setLastActivityTime(last_activity[account['name']])
+            elif complete_history:
+                account.setLastActivityTime(0)
+        
+        return accounts
+    
     def getCurrencySymbol(self):
         '''
         Return the Unicode currency symbol
@@ -231,18 +272,79 @@ class CoinWallet(object):
         if cached_object:
             return cached_object
         
+        if transactionmirror.isSynced(self.provider_id):
+            # page from the local indexed mirror instead of scanning the xxxcoind history
+            transactions_dicts = transactionmirror.listTransactions(self.provider_id, None, limit, start)
+        else:
+            transactions_dicts = connector.listTransactionsByAccount("*", self.provider_id, limit, start)
+        transactions = self.toCoinTransactions(transactions_dicts)
+        
+        self._cache.store('transactions', cache_hash, transactions)
+        return transactions
+    
+    def getHistoryVersion(self):
+        '''
+        Return a value that changes whenever a transaction is added to the wallet history,
+        the count of mirrored entries or the key of the newest xxxcoind entry. Like the chain
+        tip it is read at most every history_version_max_age seconds
+        '''
+        version_key = (self.provider_id, "*")
+        cached_version = history_versions.get(version_key)
+        if cached_version is not None and time.time() - cached_version[1] < history_version_max_age:
+            return cached_version[0]
+        
+        if transactionmirror.isSynced(self.provider_id):
+            version = ('mirror', transactionmirror.countTransactions(self.provider_id))
+        else:
+            newest = connector.listTransactionsByAccount("*", self.provider_id, 1, 0)
+            version = ('coind', transactionmirror.getEntryKey(newest[-1]) if newest else None)
+        
+        history_versions.set(version_key, (version, time.time()))
+        return version
+    
+    def getStateVersion(self):
+        '''
+        Return the state of the wallet as of the chain tip and its transaction history, the
+        confirmations, balances and transactions shown only change along with it
+        '''
+        return (self.provider_id, bool(self.enabled), connector.getTipHash(self.provider_id), self.getHistoryVersion())
+    
+    def toCoinTransactions(self, transactions_dicts):
+        '''
+        Wrap raw transaction entries of this wallet in CoinTransaction objects
+        '''
         transactions = []
-        transactions_dicts = connector.listTransactionsByAccount("*", self.provider_id, limit, start)
         for transaction in transactions_dicts:
             transaction['wallet'] = self
             transaction['currency'] = self.getCurrencyCode()
             transaction['currency_symbol'] = self.getCurrencySymbol()
             transaction['provider_id'] = self.provider_id
             transactions.append(CoinTransaction(transaction))
-        
-        self._cache.store('transactions', cache_hash, transactions)
         return transactions
     
+    def resolveSenderAddresses(self, transactions):
+        '''
+        Fetch the raw transactions of all the receive entries in one batch call
+        and attach the decoded sender addresses to them before rendering
+        '''
+        receive_transactions = []
+        for transaction in transactions:
+            if transaction.provider_id == self.provider_id and transaction['category'] == 'receive':
+                receive_transactions.append(transaction)
+
+        if not receive_transactions:
+            return transactions
+
+        raw_transactions = connector.getRawTransactions([transaction['txid'] for transaction in receive_transactions], self.provider_id)
+
+        net = self.getNet()
+        for transaction in receive_transactions:
+            raw_transaction = raw_transactions.get(transaction['txid'], {})
+            transaction.setRawTransaction(raw_transaction)
+            transaction.setSenderAddress(transaction.decodeScriptSig(raw_transaction, self.getCurrencyCode(), net))
+
+        return transactions
+
     def getAccountByName(self, name):
         '''
         Return CoinAccount() for name
@@ -258,30 +360,58 @@ class CoinWallet(object):
         '''
         Return a transaction by txid
         '''
-        # check for cached data, use that or get it again
-        cache_hash = self.getParamHash("txid=%s" % (txid))
-        cached_object = self._cache.fetch('transactiondetails', cache_hash)
-        if cached_object:
-            return cached_object
+        # confirmed transactions are cached until a reorg orphans their block
+        block_cache = getBlockCache(self.provider_id)
+        tip_height = connector.getTipHeight(self.provider_id)
+        block_cache.checkTip(tip_height, lambda height: connector.getBlockHash(self.provider_id, height))
+        
+        transaction_details = block_cache.fetch(txid)
+        if transaction_details is None:
+            transaction_details = connector.getTransaction(txid, self.provider_id)
+            misc.pinBlockHeights([transaction_details], connector.getBlockCount(self.provider_id))
+            if transaction_details.get('blockheight', None) is not None:
+                block_cache.store(txid, transaction_details, transaction_details['blockheight'], transaction_details.get('blockhash', None))
         
-        transaction_details = connector.getTransaction(txid, self.provider_id)
+        # CoinTransaction alters the dict it is given
+        transaction_details = dict(transaction_details)
         transaction_details['currency'] = self.getCurrencyCode()
         transaction_details['wallet'] = self
-        
-        self._cache.store('transactiondetails', cache_hash, transaction_details)
         return CoinTransaction(transaction_details)
     
     def getAddressesByAccount(self, account):
         '''
-        Get a list of address for account
+        Get a tuple of addresses for account. The address strings are cached process-wide per provider,
+        the CoinAddress objects once per wallet, so every entry of the same account shares the same tuple
         '''
-        addresses_list = connector.getAddressesByAccount(account, self.provider_id)
-        coinaddresses = []
-        for address in addresses_list:
-            coinaddresses.append(CoinAddress(address, account))
-            
+        if type(account) in [str, unicode]:
+            name = account
+        else:
+            name = account['name']
+        
+        if name in self._account_addresses:
+            return self._account_addresses[name]
+        
+        # accounts without addresses are cached too
+        cached_addresses = account_addresses_cache.get((self.provider_id, name))
+        if cached_addresses is not None and time.time() - cached_addresses[1] < account_addresses_caching_time:
+            addresses_list = cached_addresses[0]
+        else:
+            addresses_list = tuple(connector.getAddressesByAccount(name, self.provider_id) or [])
+            account_addresses_cache.set((self.provider_id, name), (addresses_list, time.time()))
+        
+        coinaddresses = tuple([CoinAddress(address, account) for address in addresses_list])
+        self._account_addresses[name] = coinaddresses
         return coinaddresses
     
+    def forgetAccountAddresses(self):
+        '''
+        Drop the cached account addresses of this wallet, eg. after a new address has been created
+        '''
+        self._account_addresses = {}
+        
+        # the other providers read their addresses again too, new addresses are rare
+        account_addresses_cache.clear()
+    
     def getDefaultAccount(self):
         '''
         Return the CoinAccount object for the default wallet account
@@ -0,0 +1,155 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import datetime
+import hashlib
+
+from django.db.models import Q
+from django.utils.timezone import utc
+
+from mybitbank.apps.transactions.models import TransactionMirror, TransactionMirrorState
+
+
+# the mirror is not used for reading when it has not been synced for this long (seconds)
+max_sync_age = 300
+
+
+def getEntryKey(entry):
+    '''
+    Build a unique key for a listtransactions/listsinceblock entry
+    '''
+    if entry.get('category') == 'move':
+        parts = ['move', entry.get('account', ''), entry.get('otheraccount', ''), entry.get('time', 0), entry.get('amount', 0), entry.get('comment', '')]
+    else:
+        parts = [entry.get('txid', ''), entry.get('category', ''), entry.get('account', ''), entry.get('address', ''), entry.get('vout', ''), entry.get('amount', 0)]
+    
+    key = u"|".join([unicode(part) for part in parts])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def isSynced(provider_id):
+    '''
+    Return True if the mirror of provider_id is recent enough to be read instead of the xxxcoind
+    '''
+    oldest = datetime.datetime.utcnow().replace(tzinfo=utc) - datetime.timedelta(seconds=max_sync_age)
+    return TransactionMirrorState.objects.filter(provider_id=provider_id, updated__gte=oldest).exists()
+
+
+def toEntry(mirrored):
+    '''
+    Convert a TransactionMirror row back to a listtransactions-like entry dict
+    '''
+    entry = {
+             'account': mirrored.account,
+             'category': mirrored.category,
+             'amount': mirrored.amount,
+             'confirmations': mirrored.confirmations,
+             'time': mirrored.time,
+             'entry_key': mirrored.entry_key,
+             }
+    
+    for field in ['txid', 'address', 'otheraccount', 'blockhash', 'comment']:
+        if getattr(mirrored, field):
+            entry[field] = getattr(mirrored, field)
+    
+    for field in ['vout', 'fee', 'blockheight', 'blockindex', 'blocktime', 'timereceived']:
+        if getattr(mirrored, field) is not None:
+            entry[field] = getattr(mirrored, field)
+    
+    if mirrored.comment_to:
+        entry['to'] = mirrored.comment_to
+    
+    return entry
+
+
+def filterMirrored(mirrored, filters=None):
+    '''
+    Apply transaction filters (see feed.getFilters) to a TransactionMirror queryset
+    '''
+    filters = filters or {}
+    lookups = {
+               'category': 'category',
+               'account': 'account',
+               'address': 'address',
+               'min_amount': 'amount__gte',
+               'max_amount': 'amount__lte',
+               'since': 'time__gte',
+               'until': 'time__lte',
+               }
+    for field, lookup in lookups.items():
+        if field in filters:
+            mirrored = mirrored.filter(**{lookup: filters[field]})
+    
+    if 'exclude_category' in filters:
+        mirrored = mirrored.exclude(category=filters['exclude_category'])
+    
+    return mirrored
+
+
+def listTransactions(provider_id, account_name=None, limit=10, start=0, filters=None):
+    '''
+    Return the newest entries of provider_id (optionally for a single account), newest first
+    '''
+    mirrored = filterMirrored(TransactionMirror.objects.filter(provider_id=provider_id), filters)
+    if account_name is not None:
+        mirrored = mirrored.filter(account=account_name)
+    
+    return [toEntry(row) for row in mirrored.order_by('-time', '-id')[start:start + limit]]
+
+
+def getLastBlock(provider_id):
+    '''
+    Return the block the mirror of provider_id was last synced to, None if it was never synced
+    '''
+    lastblocks = TransactionMirrorState.objects.filter(provider_id=provider_id).values_list('lastblock', flat=True)
+    return lastblocks[0] if lastblocks else None
+
+
+def countTransactions(provider_id, account_name=None):
+    '''
+    Return the number of mirrored entries of provider_id (optionally for a single account)
+    '''
+    mirrored = TransactionMirror.objects.filter(provider_id=provider_id)
+    if account_name is not None:
+        mirrored = mirrored.filter(account=account_name)
+    return mirrored.count()
+
+
+def listTransactionsByCursor(provider_id, cursor_time=None, cursor_key=None, older=True, limit=10, filters=None):
+    '''
+    Keyset paging over (time, entry_key). Return up to limit entries older than the
+    cursor newest first, or newer than the cursor oldest first if older is False
+    '''
+    mirrored = filterMirrored(TransactionMirror.objects.filter(provider_id=provider_id), filters)
+    if older:
+        if cursor_time is not None:
+            mirrored = mirrored.filter(Q(time__lt=cursor_time) | Q(time=cursor_time, entry_key__lt=cursor_key))
+        mirrored = mirrored.order_by('-time', '-entry_key')
+    else:
+        if cursor_time is not None:
+            mirrored = mirrored.filter(Q(time__gt=cursor_time) | Q(time=cursor_time, entry_key__gt=cursor_key))
+        mirrored = mirrored.order_by('time', 'entry_key')
+    
+    return [toEntry(row) for row in mirrored[:limit]]
@@ -0,0 +1,141 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import json
+import logging
+import threading
+import time
+
+from django.db import connection
+from django.http import HttpResponse
+from django.utils import translation
+
+from mybitbank.libs import metrics, profiling
+from mybitbank.libs.misc.addresscodec import LRUCache
+
+
+logger = logging.getLogger(__name__)
+
+# seconds a fragment may take before its last good version is served instead
+fragment_timeout = 3
+
+# last good content of every fragment, the fallback of a slow or failing build
+_fallbacks = LRUCache(500)
+
+# fragments built less than this many seconds ago are served as they are, a burst of
+# browsers reloading a fragment after a live update costs one build
+fragment_max_age = 2
+
+# builds still running, a stalled node gets one build at a time
+_builds = {}
+
+_lock = threading.Lock()
+
+# rendered fragments are reused for as long as the wallet state they were rendered for holds,
+# but not longer than this many seconds so that relative dates ("5 minutes ago") move on
+rendered_max_age = 60
+
+# rendered fragments by key, along with the wallet state version they were rendered for
+_rendered = LRUCache(500)
+
+
+def runBuild(key, builder, language=None):
+    '''
+    Worker thread body: build the fragment in the language of the request and keep it as the fallback
+    '''
+    if language:
+        translation.activate(language)
+    try:
+        content = builder()
+        with _lock:
+            _fallbacks.set(key, {'content': content, 'updated': time.time(), 'worker': threading.current_thread()})
+    except Exception:
+        logger.exception("Building fragment %s failed" % (key,))
+    finally:
+        with _lock:
+            _builds.pop(key, None)
+        translation.deactivate()
+        connection.close()
+
+
+def build(key, builder, timeout=fragment_timeout, max_age=fragment_max_age):
+    '''
+    Run builder() for at most timeout seconds. A build that takes longer keeps running in the
+    background and refreshes the fallback when it finishes. Returns a dict with the content,
+    whether it is stale and when it was built; content is None when nothing was ever built.
+    key should come from getRenderKey() when the content depends on the user.
+    '''
+    fallback = _fallbacks.get(key, None)
+    if fallback is not None and time.time() - fallback['updated'] < max_age:
+        return {'content': fallback['content'], 'stale': False, 'updated': fallback['updated']}
+    
+    with _lock:
+        worker = _builds.get(key, None)
+        if worker is None:
+            worker = threading.Thread(target=runBuild, args=(key, builder, translation.get_language()))
+            worker.daemon = True
+            _builds[key] = worker
+            worker.start()
+    
+    worker.join(timeout)
+    
+    fallback = _fallbacks.get(key, None)
+    if fallback is None:
+        return {'content': None, 'stale': True, 'updated': None}
+    
+    return {'content': fallback['content'], 'stale': fallback['worker'] is not worker, 'updated': fallback['updated']}
+
+
+def response(key, builder, timeout=fragment_timeout):
+    '''
+    JSON response of a fragment built with build()
+    '''
+    fragment = build(key, builder, timeout)
+    return HttpResponse(json.dumps(fragment), content_type="application/json")
+
+
+def getRenderKey(request, *parts):
+    '''
+    Key of a rendered fragment, parts along with the settings and the language of the user
+    '''
+    return parts + (request.user.setting.getAll(), translation.get_language())
+
+
+def cached(key, version, builder, max_age=rendered_max_age):
+    '''
+    Return builder() for key, or what it returned the last time as long as that was for the
+    same version (see getStateVersion()) and not longer than max_age seconds ago. A hit
+    skips both building the entities and rendering them.
+    '''
+    rendered = _rendered.get(key)
+    hit = rendered is not None and rendered['version'] == version and time.time() - rendered['updated'] < max_age
+    profiling.recordCache(hit)
+    metrics.recordCache('fragments', hit)
+    if hit:
+        return rendered['content']
+    
+    content = builder()
+    _rendered.set(key, {'version': version, 'content': content, 'updated': time.time()})
+    return content
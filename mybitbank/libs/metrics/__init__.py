@@ -0,0 +1,160 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import threading
+
+from mybitbank.libs.bitcoinrpc import authproxy
+from mybitbank.libs.profiling import getProviderId
+
+
+# upper bounds (seconds) of the latency histogram buckets
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name: (type, help) of the exported metrics
+definitions = {
+               'mybitbank_rpc_duration_seconds': ('histogram', "Latency of xxxcoind JSON-RPC calls"),
+               'mybitbank_rpc_errors_total': ('counter', "Failed xxxcoind JSON-RPC calls"),
+               'mybitbank_provider_disabled_total': ('counter', "Times a currency provider was disabled after an error"),
+               'mybitbank_provider_enabled': ('gauge', "Whether a currency provider is enabled (1) or disabled (0)"),
+               'mybitbank_cache_lookups_total': ('counter', "Cache lookups by cache and result"),
+               'mybitbank_request_duration_seconds': ('histogram', "Latency of requests per view"),
+               'mybitbank_unconfirmed_transactions': ('gauge', "Wallet transactions waiting for confirmations"),
+               'mybitbank_search_index_backlog': ('gauge', "Mirrored transactions not yet indexed for search"),
+               'mybitbank_mirror_sync_age_seconds': ('gauge', "Seconds since the transaction mirror was last synced"),
+               }
+
+# counters and histograms of all threads, {(name, labels): value}
+_registry = {}
+_lock = threading.Lock()
+
+
+def getLabels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, labels={}, value=1):
+    '''
+    Increase a counter
+    '''
+    key = (name, getLabels(labels))
+    with _lock:
+        _registry[key] = _registry.get(key, 0) + value
+
+
+def observe(name, labels, seconds):
+    '''
+    Record a value in a histogram, kept as bucket counts followed by the sum and the count
+    '''
+    key = (name, getLabels(labels))
+    with _lock:
+        histogram = _registry.get(key, None)
+        if histogram is None:
+            histogram = _registry[key] = [0] * (len(latency_buckets) + 2)
+        for index, bound in enumerate(latency_buckets):
+            if seconds <= bound:
+                histogram[index] += 1
+        histogram[-2] += seconds
+        histogram[-1] += 1
+
+
+def collect():
+    '''
+    Return a copy of the counters and histograms, {name: {labels: value}}
+    '''
+    totals = {}
+    with _lock:
+        for (name, labels), value in _registry.items():
+            totals.setdefault(name, {})[labels] = list(value) if isinstance(value, list) else value
+    return totals
+
+
+def reset():
+    '''
+    Drop all counters
+    '''
+    with _lock:
+        _registry.clear()
+
+
+def formatLabels(labels, extra=()):
+    labels = tuple(labels) + tuple(extra)
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = unicode(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(u'%s="%s"' % (key, value))
+    return u"{%s}" % u",".join(pairs)
+
+
+def formatValue(value):
+    return repr(float(value))
+
+
+def render(gauges={}):
+    '''
+    Return the counters, histograms and the given gauges ({name: {labels: value}}, labels as
+    (key, value) pairs) in the Prometheus text exposition format
+    '''
+    samples = collect()
+    for name, values in gauges.items():
+        samples.setdefault(name, {}).update(values)
+    
+    lines = []
+    for name in sorted(samples.keys()):
+        kind, help_text = definitions.get(name, ('untyped', ""))
+        lines.append(u"# HELP %s %s" % (name, help_text))
+        lines.append(u"# TYPE %s %s" % (name, kind))
+        for labels in sorted(samples[name].keys()):
+            value = samples[name][labels]
+            if kind == 'histogram':
+                for index, bound in enumerate(latency_buckets):
+                    lines.append(u"%s_bucket%s %s" % (name, formatLabels(labels, [('le', repr(bound))]), formatValue(value[index])))
+                lines.append(u"%s_bucket%s %s" % (name, formatLabels(labels, [('le', "+Inf")]), formatValue(value[-1])))
+                lines.append(u"%s_sum%s %s" % (name, formatLabels(labels), formatValue(value[-2])))
+                lines.append(u"%s_count%s %s" % (name, formatLabels(labels), formatValue(value[-1])))
+            else:
+                lines.append(u"%s%s %s" % (name, formatLabels(labels), formatValue(value)))
+    return u"\n".join(lines) + u"\n"
+
+
+def recordRpc(host, method, seconds, response_bytes, error=False):
+    '''
+    authproxy call observer, counts every xxxcoind call
+    '''
+    if method.startswith("batch("):
+        # drop the batch size, it would make a new series for every size
+        method = "%s)" % method.split(" x")[0]
+    labels = {'provider': getProviderId(host), 'method': method}
+    observe('mybitbank_rpc_duration_seconds', labels, seconds)
+    if error:
+        inc('mybitbank_rpc_errors_total', labels)
+
+
+def recordCache(cache, hit):
+    inc('mybitbank_cache_lookups_total', {'cache': cache, 'result': hit and "hit" or "miss"})
+
+
+authproxy.call_observers.append(recordRpc)
@@ -0,0 +1,74 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import datetime
+
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.timezone import utc
+
+from mybitbank.apps.transactions.models import TransactionMirror, TransactionMirrorState, UnconfirmedTransaction
+from mybitbank.libs import metrics, misc
+from mybitbank.libs.connections import connector
+
+
+def getGauges():
+    '''
+    Gauges read when the metrics are scraped: provider state and the backlogs of the
+    synctransactions/walletnotify jobs
+    '''
+    gauges = {
+              'mybitbank_provider_enabled': {},
+              'mybitbank_unconfirmed_transactions': {},
+              'mybitbank_search_index_backlog': {},
+              'mybitbank_mirror_sync_age_seconds': {},
+              }
+    
+    for provider_id, config in connector.config.items():
+        gauges['mybitbank_provider_enabled'][(('provider', provider_id),)] = config.get('enabled', False) is True and 1 or 0
+        gauges['mybitbank_unconfirmed_transactions'][(('provider', provider_id),)] = 0
+        gauges['mybitbank_search_index_backlog'][(('provider', provider_id),)] = 0
+    
+    for row in UnconfirmedTransaction.objects.values('provider_id').annotate(total=Count('id')):
+        gauges['mybitbank_unconfirmed_transactions'][(('provider', row['provider_id']),)] = row['total']
+    
+    for row in TransactionMirror.objects.filter(indexed=False).values('provider_id').annotate(total=Count('id')):
+        gauges['mybitbank_search_index_backlog'][(('provider', row['provider_id']),)] = row['total']
+    
+    now = datetime.datetime.utcnow().replace(tzinfo=utc)
+    for state in TransactionMirrorState.objects.all():
+        gauges['mybitbank_mirror_sync_age_seconds'][(('provider', state.provider_id),)] = (now - state.updated).total_seconds()
+    
+    return gauges
+
+
+def metricsView(request):
+    '''
+    Metrics in the Prometheus text format, for staff users and scrapers with the METRICS_TOKEN
+    '''
+    if not misc.isMonitoringAllowed(request):
+        return HttpResponseForbidden("Forbidden")
+    
+    return HttpResponse(metrics.render(getGauges()), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -1,7 +1,11 @@
 import datetime
 import dateutil.relativedelta
+import hmac
+
+from django.conf import settings
 
 from mybitbank.libs.config import MainConfig
+from mybitbank.libs.misc import addresscodec
 
 
 def longNumber(x):
@@ -105,6 +109,18 @@ def buildBreadcrumbs(current_section='dashboard', currect_subsection='', current
         
     return breadcrumbs
     
+def isMonitoringAllowed(request):
+    '''
+    Monitoring pages (metrics, slow requests) are for staff users and for scrapers sending
+    the METRICS_TOKEN setting as a bearer token
+    '''
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', "")
+    if token and authorization.startswith("Bearer ") and hmac.compare_digest(str(authorization[7:].strip()), str(token)):
+        return True
+    user = getattr(request, 'user', None)
+    return user is not None and user.is_authenticated() and user.is_staff
+    
 def prettyPrint(o):
     '''
     Print in a pretty way something
@@ -162,28 +178,33 @@ def getInitialProviderId(connector):
 def b58encode(v):
     ''' 
     Encode v, which is a string of bytes, to base58.
-    Source: https://github.com/bitcoin-abe/bitcoin-abe/blob/master/Abe/base58.py
     '''
+    return addresscodec.b58encode(v)
     
-    __b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
-    __b58base = len(__b58chars)
-    
-    long_value = 0L
-    for (i, c) in enumerate(v[::-1]):
-        long_value += ord(c) << (8 * i)  # 2x speedup vs. exponentiation
-    
-    result = ''
-    while long_value >= __b58base:
-        div, mod = divmod(long_value, __b58base)
-        result = __b58chars[mod] + result
-        long_value = div
-    result = __b58chars[long_value] + result
+def findForkHeight(recorded_blocks, tip_height, getBlockHash, max_depth=100):
+    '''
+    Compare recorded {height: blockhash} pairs with the current chain, newest first, and return
+    the lowest height that does not match anymore, None if the recorded blocks are all still there
+    '''
+    fork_height = None
+    for height in sorted(recorded_blocks.keys(), reverse=True)[:max_depth]:
+        # blocks above a shorter tip are gone, no need to ask
+        if height <= tip_height and getBlockHash(height) == recorded_blocks[height]:
+            break
+        fork_height = height
     
-    # Bitcoin does a little leading-zero-compression:
-    # leading 0-bytes in the input become leading-1s
-    nPad = 0
-    for c in v:
-        if c == '\0': nPad += 1
-        else: break
+    return fork_height
 
-    return (__b58chars[0] * nPad) + result
+def pinBlockHeights(entries, tip_height):
+    '''
+    Set the block height of the confirmed entries to tip_height - confirmations + 1. The tip
+    has to be read right after listing the entries, a block found in between only makes
+    them show one confirmation less
+    '''
+    if tip_height is None:
+        return entries
+    
+    for entry in entries:
+        if entry.get('confirmations', 0) > 0:
+            entry['blockheight'] = tip_height - entry['confirmations'] + 1
+    return entries
@@ -0,0 +1,358 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import binascii
+import collections
+import hashlib
+import struct
+import threading
+
+
+# address version bytes per currency and network
+# source: https://github.com/zamgo/PHPCoinAddress/blob/master/README.md
+prefixes = {
+            'btc': {'mainnet': '\x00', 'testnet': '\x6f'},
+            'ltc': {'mainnet': '\x30', 'testnet': '\x6f'},
+            'ftc': {'mainnet': '\x0E', 'testnet': '\x6f'},
+            'ppc': {'mainnet': '\x37', 'testnet': '\x6f'},
+            'nmc': {'mainnet': '\x34', 'testnet': '\x6f'},
+            'nvc': {'mainnet': '\x08', 'testnet': '\x6f'},
+            'doge': {'mainnet': '\x30', 'testnet': '\x6f'},
+           }
+
+# human readable parts of segwit (bech32) addresses, those are left to the xxxcoind to validate
+bech32_prefixes = ['bc1', 'tb1', 'bcrt1', 'ltc1', 'tltc1', 'rltc1']
+
+b58chars = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+b58values = dict((c, i) for i, c in enumerate(b58chars))
+
+
+class LRUCache(object):
+    '''
+    Small thread safe least-recently-used cache with a bounded number of entries
+    '''
+    
+    def __init__(self, maxsize=10000):
+        self._maxsize = maxsize
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._entries.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries[key] = value
+            self.hits += 1
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+# pubkey/hash160 to address cache
+address_cache = LRUCache(10000)
+
+
+def getPrefix(currency, net='mainnet'):
+    '''
+    Return the version byte for currency and net
+    '''
+    return prefixes[currency.lower()][net]
+
+
+def _ripemd160(data):
+    '''
+    Pure Python RIPEMD-160, used only when hashlib is built without it (eg. OpenSSL 3)
+    '''
+    rl = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+          7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+          3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+          1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+          4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13]
+    rr = [5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+          6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+          15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+          8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+          12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11]
+    sl = [11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+          7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+          11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+          11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+          9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6]
+    sr = [8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+          9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+          9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+          15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+          8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11]
+    kl = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+    kr = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+    mask = 0xffffffff
+    
+    def f(j, x, y, z):
+        if j < 16:
+            return x ^ y ^ z
+        elif j < 32:
+            return (x & y) | (~x & z)
+        elif j < 48:
+            return (x | ~y) ^ z
+        elif j < 64:
+            return (x & z) | (y & ~z)
+        else:
+            return x ^ (y | ~z)
+    
+    def rol(x, n):
+        return ((x << n) | (x >> (32 - n))) & mask
+    
+    length = len(data)
+    data += '\x80' + '\x00' * ((55 - length) % 64) + struct.pack('<Q', (length * 8) & 0xffffffffffffffff)
+    
+    h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+    for offset in range(0, len(data), 64):
+        x = struct.unpack('<16I', data[offset:offset + 64])
+        al, bl, cl, dl, el = h
+        ar, br, cr, dr, er = h
+        for j in range(80):
+            t = (rol((al + (f(j, bl, cl, dl) & mask) + x[rl[j]] + kl[j // 16]) & mask, sl[j]) + el) & mask
+            al, el, dl, cl, bl = el, dl, rol(cl, 10), bl, t
+            t = (rol((ar + (f(79 - j, br, cr, dr) & mask) + x[rr[j]] + kr[j // 16]) & mask, sr[j]) + er) & mask
+            ar, er, dr, cr, br = er, dr, rol(cr, 10), br, t
+        t = (h[1] + cl + dr) & mask
+        h[1] = (h[2] + dl + er) & mask
+        h[2] = (h[3] + el + ar) & mask
+        h[3] = (h[4] + al + br) & mask
+        h[4] = (h[0] + bl + cr) & mask
+        h[0] = t
+    
+    return struct.pack('<5I', *h)
+
+
+def ripemd160(data):
+    '''
+    RIPEMD-160 digest of data
+    '''
+    try:
+        ripe = hashlib.new('ripemd160')
+    except ValueError:
+        return _ripemd160(data)
+    ripe.update(data)
+    return ripe.digest()
+
+
+def hash160(data):
+    '''
+    RIPEMD-160 of the SHA-256 of data
+    '''
+    return ripemd160(hashlib.sha256(data).digest())
+
+
+def checksum(data):
+    '''
+    First four bytes of the double SHA-256 of data
+    '''
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()[:4]
+
+
+def b58encode(v):
+    '''
+    Encode v, which is a string of bytes, to base58
+    '''
+    if not v:
+        return ''
+    
+    long_value = int(binascii.hexlify(v), 16)
+    
+    result = []
+    while long_value:
+        long_value, mod = divmod(long_value, 58)
+        result.append(b58chars[mod])
+    
+    # Bitcoin does a little leading-zero-compression:
+    # leading 0-bytes in the input become leading-1s
+    npad = len(v) - len(v.lstrip('\0'))
+    
+    return b58chars[0] * npad + ''.join(reversed(result))
+
+
+def b58decode(v):
+    '''
+    Decode a base58 string to a string of bytes, raise ValueError on invalid characters
+    '''
+    long_value = 0
+    for c in v:
+        try:
+            long_value = long_value * 58 + b58values[c]
+        except KeyError:
+            raise ValueError('Invalid base58 character %r' % c)
+    
+    if long_value:
+        hex_value = '%x' % long_value
+        if len(hex_value) % 2:
+            hex_value = '0' + hex_value
+        result = binascii.unhexlify(hex_value)
+    else:
+        result = ''
+    
+    npad = len(v) - len(v.lstrip(b58chars[0]))
+    return '\0' * npad + result
+
+
+def b58checkEncode(version, payload):
+    '''
+    Base58check encode payload with the version byte
+    '''
+    data = version + payload
+    return b58encode(data + checksum(data))
+
+
+def b58checkDecode(address):
+    '''
+    Decode a base58check string to (version, payload), raise ValueError if the checksum is wrong
+    '''
+    data = b58decode(address)
+    if len(data) < 5:
+        raise ValueError('Address is too short')
+    
+    if checksum(data[:-4]) != data[-4:]:
+        raise ValueError('Invalid address checksum')
+    
+    return data[0], data[1:-4]
+
+
+def hash160ToAddress(h160, currency, net='mainnet'):
+    '''
+    Encode a hash160 to an address for currency and net
+    '''
+    return b58checkEncode(getPrefix(currency, net), h160)
+
+
+def pubkeyToAddress(pubkey, currency, net='mainnet'):
+    '''
+    Return the address of a hex public key, compressed (66 digits) or not (130 digits).
+    Raises ValueError for anything else. Results are kept in a bounded LRU cache
+    '''
+    prefix = getPrefix(currency, net)
+    cache_key = (pubkey, prefix)
+    address = address_cache.get(cache_key)
+    if address is None:
+        if len(pubkey) not in [66, 130]:
+            raise ValueError("Not a public key: %r" % (pubkey,))
+        try:
+            pubkey_bytes = binascii.unhexlify(pubkey)
+        except TypeError:
+            raise ValueError("Not a public key: %r" % (pubkey,))
+        address = b58checkEncode(prefix, hash160(pubkey_bytes))
+        address_cache.set(cache_key, address)
+    return address
+
+
+def pubkeysToAddresses(pubkeys, currency, net='mainnet'):
+    '''
+    Batch version of pubkeyToAddress(), duplicate keys are only encoded once
+    '''
+    addresses = {}
+    for pubkey in pubkeys:
+        if pubkey not in addresses:
+            addresses[pubkey] = pubkeyToAddress(pubkey, currency, net)
+    return [addresses[pubkey] for pubkey in pubkeys]
+
+
+def isValidAddress(address, currency=None, net=None):
+    '''
+    Validate a base58check address, optionally checking its version byte against currency and net
+    '''
+    if type(address) not in [str, unicode] or not (25 <= len(address) <= 35):
+        return False
+    
+    try:
+        version, payload = b58checkDecode(str(address))
+    except (ValueError, UnicodeEncodeError):
+        return False
+    
+    if len(payload) != 20:
+        return False
+    
+    if currency is not None:
+        currency_prefixes = prefixes.get(currency.lower(), {})
+        if net is not None:
+            return currency_prefixes.get(net) == version
+        # the version byte of pay-to-script-hash addresses is not tracked, accept any known network
+        return version in currency_prefixes.values()
+    
+    return True
+
+
+def isBech32Address(address):
+    '''
+    Return True if address carries a segwit (bech32) prefix, these are not decoded locally
+    '''
+    return type(address) in [str, unicode] and address.lower().startswith(tuple(bech32_prefixes))
+
+
+def benchmark(rounds=10000):
+    '''
+    Micro-benchmark of the address codec, run with:
+    DJANGO_SETTINGS_MODULE=mybitbank.settings python -m mybitbank.libs.misc.addresscodec
+    '''
+    import timeit
+    
+    pubkey = '03d0b8349514469b2c42b41f2aa8982d4b9a666c1662865bd4728c04ad535739f4'
+    address = pubkeyToAddress(pubkey, 'btc', 'testnet')
+    raw_address = b58decode(address)
+    
+    def uncached():
+        address_cache.clear()
+        pubkeyToAddress(pubkey, 'btc', 'testnet')
+    
+    tests = [
+             ('b58encode', lambda: b58encode(raw_address)),
+             ('b58decode', lambda: b58decode(address)),
+             ('isValidAddress', lambda: isValidAddress(address, 'btc', 'testnet')),
+             ('pubkeyToAddress (uncached)', uncached),
+             ('pubkeyToAddress (cached)', lambda: pubkeyToAddress(pubkey, 'btc', 'testnet')),
+             ]
+    
+    for name, test in tests:
+        seconds = timeit.timeit(test, number=rounds)
+        print '%-30s %8.2f usec/call' % (name, seconds * 1000000 / rounds)
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,231 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import hashlib
+import struct
+from decimal import Decimal
+
+
+# script opcodes we care about when building the asm representation
+opcodes = {
+    0x00: 'OP_0',
+    0x4f: 'OP_1NEGATE',
+    0x61: 'OP_NOP',
+    0x6a: 'OP_RETURN',
+    0x76: 'OP_DUP',
+    0x87: 'OP_EQUAL',
+    0x88: 'OP_EQUALVERIFY',
+    0xa9: 'OP_HASH160',
+    0xac: 'OP_CHECKSIG',
+    0xad: 'OP_CHECKSIGVERIFY',
+    0xae: 'OP_CHECKMULTISIG',
+    0xaf: 'OP_CHECKMULTISIGVERIFY',
+}
+for n in range(1, 17):
+    opcodes[0x50 + n] = 'OP_%s' % n
+
+COIN = Decimal(100000000)
+
+
+class RawTransactionReader(object):
+    '''
+    Sequential reader over the bytes of a serialized transaction
+    '''
+    
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+    
+    @property
+    def offset(self):
+        return self._offset
+    
+    def remaining(self):
+        return len(self._data) - self._offset
+    
+    def read(self, length):
+        if length > self.remaining():
+            raise ValueError('Unexpected end of transaction data at offset %s' % self._offset)
+        chunk = self._data[self._offset:self._offset + length]
+        self._offset += length
+        return chunk
+    
+    def readUInt8(self):
+        return ord(self.read(1))
+    
+    def readUInt32(self):
+        return struct.unpack('<I', self.read(4))[0]
+    
+    def readUInt64(self):
+        return struct.unpack('<Q', self.read(8))[0]
+    
+    def readVarInt(self):
+        size = self.readUInt8()
+        if size < 0xfd:
+            return size
+        elif size == 0xfd:
+            return struct.unpack('<H', self.read(2))[0]
+        elif size == 0xfe:
+            return self.readUInt32()
+        else:
+            return self.readUInt64()
+    
+    def readVarString(self):
+        return self.read(self.readVarInt())
+
+
+def scriptToAsm(script):
+    '''
+    Return the asm representation of a script, data pushes are hex encoded
+    the same way xxxcoind does in the verbose getrawtransaction output
+    '''
+    reader = RawTransactionReader(script)
+    tokens = []
+    while reader.remaining():
+        opcode = reader.readUInt8()
+        if 0 < opcode < 0x4c:
+            length = opcode
+        elif opcode == 0x4c:
+            length = reader.readUInt8()
+        elif opcode == 0x4d:
+            length = struct.unpack('<H', reader.read(2))[0]
+        elif opcode == 0x4e:
+            length = reader.readUInt32()
+        else:
+            tokens.append(opcodes.get(opcode, 'OP_UNKNOWN'))
+            continue
+        
+        if length > reader.remaining():
+            tokens.append('[error]')
+            break
+        tokens.append(reader.read(length).encode('hex'))
+    
+    return ' '.join(tokens)
+
+
+def scriptType(script):
+    '''
+    Return the standard type of an output script
+    '''
+    if len(script) == 25 and script[0:3] == '\x76\xa9\x14' and script[23:25] == '\x88\xac':
+        return 'pubkeyhash'
+    elif len(script) == 23 and script[0:2] == '\xa9\x14' and script[22] == '\x87':
+        return 'scripthash'
+    elif len(script) in [35, 67] and ord(script[0]) == len(script) - 2 and script[-1] == '\xac':
+        return 'pubkey'
+    elif len(script) and script[0] == '\x6a':
+        return 'nulldata'
+    else:
+        return 'nonstandard'
+
+
+def _deserialize(data, has_time):
+    '''
+    Deserialize the transaction bytes, raise ValueError if the data is not a valid transaction
+    '''
+    reader = RawTransactionReader(data)
+    transaction = {}
+    
+    transaction['version'] = reader.readUInt32()
+    if has_time:
+        # PPcoin style transactions carry a timestamp after the version
+        transaction['time'] = reader.readUInt32()
+    
+    segwit = False
+    vin_count = reader.readVarInt()
+    if vin_count == 0 and not has_time:
+        # segregated witness marker and flag
+        if reader.readUInt8() != 1:
+            raise ValueError('Invalid segwit flag')
+        segwit = True
+        witness_start = reader.offset
+        vin_count = reader.readVarInt()
+    
+    transaction['vin'] = []
+    for i in range(vin_count):
+        prev_txid = reader.read(32)[::-1].encode('hex')
+        prev_vout = reader.readUInt32()
+        script_sig = reader.readVarString()
+        sequence = reader.readUInt32()
+        if prev_txid == '0' * 64 and prev_vout == 0xffffffff:
+            transaction['vin'].append({'coinbase': script_sig.encode('hex'), 'sequence': sequence})
+        else:
+            transaction['vin'].append({
+                                       'txid': prev_txid,
+                                       'vout': prev_vout,
+                                       'scriptSig': {'asm': scriptToAsm(script_sig), 'hex': script_sig.encode('hex')},
+                                       'sequence': sequence,
+                                       })
+    
+    transaction['vout'] = []
+    for n in range(reader.readVarInt()):
+        value = reader.readUInt64()
+        script_pubkey = reader.readVarString()
+        transaction['vout'].append({
+                                    'n': n,
+                                    'value': (Decimal(value) / COIN).quantize(Decimal('0.00000001')),
+                                    'scriptPubKey': {'asm': scriptToAsm(script_pubkey), 'hex': script_pubkey.encode('hex'), 'type': scriptType(script_pubkey)},
+                                    })
+    
+    outputs_end = reader.offset
+    if segwit:
+        for vin in transaction['vin']:
+            vin['txinwitness'] = [reader.readVarString().encode('hex') for j in range(reader.readVarInt())]
+    
+    locktime_data = reader.read(4)
+    transaction['locktime'] = struct.unpack('<I', locktime_data)[0]
+    
+    if reader.remaining():
+        raise ValueError('Trailing data after the end of the transaction')
+    
+    # the txid is calculated over the serialization without the witness data
+    if segwit:
+        txid_data = data[0:4] + data[witness_start:outputs_end] + locktime_data
+    else:
+        txid_data = data
+    transaction['txid'] = hashlib.sha256(hashlib.sha256(txid_data).digest()).digest()[::-1].encode('hex')
+    transaction['hex'] = data.encode('hex')
+    
+    return transaction
+
+
+def deserializeTransaction(raw_hex, has_time=None):
+    '''
+    Parse the hex of a serialized transaction, as returned by the non-verbose getrawtransaction
+    or the "hex" field of gettransaction, into the same structure the verbose getrawtransaction returns.
+    If has_time is None both the bitcoin and the PPcoin style serializations are tried.
+    '''
+    try:
+        data = raw_hex.decode('hex')
+    except (TypeError, AttributeError):
+        raise ValueError('Transaction data is not a valid hex string')
+    
+    if has_time is None:
+        try:
+            return _deserialize(data, False)
+        except ValueError:
+            return _deserialize(data, True)
+    
+    return _deserialize(data, has_time)
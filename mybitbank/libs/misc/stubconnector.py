@@ -25,6 +25,8 @@ SOFTWARE.
 
 from decimal import Decimal
 
+from mybitbank.libs.bitcoinrpc.authproxy import JSONRPCException
+
 # import generic
 rawData = {
     'passphrase': 'testpassphrase',
@@ -79,7 +81,7 @@ rawData = {
                 "category": "receive",
                 "amount": 1.245,
                 "confirmations": 345,
-                "blockhash": "0000000000000009b4bec9a4374031762c7c9700eab2a9442336712fc769d7e7",
+                "blockhash": "000000000000000a4b16a2cd9c5a1ee3e2ad78d14db6fd3c3b6b2e12cbfb3e6c",
                 "blockindex": 427,
                 "blocktime": 1379836630,
                 "txid": "9599c2c44e1be0001ad8c03038b50b47e634329917eb6d08f7fc675310075f02",
@@ -105,6 +107,12 @@ rawData = {
     },
     'balance': Decimal('30.00000000'),
 
+    'blockheights': {
+        "0000000000000009b4bec9a4374031762c7c9700eab2a9442336712fc769d7e7": 257484,
+        "000000000000000a4b16a2cd9c5a1ee3e2ad78d14db6fd3c3b6b2e12cbfb3e6c": 263083,
+        "00000000f623a840f81762114d5426faabeb2fcf8b13e3edb128273aa24a3c38": 263355,
+    },
+
     'rawtransactions': [
         {u'blockhash': u'00000000f623a840f81762114d5426faabeb2fcf8b13e3edb128273aa24a3c38',
          u'blocktime': 1382465670,
@@ -154,7 +162,42 @@ class ServiceProxyStubBTC(object):
             return False
 
     def listtransactions(self, account_name, count=10, start=0):
-        return self._rawData['transactions'][account_name]
+        if account_name == '*':
+            transactions = []
+            for account_transactions in self._rawData['transactions'].values():
+                transactions = transactions + account_transactions
+            return transactions[start:start + count]
+        # the newest count entries after skipping start, in chronological order
+        transactions = self._rawData['transactions'][account_name]
+        end = max(len(transactions) - start, 0)
+        return transactions[max(end - count, 0):end]
+
+    def getblockcount(self):
+        return 263427
+
+    def getblockhash(self, height):
+        for blockhash, blockheight in self._rawData['blockheights'].items():
+            if blockheight == height:
+                return blockhash
+        return "0000000000000009b4bec9a4374031762c7c9700eab2a9442336712fc769d7e7"
+
+    def getblockheader(self, blockhash):
+        if blockhash not in self._rawData['blockheights']:
+            raise JSONRPCException({'code': -5, 'message': "Block not found"})
+        return {'hash': blockhash, 'height': self._rawData['blockheights'][blockhash]}
+
+    def listsinceblock(self, blockhash="", target_confirmations=1):
+        transactions = []
+        for account_transactions in self._rawData['transactions'].values():
+            transactions = transactions + [transaction for transaction in account_transactions if transaction['category'] != 'move']
+        return {'transactions': transactions, 'lastblock': "0000000000000009b4bec9a4374031762c7c9700eab2a9442336712fc769d7e7"}
+
+    def listreceivedbyaddress(self, minconf=1, includeempty=False):
+        received = []
+        for account_name, addresses in self._rawData['addresses'].items():
+            for address in addresses:
+                received.append({'address': address, 'account': account_name, 'amount': Decimal('0E-8'), 'confirmations': 0})
+        return received
 
     def getnewaddress(self, account_name):
         return self._rawData['new_account_address']
@@ -182,6 +225,12 @@ class ServiceProxyStubBTC(object):
         return transaction
 
     def getrawtransaction(self, transaction, verbose=1):
+        if verbose:
+            return self._rawData['rawtransactions'][0]
+        else:
+            return self._rawData['rawtransactions'][0]['hex']
+
+    def decoderawtransaction(self, transaction):
         return self._rawData['rawtransactions'][0]
 
 
@@ -0,0 +1,329 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import functools
+import json
+import threading
+import time
+
+from django.db.backends import BaseDatabaseWrapper
+from django.template.base import Template
+
+from mybitbank.libs.bitcoinrpc import authproxy
+
+
+# the profile of the request served by the current thread
+_local = threading.local()
+
+
+class RequestProfile(object):
+    '''
+    RPC calls, SQL queries, cache lookups and template render time of a single request, with
+    the tree of spans they were made in
+    '''
+    # spans recorded per request, the rest are only counted
+    max_spans = 5000
+    
+    def __init__(self):
+        self.started = time.time()
+        self.finished = None
+        self.rpc_calls = []
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.root_span = {'name': "request", 'start': 0.0, 'duration': None, 'children': []}
+        self.span_stack = [self.root_span]
+        self.span_count = 0
+        self.dropped_spans = 0
+    
+    def openSpan(self, name, info=None, started=None):
+        '''
+        Start a span as a child of the innermost open span, return None when over max_spans
+        '''
+        if self.span_count >= self.max_spans:
+            self.dropped_spans += 1
+            return None
+        
+        self.span_count += 1
+        span = {'name': name, 'start': (started or time.time()) - self.started, 'duration': None, 'children': []}
+        if info:
+            span['info'] = info
+        self.span_stack[-1]['children'].append(span)
+        self.span_stack.append(span)
+        return span
+    
+    def closeSpan(self, span):
+        '''
+        End a span, the spans opened inside it and left open are closed with it
+        '''
+        if span is None or not [open_span for open_span in self.span_stack if open_span is span]:
+            return
+        
+        span['duration'] = time.time() - self.started - span['start']
+        while self.span_stack.pop() is not span:
+            pass
+    
+    def addSpan(self, name, started, seconds, info=None):
+        '''
+        Record a span that has already ended
+        '''
+        span = self.openSpan(name, info, started)
+        if span is not None:
+            span['duration'] = seconds
+            self.span_stack.pop()
+    
+    def addQuery(self, sql, started, seconds, many=False):
+        '''
+        Record a SQL query that has already ended
+        '''
+        self.sql_queries += 1
+        self.sql_time += seconds
+        info = {'sql': sql[:300]}
+        if many:
+            info['many'] = True
+        self.addSpan("sql", started, seconds, info)
+    
+    def finish(self):
+        '''
+        Stop the clock
+        '''
+        self.finished = time.time()
+        self.root_span['duration'] = self.finished - self.started
+    
+    def getTotalTime(self):
+        return (self.finished or time.time()) - self.started
+    
+    def getRpcTime(self):
+        return sum([call['seconds'] for call in self.rpc_calls])
+    
+    def getRpcSummary(self):
+        '''
+        Return the RPC calls grouped per (provider, method) with counts, time and bytes, slowest first
+        '''
+        summary = {}
+        for call in self.rpc_calls:
+            key = (call['provider'], call['method'])
+            entry = summary.setdefault(key, {'provider': call['provider'], 'method': call['method'], 'count': 0, 'seconds': 0.0, 'bytes': 0})
+            entry['count'] += 1
+            entry['seconds'] += call['seconds']
+            entry['bytes'] += call['bytes']
+        return sorted(summary.values(), key=lambda entry: entry['seconds'], reverse=True)
+    
+    def getServerTiming(self):
+        '''
+        Return the value of the Server-Timing header
+        '''
+        metrics = [
+                   'rpc;dur=%.1f;desc="%s RPC calls"' % (self.getRpcTime() * 1000, len(self.rpc_calls)),
+                   'sql;dur=%.1f;desc="%s SQL queries"' % (self.sql_time * 1000, self.sql_queries),
+                   'tpl;dur=%.1f;desc="templates"' % (self.template_time * 1000),
+                   'cache;desc="%s hits, %s misses"' % (self.cache_hits, self.cache_misses),
+                   'total;dur=%.1f' % (self.getTotalTime() * 1000),
+                   ]
+        return ", ".join(metrics)
+    
+    def toDict(self):
+        return {
+                'total_ms': round(self.getTotalTime() * 1000, 1),
+                'rpc_calls': len(self.rpc_calls),
+                'rpc_ms': round(self.getRpcTime() * 1000, 1),
+                'rpc_bytes': sum([call['bytes'] for call in self.rpc_calls]),
+                'rpc': [dict(entry, seconds=round(entry['seconds'], 4)) for entry in self.getRpcSummary()],
+                'sql_queries': self.sql_queries,
+                'sql_ms': round(self.sql_time * 1000, 1),
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'template_ms': round(self.template_time * 1000, 1),
+                }
+    
+    def toLogLine(self, method, path, status_code):
+        '''
+        Return the structured (JSON) log line of the request
+        '''
+        line = self.toDict()
+        line.update({'method': method, 'path': path, 'status': status_code})
+        return json.dumps(line, sort_keys=True)
+    
+    def toTrace(self, method, path, status_code):
+        '''
+        Return the summary of the request with its span tree
+        '''
+        trace = self.toDict()
+        trace.update({'method': method, 'path': path, 'status': status_code, 'when': int(self.started),
+                      'spans': self.root_span, 'dropped_spans': self.dropped_spans})
+        return trace
+
+
+def start():
+    '''
+    Start profiling the request of the current thread
+    '''
+    _local.profile = RequestProfile()
+    return _local.profile
+
+
+def stop():
+    '''
+    Stop profiling the request of the current thread and return its profile
+    '''
+    profile = getattr(_local, 'profile', None)
+    _local.profile = None
+    return profile
+
+
+def current():
+    '''
+    Return the profile of the current thread, None when not profiling
+    '''
+    return getattr(_local, 'profile', None)
+
+
+def traced(name):
+    '''
+    Decorator recording every call of the method as a span of the current profile
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def tracedMethod(*args, **kwargs):
+            profile = getattr(_local, 'profile', None)
+            if profile is None:
+                return method(*args, **kwargs)
+            
+            span = profile.openSpan(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profile.closeSpan(span)
+        return tracedMethod
+    return decorator
+
+
+def getProviderId(host):
+    '''
+    Map a xxxcoind host:port to its provider id
+    '''
+    from mybitbank.libs.connections import connector
+    for provider_id, config in connector.config.items():
+        if "%s:%s" % (config.get('rpchost'), config.get('rpcport')) == host:
+            return provider_id
+    return host
+
+
+def recordRpc(host, method, seconds, response_bytes, error=False):
+    '''
+    authproxy call observer, records a xxxcoind call in the current profile
+    '''
+    profile = current()
+    if profile is not None:
+        provider_id = getProviderId(host)
+        profile.rpc_calls.append({'provider': provider_id, 'method': method, 'seconds': seconds, 'bytes': response_bytes})
+        profile.addSpan("rpc %s" % method, time.time() - seconds, seconds, {'provider': provider_id, 'bytes': response_bytes, 'error': error})
+
+
+def recordCache(hit):
+    '''
+    Count a cache lookup in the current profile
+    '''
+    profile = current()
+    if profile is not None:
+        if hit:
+            profile.cache_hits += 1
+        else:
+            profile.cache_misses += 1
+
+
+_template_render = Template.render
+
+
+def profiledTemplateRender(self, context):
+    '''
+    Template.render measuring the time spent in the outermost template of the request
+    '''
+    profile = current()
+    if profile is None:
+        return _template_render(self, context)
+    
+    profile.template_depth += 1
+    started = time.time()
+    span = profile.openSpan("template %s" % self.name)
+    try:
+        return _template_render(self, context)
+    finally:
+        profile.closeSpan(span)
+        profile.template_depth -= 1
+        if profile.template_depth == 0:
+            profile.template_time += time.time() - started
+
+
+class ProfiledCursor(object):
+    '''
+    Cursor wrapper timing the queries into a request profile. Unlike the debug cursor it does
+    not format the queries with their parameters nor keep them past the request
+    '''
+    def __init__(self, cursor, profile):
+        self.cursor = cursor
+        self.profile = profile
+    
+    def __getattr__(self, attr):
+        return getattr(self.cursor, attr)
+    
+    def __iter__(self):
+        return iter(self.cursor)
+    
+    def execute(self, sql, params=()):
+        started = time.time()
+        try:
+            return self.cursor.execute(sql, params)
+        finally:
+            self.profile.addQuery(sql, started, time.time() - started)
+    
+    def executemany(self, sql, param_list):
+        started = time.time()
+        try:
+            return self.cursor.executemany(sql, param_list)
+        finally:
+            self.profile.addQuery(sql, started, time.time() - started, True)
+
+
+_database_cursor = BaseDatabaseWrapper.cursor
+
+
+def profiledCursor(self):
+    '''
+    BaseDatabaseWrapper.cursor handing out cursors that time their queries while profiling
+    '''
+    cursor = _database_cursor(self)
+    profile = current()
+    if profile is None:
+        return cursor
+    return ProfiledCursor(cursor, profile)
+
+
+authproxy.call_observers.append(recordRpc)
+Template.render = profiledTemplateRender
+BaseDatabaseWrapper.cursor = profiledCursor
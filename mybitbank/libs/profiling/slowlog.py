@@ -0,0 +1,111 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+
+from django.conf import settings
+
+
+# size of the slow request log before it is rotated (bytes) and rotated files kept
+max_log_bytes = 10 * 1024 * 1024
+log_backups = 3
+
+_handler = None
+_handler_lock = threading.Lock()
+
+
+def getThreshold():
+    '''
+    Requests slower than this (seconds) are logged, None turns the log off
+    '''
+    return getattr(settings, 'SLOW_REQUEST_THRESHOLD', None)
+
+
+def getLogPath():
+    return getattr(settings, 'SLOW_REQUEST_LOG', 'slowrequests.log')
+
+
+def getHandler():
+    global _handler
+    with _handler_lock:
+        if _handler is None or _handler.baseFilename != os.path.abspath(getLogPath()):
+            if _handler is not None:
+                _handler.close()
+            _handler = logging.handlers.RotatingFileHandler(getLogPath(), maxBytes=max_log_bytes, backupCount=log_backups)
+            _handler.setFormatter(logging.Formatter("%(message)s"))
+        return _handler
+
+
+def isSlow(profile):
+    threshold = getThreshold()
+    return threshold is not None and profile.getTotalTime() >= threshold
+
+
+def write(trace):
+    '''
+    Append the trace of a slow request as a JSON line
+    '''
+    record = logging.LogRecord('mybitbank.slowrequests', logging.WARNING, __file__, 0, json.dumps(trace, default=str), None, None)
+    getHandler().handle(record)
+
+
+def readRecent(limit=50):
+    '''
+    Return the newest traces of slow requests from the log and its rotated files, newest first
+    '''
+    traces = []
+    paths = [getLogPath()] + ["%s.%s" % (getLogPath(), index) for index in range(1, log_backups + 1)]
+    for path in paths:
+        if len(traces) >= limit:
+            break
+        if not os.path.exists(path):
+            continue
+        with open(path) as log_file:
+            lines = log_file.readlines()
+        for line in reversed(lines):
+            try:
+                traces.append(json.loads(line))
+            except ValueError:
+                continue
+            if len(traces) >= limit:
+                break
+    return traces
+
+
+def flattenSpans(span, depth=0, rows=None):
+    '''
+    Turn a span tree into a list of rows with their depth, for displaying
+    '''
+    if rows is None:
+        rows = []
+    rows.append({'name': span['name'], 'depth': depth, 'start_ms': round(span['start'] * 1000, 1),
+                 'duration_ms': round((span['duration'] or 0) * 1000, 1), 'info': span.get('info', {})})
+    for child in span.get('children', []):
+        flattenSpans(child, depth + 1, rows)
+    return rows
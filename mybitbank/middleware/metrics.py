@@ -0,0 +1,48 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import time
+
+from mybitbank.libs import metrics
+
+
+class RequestMetrics():
+    '''
+    Record the latency of every request per view. This is a Django middleware.
+    '''
+    
+    def process_request(self, request):
+        request._metrics_started = time.time()
+        request._metrics_view = "unresolved"
+        return None
+    
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = "%s.%s" % (view_func.__module__, getattr(view_func, '__name__', view_func.__class__.__name__))
+        return None
+    
+    def process_response(self, request, response):
+        if hasattr(request, '_metrics_started'):
+            metrics.observe('mybitbank_request_duration_seconds', {'view': request._metrics_view}, time.time() - request._metrics_started)
+        return response
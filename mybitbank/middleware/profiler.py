@@ -0,0 +1,112 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2016 Stratos Goudelis
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+
+"""
+
+import logging
+
+from django.conf import settings
+from django.utils.html import escape
+
+from mybitbank.libs import profiling
+from mybitbank.libs.profiling import slowlog
+
+
+logger = logging.getLogger('mybitbank.profiling')
+
+
+class RequestProfiler():
+    '''
+    Profile every request: xxxcoind calls, SQL queries, cache lookups and template render time.
+    Emits a Server-Timing header, a structured log line and, for staff users, an in-page panel.
+    Requests slower than SLOW_REQUEST_THRESHOLD are written with their span tree to the slow log.
+    Streaming responses are not profiled, their content is produced after the middlewares ran.
+    This is a Django middleware, keep it first so it wraps the others.
+    '''
+    
+    def process_request(self, request):
+        '''
+        Start the profile of this thread
+        '''
+        profiling.start()
+        return None
+    
+    def process_response(self, request, response):
+        '''
+        Finish the profile and report it
+        '''
+        profile = profiling.stop()
+        if profile is None or getattr(response, 'streaming', False):
+            return response
+        
+        profile.finish()
+        
+        response['Server-Timing'] = profile.getServerTiming()
+        logger.info(profile.toLogLine(request.method, request.get_full_path(), response.status_code))
+        
+        if slowlog.isSlow(profile):
+            try:
+                slowlog.write(profile.toTrace(request.method, request.get_full_path(), response.status_code))
+            except IOError, e:
+                logger.warning("Could not write the slow request log: %s" % e)
+        
+        if self.showPanel(request, response):
+            response.content = response.content.replace('</body>', '%s</body>' % self.renderPanel(profile).encode('utf8'), 1)
+            if response.has_header('Content-Length'):
+                response['Content-Length'] = str(len(response.content))
+        
+        return response
+    
+    def showPanel(self, request, response):
+        '''
+        The panel is shown to staff users on complete HTML pages when PROFILING_PANEL is on
+        '''
+        if not getattr(settings, 'PROFILING_PANEL', False):
+            return False
+        
+        user = getattr(request, 'user', None)
+        if user is None or not user.is_staff:
+            return False
+        
+        if not response.get('Content-Type', '').startswith('text/html'):
+            return False
+        
+        return True
+    
+    def renderPanel(self, profile):
+        '''
+        Return the HTML of the profiling panel
+        '''
+        summary = profile.toDict()
+        rows = []
+        for call in summary['rpc']:
+            rows.append(u'<tr><td>%s</td><td>%s</td><td>%s</td><td>%.1f ms</td><td>%s</td></tr>' % 
+                        (escape(call['provider']), escape(call['method']), call['count'], call['seconds'] * 1000, call['bytes']))
+        
+        return (u'<div id="profiling-panel" class="well well-small" style="margin: 10px;">'
+                u'<strong>%(total_ms)s ms</strong> &middot; '
+                u'%(rpc_calls)s RPC calls (%(rpc_ms)s ms, %(rpc_bytes)s bytes) &middot; '
+                u'%(sql_queries)s SQL queries (%(sql_ms)s ms) &middot; '
+                u'templates %(template_ms)s ms &middot; '
+                u'cache %(cache_hits)s hits / %(cache_misses)s misses' % summary +
+                u'<table class="table table-condensed"><tr><th>Provider</th><th>Method</th><th>Calls</th><th>Time</th><th>Bytes</th></tr>%s</table></div>' % u''.join(rows))
@@ -23,44 +23,29 @@ SOFTWARE.
 
 """
 
-import datetime
-
-from django.utils.timezone import utc
-
 from mybitbank.libs.connections import connector
-from mybitbank.libs.jsonrpc import ServiceProxy
 
 
 class CurrencyEnabler():
     '''
-    Re-enable currency service after time has elapsed. This is a Django middleware.
+    Start and clear the request state of the connector for every request. This is a Django middleware.
+    Disabled currency services are re-enabled by the connector on its own scheduler thread.
     '''
     
     def process_request(self, request):
         '''
-        Before the view is compiled, re-enabled disabled currency services.
+        Before the view is compiled, start the request state of this thread afresh
         '''
-
-        # just re-enable the service
-        for provider_id in connector.config.keys():
-            if isinstance(connector.config[provider_id].get('enabled', None), datetime.datetime):
-                # assume the value is datetime in the future... or is it ?
-                if datetime.datetime.utcnow().replace(tzinfo=utc) >= connector.config[provider_id]['enabled']:
-                    # re-enable currency service
-                    connector.services[provider_id] = ServiceProxy("http://%s:%s@%s:%s" % 
-                                                                                  (connector.config[provider_id]['rpcusername'],
-                                                                                   connector.config[provider_id]['rpcpassword'],
-                                                                                   connector.config[provider_id]['rpchost'],
-                                                                                   connector.config[provider_id]['rpcport']))
-                    connector.config[provider_id]['enabled'] = True
-                    connector.alerts['currencybackend'][:] = [alert for alert in connector.alerts['currencybackend'] if alert.get('provider_id') != provider_id]
-            
+        connector.request = request
+        connector.errors = []
+        
         return None
     
     def process_response(self, request, response):
         '''
-        Clear connector errors after the view has been compiled
+        Clear the request state of this thread after the view has been compiled
         '''
         connector.errors = []
+        connector.request = None
         
         return response
@@ -93,6 +93,8 @@ TEMPLATE_LOADERS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'mybitbank.middleware.profiler.RequestProfiler',
+    'mybitbank.middleware.metrics.RequestMetrics',
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -136,6 +138,7 @@ INSTALLED_APPS = (
     'mybitbank.apps.transactions',
     'mybitbank.apps.login',
     'mybitbank.apps.network',
+    'mybitbank.apps.api',
     'mybitbank.libs.events',
     'south',
 )
@@ -160,6 +163,10 @@ LOGGING = {
             'level': 'ERROR',
             'filters': ['require_debug_false'],
             'class': 'django.utils.log.AdminEmailHandler'
+        },
+        'console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler'
         }
     },
     'loggers': {
@@ -168,9 +175,27 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        # set to INFO to log one JSON line per request with its RPC, SQL, cache and template timings
+        'mybitbank.profiling': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     }
 }
 
+# show the request profiling panel to staff users
+PROFILING_PANEL = False
+
+# requests slower than this (seconds) are logged with their span tree, None turns it off
+SLOW_REQUEST_THRESHOLD = 2.0
+
+# rotating JSON log of the slow requests, shown at /dashboard/slow/
+SLOW_REQUEST_LOG = 'slowrequests.log'
+
+# secret that metrics scrapers send as "Authorization: Bearer <token>", None lets only staff users in
+METRICS_TOKEN = None
+
 TEMPLATE_CONTEXT_PROCESSORS = (
     "django.contrib.auth.context_processors.auth",
     "django.core.context_processors.i18n",
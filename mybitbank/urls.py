@@ -38,6 +38,12 @@ urlpatterns = patterns('',
     # network
     url(r'^network/', include('mybitbank.apps.network.urls', namespace="network")),
     
+    # JSON read API
+    url(r'^api/v1/', include('mybitbank.apps.api.urls', namespace="api")),
+    
+    # metrics
+    url(r'^metrics$', 'mybitbank.libs.metrics.views.metricsView', name="metrics"),
+    
     # language
     (r'^i18n/', include('django.conf.urls.i18n')),
 )